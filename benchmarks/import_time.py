@@ -0,0 +1,98 @@
+"""
+Mesure le temps d'import de la CLI avec `python -X importtime`.
+
+Sert de test de non-régression : échoue (code 1) si `photobot.cli` importe
+une dépendance lourde ou dépasse le budget de temps.
+
+    python benchmarks/import_time.py [--module photobot.cli] [--budget-ms 150] [--runs 5]
+"""
+import re
+import sys
+import argparse
+import subprocess
+
+
+# Modules qui ne doivent jamais être chargés au démarrage de la CLI
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "shapely",
+    "exifread",
+    "exiftool",
+    "streamlit",
+    "folium",
+    "PIL",
+]
+
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure(module: str) -> tuple[float, set[str]] :
+    """
+    Renvoie (temps cumulé d'import du module en ms, modules importés).
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    cumulative_ms = 0.
+    imported = set()
+    for line in result.stderr.splitlines() :
+        match = LINE_PATTERN.match(line)
+        if not match :
+            continue
+
+        _, cumulative_us, indent, name = match.groups()
+        imported.add(name)
+
+        # Modules de premier niveau : leurs temps cumulés s'additionnent
+        if len(indent) == 1 :
+            cumulative_ms += int(cumulative_us) / 1000
+
+    return cumulative_ms, imported
+
+
+def main() -> None :
+
+    parser = argparse.ArgumentParser(description="Benchmark du temps d'import de photobot")
+    parser.add_argument("--module", default="photobot.cli")
+    parser.add_argument("--budget-ms", type=float, default=150.)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    imported = set()
+    for _ in range(args.runs) :
+        ms, imported = measure(args.module)
+        timings.append(ms)
+
+    best = min(timings)
+    print(f"{args.module} : {best:.1f} ms (meilleur de {args.runs})")
+
+    heavy = sorted({
+        name for name in imported
+        if name.split(".")[0] in HEAVY_MODULES
+    })
+
+    failed = False
+    if heavy :
+        roots = sorted({name.split(".")[0] for name in heavy})
+        print(f"❌ Dépendances lourdes importées : {', '.join(roots)}")
+        failed = True
+
+    if best > args.budget_ms :
+        print(f"❌ Budget dépassé : {best:.1f} ms > {args.budget_ms:.1f} ms")
+        failed = True
+
+    if failed :
+        sys.exit(1)
+
+    print("✅ OK")
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,282 @@
+"""
+Génère une bibliothèque de médias synthétique pour les benchmarks :
+JPEG avec EXIF (GPS, DateTimeOriginal), fichiers datés par leur nom
+(format de parse_date_from_stem), petites vidéos MP4 (mvhd + ©xyz),
+et N groupes cercle / polygone / date.
+
+    python benchmarks/library.py OUT [--files 1000] [--groups 20] [--video-ratio 0.1] [--seed 0]
+
+OUT/library contient les médias, OUT/drawn_groups.json et OUT/date_groups.csv les groupes.
+"""
+import io
+import csv
+import math
+import json
+import random
+import struct
+import argparse
+from pathlib import Path
+from datetime import (
+    datetime,
+    timedelta
+)
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+
+# Villes autour desquelles les médias et les groupes sont tirés
+CITIES = [
+    (48.8566, 2.3522),
+    (43.2965, 5.3698),
+    (45.7640, 4.8357),
+    (51.5074, -0.1278),
+    (40.7128, -74.0060),
+    (-33.8688, 151.2093),
+    (35.6762, 139.6503),
+    (64.1466, -21.9426),
+]
+
+START_DATE = datetime(2015, 1, 1)
+DAYS = 10 * 365
+
+MP4_EPOCH = datetime(1904, 1, 1)
+
+
+# region MEDIAS
+
+def _jpeg_template() -> bytes :
+    """
+    Petit JPEG sans EXIF, partagé par tous les fichiers (seul l'en-tête change).
+    """
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (128, 96, 64)).save(buffer, "JPEG")
+
+    return buffer.getvalue()
+
+
+def _dms(value: float) -> tuple[IFDRational, IFDRational, IFDRational] :
+
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+
+    return IFDRational(degrees, 1), IFDRational(minutes, 1), IFDRational(seconds, 100)
+
+
+def make_jpeg(
+        template: bytes,
+        lat: float|None,
+        lon: float|None,
+        date: datetime|None
+    ) -> bytes :
+    """
+    Insère un segment APP1 Exif juste après le SOI du JPEG modèle.
+    """
+
+    exif = Image.Exif()
+    if date is not None :
+        exif.get_ifd(0x8769)[0x9003] = date.strftime("%Y:%m:%d %H:%M:%S")
+    if lat is not None and lon is not None :
+        gps = exif.get_ifd(0x8825)
+        gps[1] = "N" if lat >= 0 else "S"
+        gps[2] = _dms(lat)
+        gps[3] = "E" if lon >= 0 else "W"
+        gps[4] = _dms(lon)
+
+    # tobytes() renvoie déjà l'en-tête "Exif\0\0" suivi du bloc TIFF
+    payload = exif.tobytes()
+    app1 = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+    return template[:2] + app1 + template[2:]
+
+
+def _box(
+        box_type: bytes,
+        payload: bytes
+    ) -> bytes :
+
+    return struct.pack(">L4s", 8 + len(payload), box_type) + payload
+
+
+def make_mp4(
+        lat: float|None,
+        lon: float|None,
+        date: datetime|None
+    ) -> bytes :
+    """
+    MP4 minimal : ftyp, mdat factice, puis moov avec mvhd (date) et udta/©xyz (position).
+    """
+
+    seconds = int((date - MP4_EPOCH).total_seconds()) if date is not None else 0
+    mvhd = _box(b"mvhd", bytes(4) + struct.pack(">LL", seconds, seconds) + bytes(88))
+
+    moov = mvhd
+    if lat is not None and lon is not None :
+        location = f"{lat:+08.4f}{lon:+09.4f}/".encode("ascii")
+        xyz = _box(b"\xa9xyz", struct.pack(">HH", len(location), 0x15c7) + location)
+        moov += _box(b"udta", xyz)
+
+    return (
+        _box(b"ftyp", b"isom" + struct.pack(">L", 0x200) + b"isomiso2mp41")
+        + _box(b"mdat", bytes(4096))
+        + _box(b"moov", moov)
+    )
+
+
+def _random_media(rng: random.Random) -> tuple[float|None, float|None, datetime] :
+
+    date = START_DATE + timedelta(days=rng.randrange(DAYS), seconds=rng.randrange(86400))
+
+    if rng.random() < 0.2 : # Sans position
+        return None, None, date
+
+    lat, lon = rng.choice(CITIES)
+    lat += rng.gauss(0, 0.2)
+    lon += rng.gauss(0, 0.2)
+
+    return lat, lon, date
+
+# endregion
+
+
+# region GROUPES
+
+def make_groups(
+        rng: random.Random,
+        n_groups: int
+    ) -> tuple[list[dict], list[dict]] :
+    """
+    Renvoie (groupes dessinés, groupes par date), en proportions égales
+    de cercles, polygones et périodes.
+    """
+
+    drawn = []
+    dates = []
+    for i in range(n_groups) :
+        kind = i % 3
+        lat, lon = rng.choice(CITIES)
+        lat += rng.gauss(0, 0.3)
+        lon += rng.gauss(0, 0.3)
+
+        if kind == 0 :
+            drawn.append({
+                "nom": f"Cercle {i}",
+                "id": f"c{i}",
+                "type": "circle",
+                "latitude": lat,
+                "longitude": lon,
+                "rayon_km": rng.uniform(1, 50)
+            })
+
+        elif kind == 1 :
+            # Polygone étoilé autour du centre, coordonnées GeoJSON [lon, lat]
+            n_vertices = rng.randint(5, 12)
+            coordinates = []
+            for k in range(n_vertices) :
+                angle = 2 * math.pi * k / n_vertices
+                radius = rng.uniform(0.05, 0.5)
+                coordinates.append([
+                    lon + radius * math.cos(angle),
+                    lat + radius * math.sin(angle)
+                ])
+            coordinates.append(coordinates[0])
+
+            drawn.append({
+                "nom": f"Polygone {i}",
+                "id": f"p{i}",
+                "type": "polygone",
+                "coordinates": coordinates
+            })
+
+        else :
+            debut = START_DATE + timedelta(days=rng.randrange(DAYS))
+            fin = debut + timedelta(days=rng.randint(0, 30), hours=rng.randint(0, 23))
+            dates.append({
+                "nom": f"Période {i}",
+                "date_debut": debut.strftime("%Y-%m-%d %H:%M:%S"),
+                "date_fin": fin.strftime("%Y-%m-%d %H:%M:%S"),
+                "full_day": rng.random() < 0.5
+            })
+
+    return drawn, dates
+
+# endregion
+
+
+def generate_library(
+        out_path: Path,
+        n_files: int=1000,
+        n_groups: int=20,
+        video_ratio: float=0.1,
+        seed: int=0
+    ) -> dict :
+    """
+    Ecrit la bibliothèque dans out_path. Renvoie les chemins et les effectifs générés.
+    Un tiers des photos est daté par son nom, un dixième n'a pas de date EXIF.
+    """
+
+    rng = random.Random(seed)
+    library_path = out_path / "library"
+    template = _jpeg_template()
+
+    counts = {"jpg": 0, "stem_dated": 0, "mp4": 0}
+    for i in range(n_files) :
+        lat, lon, date = _random_media(rng)
+        folder = library_path / f"{date:%Y}" / f"album_{i % 17}"
+        folder.mkdir(parents=True, exist_ok=True)
+
+        if rng.random() < video_ratio :
+            (folder / f"VID_{i:06d}.mp4").write_bytes(make_mp4(lat, lon, date))
+            counts["mp4"] += 1
+            continue
+
+        if i % 3 == 0 :
+            name = f"{date:%Y-%m-%d %H.%M.%S} {i:06d}.jpg"
+            counts["stem_dated"] += 1
+        else :
+            name = f"IMG_{i:06d}.jpg"
+
+        exif_date = None if i % 10 == 0 else date
+        (folder / name).write_bytes(make_jpeg(template, lat, lon, exif_date))
+        counts["jpg"] += 1
+
+    drawn, dates = make_groups(rng, n_groups)
+
+    drawn_path = out_path / "drawn_groups.json"
+    with open(drawn_path, "w", encoding="utf-8") as f :
+        json.dump({"groups": drawn}, f)
+
+    date_path = out_path / "date_groups.csv"
+    with open(date_path, "w", encoding="utf-8", newline="") as f :
+        writer = csv.DictWriter(f, fieldnames=["nom", "date_debut", "date_fin", "full_day"])
+        writer.writeheader()
+        writer.writerows(dates)
+
+    return {
+        "library_path": library_path,
+        "drawn_groups_path": drawn_path,
+        "date_groups_path": date_path,
+        "counts": counts,
+        "groups": {"drawn": len(drawn), "date": len(dates)}
+    }
+
+
+def main() -> None :
+
+    parser = argparse.ArgumentParser(description="Génère une bibliothèque de médias synthétique")
+    parser.add_argument("out", type=Path)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--video-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    info = generate_library(args.out, args.files, args.groups, args.video_ratio, args.seed)
+    print(f"{info['counts']} -> {info['library_path']}")
+    print(f"Groupes : {info['groups']}")
+
+
+if __name__ == "__main__" :
+    main()
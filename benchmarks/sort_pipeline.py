@@ -0,0 +1,190 @@
+"""
+Benchmark des étapes du tri sur une bibliothèque synthétique (voir library.py) :
+parcours, get_jpg_metadata, get_mp4_metadata, media_is_in_group et sort_medias
+de bout en bout vers un dossier temporaire.
+
+Les résultats sont écrits en JSON pour suivre les régressions d'une version à l'autre.
+
+    python benchmarks/sort_pipeline.py [--files 1000] [--groups 20] [--runs 3] [--output results.json]
+"""
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+from io import StringIO
+from pathlib import Path
+from datetime import datetime
+from importlib.metadata import version, PackageNotFoundError
+from library import generate_library
+
+
+def timed(
+        fn,
+        runs: int
+    ) -> tuple[float, object] :
+    """
+    Meilleur temps sur runs exécutions, et le résultat de la dernière.
+    """
+
+    best = float("inf")
+    result = None
+    for _ in range(runs) :
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def stage(
+        seconds: float,
+        items: int
+    ) -> dict :
+
+    return {
+        "seconds": round(seconds, 6),
+        "items": items,
+        "per_second": round(items / seconds, 1) if seconds > 0 else None
+    }
+
+
+def run_benchmarks(
+        work_path: Path,
+        n_files: int,
+        n_groups: int,
+        video_ratio: float,
+        runs: int,
+        seed: int
+    ) -> dict :
+
+    from photobot.discovery import iter_medias
+    from photobot.groups import load_groups
+    from photobot.sort import media_is_in_group, sort_medias
+    from photobot.utils import get_jpg_metadata, get_mp4_metadata
+
+    start = time.perf_counter()
+    info = generate_library(work_path / "generated", n_files, n_groups, video_ratio, seed)
+    generation = time.perf_counter() - start
+
+    library_path = info["library_path"]
+    results = {}
+
+    # Parcours
+    seconds, medias = timed(lambda : list(iter_medias(library_path, recursive=True)), runs)
+    results["discovery"] = stage(seconds, len(medias))
+
+    photos = [m.path for m in medias if m.path.suffix.lower() != ".mp4"]
+    videos = [m.path for m in medias if m.path.suffix.lower() == ".mp4"]
+
+    # Métadonnées
+    seconds, photos_metadata = timed(lambda : [get_jpg_metadata(p) for p in photos], runs)
+    results["get_jpg_metadata"] = stage(seconds, len(photos))
+
+    seconds, videos_metadata = timed(lambda : [get_mp4_metadata(p) for p in videos], runs)
+    results["get_mp4_metadata"] = stage(seconds, len(videos))
+
+    # Appartenance aux groupes : chaque média contre chaque groupe (API scalaire)
+    groups = load_groups(info["drawn_groups_path"], info["date_groups_path"])
+    metadatas = photos_metadata + videos_metadata
+
+    def _match_all() -> int :
+        matches = 0
+        for lat, lon, date in metadatas :
+            for group in groups :
+                matches += media_is_in_group(date, (lat, lon), group)
+        return matches
+
+    seconds, matches = timed(_match_all, runs)
+    results["media_is_in_group"] = stage(seconds, len(metadatas) * len(groups))
+    results["media_is_in_group"]["matches"] = matches
+
+    # Tri complet, sans cache, sur une copie de la bibliothèque à chaque exécution.
+    # Journal et index compilé des groupes restent dans le dossier de travail, pas dans data/
+    def _sort() -> float :
+        source = work_path / "sort_source"
+        output = work_path / "sort_output"
+        shutil.rmtree(source, ignore_errors=True)
+        shutil.rmtree(output, ignore_errors=True)
+        shutil.copytree(library_path, source)
+
+        with contextlib.redirect_stdout(StringIO()) :
+            start = time.perf_counter()
+            sort_medias(
+                source,
+                output,
+                recursive=True,
+                drawn_groups_data_path=info["drawn_groups_path"],
+                date_groups_data_path=info["date_groups_path"],
+                use_cache=False,
+                journals_path=work_path / "journals",
+                group_index_dir=work_path / "group_index"
+            )
+        return time.perf_counter() - start
+
+    sort_seconds = min(_sort() for _ in range(runs))
+    results["sort_medias"] = stage(sort_seconds, len(medias))
+
+    return {
+        "library": {
+            "files": n_files,
+            "counts": info["counts"],
+            "groups": info["groups"],
+            "video_ratio": video_ratio,
+            "seed": seed,
+            "generation_seconds": round(generation, 3)
+        },
+        "results": results
+    }
+
+
+def environment() -> dict :
+
+    try :
+        photobot_version = version("photobot")
+    except PackageNotFoundError :
+        photobot_version = None
+
+    return {
+        "photobot": photobot_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds")
+    }
+
+
+def main() -> None :
+
+    parser = argparse.ArgumentParser(description="Benchmark des étapes du tri de photobot")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--video-ratio", type=float, default=0.1)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="Fichier JSON des résultats")
+    parser.add_argument("--keep", type=Path, default=None, help="Dossier de travail à conserver (sinon temporaire)")
+    args = parser.parse_args()
+
+    if args.keep is not None :
+        args.keep.mkdir(parents=True, exist_ok=True)
+        work = contextlib.nullcontext(str(args.keep))
+    else :
+        work = tempfile.TemporaryDirectory(prefix="photobot_bench_")
+
+    with work as work_path :
+        report = run_benchmarks(Path(work_path), args.files, args.groups, args.video_ratio, args.runs, args.seed)
+
+    report = {"environment": environment(), **report}
+
+    for name, result in report["results"].items() :
+        print(f"{name:<20} {result['seconds'] * 1000:>10.1f} ms  {result['items']:>10} items  {result['per_second'] or 0:>12.1f} /s")
+
+    if args.output is not None :
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Résultats : {args.output}")
+
+
+if __name__ == "__main__" :
+    main()
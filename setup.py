@@ -11,9 +11,10 @@ setup(
         "Pillow",
         "streamlit>=1.25",
         "streamlit-folium>=0.11",
-        "shapely",
+        "shapely>=2",
         "PyExifTool",
-        "pandas"
+        "pandas",
+        "numpy"
     ],
     entry_points={
         "console_scripts": [
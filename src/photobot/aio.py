@@ -0,0 +1,269 @@
+import os
+import asyncio
+import functools
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Awaitable, Callable, Iterable, Iterator
+from photobot.parameters import IO_CONCURRENCY
+from photobot.discovery import (
+    MediaFile,
+    _scan_dir
+)
+from photobot.moves import (
+    Move,
+    PLACEMENT_MODES,
+    place_file
+)
+from photobot.utils import (
+    exiftool_stats,
+    get_medias_metadata_timed
+)
+
+if TYPE_CHECKING :
+    from photobot.cache import MetadataCache
+    from photobot.journal import SortJournal
+    from photobot.metrics import SortMetrics
+
+
+class AsyncIO :
+    """
+    Entrées / sorties asynchrones, pour les sources à forte latence (SMB, NFS) :
+    jusqu'à concurrency appels bloquants (scandir, lecture d'en-têtes,
+    déplacements) sont en cours à la fois dans un pool de threads, toutes
+    étapes confondues, pour masquer la latence du réseau.
+
+    La boucle asyncio tourne dans le thread appelant, seulement quand le
+    consommateur demande l'élément suivant : les caches SQLite et le journal
+    restent utilisés depuis ce thread, et chaque étape garde au plus
+    2 * concurrency tâches d'avance (un consommateur lent freine les lectures).
+    """
+
+    def __init__(
+            self,
+            concurrency: int=IO_CONCURRENCY
+        ) -> None :
+
+        if concurrency < 1 :
+            raise ValueError(f"Concurrence invalide : {concurrency}")
+
+        self.concurrency = concurrency
+        self.loop = asyncio.new_event_loop()
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="photobot-io")
+        # Les tâches en trop attendent dans la boucle, pas dans la file du pool
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def __enter__(self) -> "AsyncIO" :
+        return self
+
+    def __exit__(self, *exc) -> None :
+        self.close()
+
+    def close(self) -> None :
+
+        self._executor.shutdown(wait=True)
+        self.loop.close()
+
+    # region |---| Primitives
+
+    async def run(
+            self,
+            fn: Callable,
+            *args
+        ) :
+        """
+        Appel bloquant fn(*args) dans le pool, dans la limite de concurrence.
+        """
+
+        async with self._semaphore :
+            return await self.loop.run_in_executor(self._executor, fn, *args)
+
+    def map_ordered(
+            self,
+            fn: Callable[..., Awaitable],
+            items: Iterable,
+            window: int|None=None
+        ) -> Iterator[tuple] :
+        """
+        Equivalent asynchrone de utils.ordered_map : lance fn(item) (coroutine)
+        pour au plus window éléments d'avance, et renvoie les couples
+        (entrée, résultat) dans l'ordre d'entrée.
+        items peut lui-même être produit par une autre étape de cette boucle.
+        """
+
+        if window is None :
+            window = 2 * self.concurrency
+
+        pending = deque()
+        try :
+            for item in items :
+                pending.append((item, asyncio.ensure_future(fn(item), loop=self.loop)))
+                if len(pending) >= window :
+                    item, task = pending.popleft()
+                    yield item, self.loop.run_until_complete(task)
+
+            while pending :
+                item, task = pending.popleft()
+                yield item, self.loop.run_until_complete(task)
+
+        finally :
+            self._cancel(task for _, task in pending)
+
+    def _cancel(self, tasks: Iterable[asyncio.Future]) -> None :
+        """
+        Annule les tâches d'une étape abandonnée (arrêt du consommateur, erreur).
+        Un appel déjà parti dans le pool va à son terme, son résultat est ignoré.
+        """
+
+        tasks = [task for task in tasks if not task.done()]
+        for task in tasks :
+            task.cancel()
+
+        if tasks and not self.loop.is_running() and not self.loop.is_closed() :
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+    # endregion
+
+    # region |---| Etapes
+
+    def iter_medias(
+            self,
+            medias_path: Path,
+            recursive: bool,
+            exclude: Iterable[Path]=()
+        ) -> Iterator[MediaFile] :
+        """
+        Comme discovery.iter_medias, avec plusieurs dossiers lus à la fois.
+        Les médias sont renvoyés dans l'ordre où leurs dossiers finissent d'être lus.
+        """
+
+        excluded = frozenset(os.path.abspath(p) for p in exclude)
+        todo = [os.path.abspath(medias_path)]
+        pending = set()
+
+        try :
+            while todo or pending :
+                while todo and len(pending) < 2 * self.concurrency :
+                    pending.add(self.loop.create_task(self.run(_scan_dir, todo.pop(), excluded)))
+
+                done, pending = self.loop.run_until_complete(
+                    asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                )
+                for task in done :
+                    medias, subdirs = task.result()
+                    if recursive :
+                        todo.extend(reversed(subdirs))
+                    yield from medias
+
+        finally :
+            self._cancel(pending)
+
+    def iter_medias_metadata(
+            self,
+            medias: Iterable[MediaFile],
+            cache: "MetadataCache|None"=None,
+            metrics: "SortMetrics|None"=None
+        ) -> Iterator[tuple[Path, tuple]] :
+        """
+        Comme utils.iter_medias_metadata, chaque média absent du cache étant lu
+        par son propre appel dans le pool (pas de lots : c'est le nombre de
+        lectures en cours qui masque la latence). Renvoie dans l'ordre d'entrée.
+        """
+
+        async def _read(media: MediaFile) -> tuple[tuple, float|None] :
+
+            if cache is not None :
+                metadata = cache.get(media.path, media.stat)
+                if metadata is not None :
+                    return metadata, None
+
+            metadatas, durations = await self.run(get_medias_metadata_timed, [media.path])
+            return metadatas[0], durations[0]
+
+        # Les threads du pool partagent les compteurs d'ExifTool de ce processus
+        before = dict(exiftool_stats)
+
+        try :
+            for media, (metadata, seconds) in self.map_ordered(_read, medias) :
+
+                if seconds is None :
+                    hits, durations = {media.path: metadata}, {}
+                else :
+                    hits, durations = {}, {media.path: seconds}
+                    if cache is not None :
+                        cache.put(media.path, metadata, media.stat)
+
+                if metrics is not None :
+                    metrics.record_extraction([media], hits, durations, {})
+
+                yield media.path, metadata
+
+        finally :
+            if metrics is not None :
+                metrics.exiftool.update({key: exiftool_stats[key] - before[key] for key in before})
+
+    def execute_moves(
+            self,
+            moves: Iterable[Move],
+            journal: "SortJournal|None"=None,
+            mode: str="move",
+            verify: bool=False
+        ) -> Iterator[Move] :
+        """
+        Comme moves.execute_moves, plusieurs placements étant en cours à la fois.
+        Deux déplacements vers la même destination, ou un lien et son original,
+        restent faits dans l'ordre d'entrée. Chaque dossier n'est créé qu'une fois.
+        Renvoie les déplacements effectués, dans l'ordre d'entrée.
+        """
+
+        if mode not in PLACEMENT_MODES :
+            raise ValueError(f"Mode de placement inconnu : {mode}")
+
+        folders: dict[Path, asyncio.Task] = {}
+        # Chemin -> dernière tâche qui y écrit
+        writing: dict[Path, asyncio.Task] = {}
+
+        async def _place(
+                move: Move,
+                after: list[asyncio.Task]
+            ) -> None :
+
+            if after :
+                await asyncio.wait(after)
+            await folders[move.dst.parent]
+
+            if journal is not None :
+                journal.begin(move)
+
+            await self.run(place_file, move, mode, verify)
+
+            if journal is not None :
+                journal.done(move)
+
+        def _written(dst: Path, task: asyncio.Task) -> None :
+            if writing.get(dst) is task :
+                del writing[dst]
+
+        def _schedule(move: Move) -> asyncio.Task :
+
+            folder = move.dst.parent
+            if folder not in folders :
+                makedirs = functools.partial(os.makedirs, folder, exist_ok=True)
+                folders[folder] = self.loop.create_task(self.run(makedirs))
+
+            after = [writing[p] for p in (move.dst, move.original) if p in writing]
+            task = self.loop.create_task(_place(move, after))
+            writing[move.dst] = task
+            task.add_done_callback(functools.partial(_written, move.dst))
+
+            return task
+
+        # Les doublons "skip" restent dans la source
+        try :
+            for move, _ in self.map_ordered(_schedule, (m for m in moves if m.kind != "skip")) :
+                yield move
+        finally :
+            self._cancel(folders.values())
+
+    # endregion
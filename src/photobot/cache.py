@@ -0,0 +1,200 @@
+import os
+import sqlite3
+from pathlib import Path
+from datetime import datetime
+from photobot.parameters import (
+    METADATA_CACHE_PATH,
+    METADATA_CACHE_COMMIT_EVERY
+)
+from photobot.utils import hash_file
+
+
+Metadata = tuple[float|None, float|None, datetime|None]
+
+
+class MetadataCache :
+    """
+    Cache persistant (SQLite) des métadonnées (lat, lon, date) des médias.
+    Une entrée est valide tant que le chemin, la taille et la date de modification
+    du fichier n'ont pas changé. Avec verify_hash, le contenu est aussi re-hashé.
+    """
+
+    def __init__(
+            self,
+            path: Path=METADATA_CACHE_PATH,
+            verify_hash: bool=False
+        ) -> None :
+
+        self.path = path
+        self.verify_hash = verify_hash
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS metadata (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                lat REAL,
+                lon REAL,
+                date TEXT,
+                hash TEXT
+            )
+        """)
+
+    # region |---| Lecture / écriture
+
+    def get(
+            self,
+            path: Path,
+            stat: os.stat_result|None=None
+        ) -> Metadata|None :
+
+        if stat is None :
+            try :
+                stat = os.stat(path)
+            except OSError :
+                self.misses += 1
+                return None
+
+        row = self.conn.execute(
+            "SELECT lat, lon, date, hash FROM metadata WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (_key(path), stat.st_size, stat.st_mtime_ns)
+        ).fetchone()
+
+        if row is None :
+            self.misses += 1
+            return None
+
+        lat, lon, date_str, file_hash = row
+
+        if self.verify_hash and file_hash != hash_file(path) :
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        date = datetime.fromisoformat(date_str) if date_str else None
+
+        return lat, lon, date
+
+    def put(
+            self,
+            path: Path,
+            metadata: Metadata,
+            stat: os.stat_result|None=None
+        ) -> None :
+
+        if stat is None :
+            stat = os.stat(path)
+
+        lat, lon, date = metadata
+        file_hash = hash_file(path) if self.verify_hash else None
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                _key(path),
+                stat.st_size,
+                stat.st_mtime_ns,
+                lat,
+                lon,
+                date.isoformat() if date else None,
+                file_hash
+            )
+        )
+        self._autocommit()
+
+    def move(
+            self,
+            src: Path,
+            dst: Path
+        ) -> None :
+        """
+        Suit un fichier déplacé : taille et mtime sont conservés par un déplacement.
+        """
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO metadata SELECT ?, size, mtime_ns, lat, lon, date, hash FROM metadata WHERE path = ?",
+            (_key(dst), _key(src))
+        )
+        self.conn.execute("DELETE FROM metadata WHERE path = ?", (_key(src),))
+        self._autocommit()
+
+    def copy(
+            self,
+            src: Path,
+            dst: Path
+        ) -> None :
+        """
+        Copie ou lien : la destination a le même contenu et les mêmes dates que la source.
+        """
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO metadata SELECT ?, size, mtime_ns, lat, lon, date, hash FROM metadata WHERE path = ?",
+            (_key(dst), _key(src))
+        )
+        self._autocommit()
+
+    # endregion
+
+    # region |---| Maintenance
+
+    def prune(self) -> int :
+        """
+        Supprime les entrées dont le fichier n'existe plus. Renvoie le nombre d'entrées supprimées.
+        """
+
+        missing = [
+            (path,) for (path,) in self.conn.execute("SELECT path FROM metadata")
+            if not os.path.exists(path)
+        ]
+        self.conn.executemany("DELETE FROM metadata WHERE path = ?", missing)
+        self.commit()
+        self.conn.execute("VACUUM")
+
+        return len(missing)
+
+    def clear(self) -> None :
+
+        self.conn.execute("DELETE FROM metadata")
+        self.commit()
+        self.conn.execute("VACUUM")
+
+    def __len__(self) -> int :
+        return self.conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+
+    # endregion
+
+    # region |---| Transactions
+
+    def _autocommit(self) -> None :
+
+        self._pending += 1
+        if self._pending >= METADATA_CACHE_COMMIT_EVERY :
+            self.commit()
+
+    def commit(self) -> None :
+
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self) -> None :
+
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self) -> "MetadataCache" :
+        return self
+
+    def __exit__(self, *exc) -> None :
+        self.close()
+
+    # endregion
+
+
+def _key(path: Path) -> str :
+    return os.path.abspath(path)
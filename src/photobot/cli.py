@@ -2,8 +2,45 @@ import sys
 import subprocess
 from pathlib import Path
 import argparse
-from photobot.sort import sort_medias
-from photobot.parameters import SRC_PATH
+from photobot.parameters import (
+    SRC_PATH,
+    JOURNAL_FSYNC_EVERY,
+    WATCH_DEBOUNCE,
+    WATCH_POLL_INTERVAL,
+    COPY_WORKERS,
+    IO_CONCURRENCY,
+    CLUSTER_EPS_DAYS
+)
+
+def add_placement_arguments(parser: argparse.ArgumentParser) -> None :
+
+    parser.add_argument(
+        "--mode",
+        choices=["move", "copy", "hardlink", "symlink", "reflink"],
+        default="move",
+        help="Placement des fichiers : déplacement, copie, lien physique, lien symbolique ou clone (Btrfs/XFS)"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Vérifie le hash de chaque copie"
+    )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=COPY_WORKERS,
+        help="Nombre de threads pour les copies"
+    )
+    parser.add_argument(
+        "--async-io",
+        type=int,
+        nargs="?",
+        const=IO_CONCURRENCY,
+        default=0,
+        metavar="N",
+        help=f"Mode asynchrone pour les NAS (SMB/NFS) : N opérations sur les fichiers en cours à la fois (défaut : {IO_CONCURRENCY})"
+    )
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -27,6 +64,113 @@ def main():
     )
     sort_parser.add_argument("source", type=Path, help="Dossier source")
     sort_parser.add_argument("destination", type=Path, help="Dossier destination")
+    sort_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Nombre de processus pour l'extraction des métadonnées"
+    )
+    sort_parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=1,
+        help="Nombre de threads pour parcourir les dossiers (utile sur NAS)"
+    )
+    sort_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Relit les métadonnées de tous les fichiers sans utiliser le cache"
+    )
+    sort_parser.add_argument(
+        "--verify-hash",
+        action="store_true",
+        help="Revalide les entrées du cache par le hash du contenu"
+    )
+    sort_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Calcule le manifeste des déplacements sans déplacer les fichiers"
+    )
+    sort_parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="Fichier où écrire le manifeste (source -> destination)"
+    )
+    sort_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reprend un tri interrompu à partir de son journal"
+    )
+    sort_parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Recommence un tri interrompu depuis le début, en écrasant son journal"
+    )
+    sort_parser.add_argument(
+        "--fsync-every",
+        type=int,
+        default=JOURNAL_FSYNC_EVERY,
+        help="Nombre d'entrées du journal écrites entre deux fsync"
+    )
+    sort_parser.add_argument(
+        "--dedup",
+        choices=["skip", "hardlink"],
+        default=None,
+        help="Doublons (même contenu) : laissés dans la source, ou liés à l'original dans la destination"
+    )
+    sort_parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="Fichier où écrire les métriques du tri (JSON, ou Prometheus si extension .prom)"
+    )
+    sort_parser.add_argument(
+        "--metrics-format",
+        choices=["auto", "json", "prometheus"],
+        default="auto",
+        help="Format du fichier de métriques"
+    )
+    add_placement_arguments(sort_parser)
+
+    # --- Sous-commande : watch ---
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help="Trie en continu les médias qui arrivent dans un dossier"
+    )
+    watch_parser.add_argument("source", type=Path, help="Dossier surveillé")
+    watch_parser.add_argument("destination", type=Path, help="Dossier destination")
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=WATCH_DEBOUNCE,
+        help="Secondes de taille stable avant de trier un fichier"
+    )
+    watch_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Parcours périodique au lieu d'inotify (partages réseau...)"
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=WATCH_POLL_INTERVAL,
+        help="Secondes entre deux parcours en mode --poll"
+    )
+    watch_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="N'utilise pas le cache des métadonnées"
+    )
+
+    # --- Sous-commande : apply ---
+    apply_parser = subparsers.add_parser(
+        "apply",
+        help="Exécute un manifeste produit par sort --dry-run"
+    )
+    apply_parser.add_argument("manifest", type=Path, help="Fichier manifeste")
+    add_placement_arguments(apply_parser)
 
     # --- Sous-commande : map ---
     map_parser = subparsers.add_parser(
@@ -41,6 +185,50 @@ def main():
         help="Ouvre la liste des groupes par date"
     )
 
+    # --- Sous-commande : suggest ---
+    suggest_parser = subparsers.add_parser(
+        "suggest",
+        help="Suggère des groupes de lieu à partir des médias du cache"
+    )
+    suggest_parser.add_argument(
+        "--shape",
+        choices=["circle", "polygone"],
+        default="circle",
+        help="Forme des groupes suggérés"
+    )
+    suggest_parser.add_argument(
+        "--eps-days",
+        type=float,
+        default=CLUSTER_EPS_DAYS,
+        help="Fenêtre de temps (jours) : seuls les médias pris à moins de eps-days d'intervalle sont voisins"
+    )
+    suggest_parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Recalcule les clusters de tout le cache (après des suppressions)"
+    )
+    suggest_parser.add_argument(
+        "--add",
+        action="store_true",
+        help="Ajoute les suggestions aux groupes dessinés"
+    )
+
+    # --- Sous-commande : cache ---
+    cache_parser = subparsers.add_parser(
+        "cache",
+        help="Entretien du cache des métadonnées"
+    )
+    cache_parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Supprime les entrées des fichiers qui n'existent plus"
+    )
+    cache_parser.add_argument(
+        "--clear",
+        action="store_true",
+        help="Vide entièrement le cache"
+    )
+
     args = parser.parse_args()
 
     # --- Traitement des commandes ---
@@ -49,9 +237,73 @@ def main():
             print(f"❌ Dossier {args.source} introuvable.")
             sys.exit(1)
 
-        sort_medias(args.source, args.destination, recursive=args.recursive)
+        # Imports locaux : seules les commandes qui en ont besoin chargent shapely, exifread...
+        from photobot.sort import sort_medias
+
+        if args.resume and args.restart :
+            print("❌ --resume et --restart sont incompatibles.")
+            sys.exit(1)
+
+        try :
+            sort_medias(
+                args.source,
+                args.destination,
+                recursive=args.recursive,
+                jobs=args.jobs,
+                use_cache=not args.no_cache,
+                verify_hash=args.verify_hash,
+                discovery_workers=args.scan_workers,
+                dry_run=args.dry_run,
+                manifest_path=args.manifest,
+                resume=args.resume,
+                restart=args.restart,
+                fsync_every=args.fsync_every,
+                dedup=args.dedup,
+                mode=args.mode,
+                verify=args.verify,
+                copy_workers=args.copy_workers,
+                metrics_path=args.metrics,
+                metrics_format=args.metrics_format,
+                io_concurrency=args.async_io
+            )
+        except FileExistsError as e :
+            print(f"❌ {e}")
+            sys.exit(1)
         print("✅ Tri terminé avec succès !")
 
+    elif args.command == "watch":
+        if not args.source.exists():
+            print(f"❌ Dossier {args.source} introuvable.")
+            sys.exit(1)
+
+        from photobot.watch import watch_medias
+
+        watch_medias(
+            args.source,
+            args.destination,
+            recursive=args.recursive,
+            use_cache=not args.no_cache,
+            debounce=args.debounce,
+            polling=args.poll,
+            poll_interval=args.poll_interval
+        )
+
+    elif args.command == "apply":
+        if not args.manifest.exists():
+            print(f"❌ Manifeste {args.manifest} introuvable.")
+            sys.exit(1)
+
+        from photobot.sort import apply_manifest
+
+        apply_manifest(
+            args.manifest,
+            mode=args.mode,
+            verify=args.verify,
+            copy_workers=args.copy_workers,
+            io_concurrency=args.async_io
+        )
+        print("✅ Manifeste appliqué avec succès !")
+
     elif args.command == "map":
         if not args.source.exists():
             print(f"❌ Dossier {args.source} introuvable.")
@@ -66,6 +318,47 @@ def main():
             "-r" if args.recursive else ""
         ])
     
+    elif args.command == "suggest" :
+        import json
+        from photobot.parameters import DRAWN_GROUP_DATA_PATH
+        from photobot.groups import save_drawn_groups
+        from photobot.clusters import update_clusters, suggest_groups
+
+        existing_groups = []
+        if DRAWN_GROUP_DATA_PATH.exists() :
+            with open(DRAWN_GROUP_DATA_PATH, "r", encoding="utf-8") as f :
+                existing_groups = json.load(f).get("groups", [])
+
+        index, added, updated = update_clusters(eps_days=args.eps_days, rebuild=args.rebuild)
+        print(f"Clusters : {added} new medias, {updated} cells updated, {len(index)} medias in total")
+
+        suggestions = suggest_groups(index, existing_groups, shape=args.shape)
+        for g in suggestions :
+            if g["type"] == "circle" :
+                print(f"• {g['nom']} : {g['latitude']:.5f}, {g['longitude']:.5f} ({g['rayon_km']:.2f} km)")
+            else :
+                print(f"• {g['nom']} : polygone de {len(g['coordinates']) - 1} sommets")
+
+        if args.add and suggestions :
+            existing_ids = {g.get("id") for g in existing_groups}
+            new_groups = [g for g in suggestions if g["id"] not in existing_ids]
+            save_drawn_groups(existing_groups + new_groups)
+            print(f"✅ {len(new_groups)} groupes ajoutés à {DRAWN_GROUP_DATA_PATH.name}")
+        elif not suggestions :
+            print("Aucun nouveau lieu fréquent.")
+
+    elif args.command == "cache" :
+        from photobot.cache import MetadataCache
+
+        with MetadataCache() as cache :
+            if args.clear :
+                cache.clear()
+                print("✅ Cache vidé.")
+            elif args.prune :
+                removed = cache.prune()
+                print(f"✅ {removed} entrées supprimées.")
+            print(f"{len(cache)} entrées dans le cache.")
+
     elif args.command == "date" :
         subprocess.run([
             "streamlit",
@@ -0,0 +1,801 @@
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+import itertools
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+import shapely
+from photobot.parameters import (
+    METADATA_CACHE_PATH,
+    CLUSTERS_PATH,
+    CLUSTER_EPS_KM,
+    CLUSTER_EPS_DAYS,
+    CLUSTER_MIN_POINTS,
+    CLUSTER_MIN_SIZE,
+    CLUSTER_COVERED_RATIO,
+    CLUSTER_CHUNK_CELLS,
+    CLUSTER_CHUNK_PAIRS,
+    CLUSTER_PAIR_LIMIT,
+    CLUSTER_LINK_SAMPLE
+)
+from photobot.groups import (
+    GroupIndex,
+    haversine_array,
+    normalize_lon_array
+)
+
+
+# Rayon terrestre (km), comme utils.haversine
+R = 6371.
+
+# Coordonnées de cellule empaquetées dans un int64 : 21 bits par axe (x, y, z),
+# moins avec une fenêtre de temps, dont la tranche prend les bits restants
+KEY_BITS = 21
+TIME_MIN_BITS = 8
+
+# Origine des dates (jours), et date des médias sans date : jamais à moins de eps_days d'une vraie date
+DAYS_ORIGIN = np.datetime64("2000-01-01", "s")
+UNDATED_DAYS = 1e12
+
+# A incrémenter quand le contenu de l'état sauvegardé change
+CLUSTERS_VERSION = 1
+
+
+# region GRILLE
+
+def to_xyz(
+        lats: np.ndarray,
+        lons: np.ndarray
+    ) -> np.ndarray :
+    """
+    Points sur la sphère en coordonnées cartésiennes (km) : la distance
+    euclidienne (corde) y est quasi égale à la distance haversine pour
+    quelques km, sans cas particulier à l'antiméridien ni aux pôles.
+    """
+
+    lats = np.radians(lats)
+    lons = np.radians(lons)
+    cos_lats = np.cos(lats)
+
+    return R * np.stack([cos_lats * np.cos(lons), cos_lats * np.sin(lons), np.sin(lats)], axis=1)
+
+
+def to_days(dates: np.ndarray) -> np.ndarray :
+    """
+    Dates en jours (flottants) depuis DAYS_ORIGIN, NaN pour une date absente.
+    """
+
+    return (dates.astype("datetime64[s]") - DAYS_ORIGIN) / np.timedelta64(1, "D")
+
+
+def _pack(
+        cells: np.ndarray,
+        bits: int=KEY_BITS
+    ) -> np.ndarray :
+
+    cells = cells.astype(np.int64) + (1 << (bits - 1))
+    return (cells[:, 0] << (2 * bits)) | (cells[:, 1] << bits) | cells[:, 2]
+
+
+def _neighbour_deltas(
+        bits: int=KEY_BITS,
+        time_bits: int=0
+    ) -> np.ndarray :
+    """
+    Décalages (empaquetés) des cellules pouvant contenir un point à moins de eps.
+    Une cellule a pour côté eps / sqrt(3) : deux points d'une même cellule sont
+    toujours voisins, et un voisin est au plus à deux cellules sur chaque axe.
+    Avec une tranche de temps (de largeur eps_days), un voisin est au plus
+    dans la tranche d'avant ou d'après.
+    """
+
+    offsets = [
+        o for o in itertools.product(range(-2, 3), repeat=3)
+        if sum(max(abs(c) - 1, 0) ** 2 for c in o) < 3
+    ]
+
+    # L'empaquetage est linéaire tant que les coordonnées restent dans leur plage
+    offsets = np.array(offsets, dtype=np.int64)
+    deltas = (offsets[:, 0] << (2 * bits)) + (offsets[:, 1] << bits) + offsets[:, 2]
+
+    if time_bits :
+        deltas = ((deltas << time_bits)[:, None] + np.arange(-1, 2, dtype=np.int64)[None, :]).ravel()
+
+    return deltas
+
+
+def _chunks(
+        array: np.ndarray,
+        size: int=CLUSTER_CHUNK_CELLS
+    ) -> Iterator[np.ndarray] :
+
+    for start in range(0, len(array), size) :
+        yield array[start:start + size]
+
+
+def _chunks_by_weight(
+        array: np.ndarray,
+        weights: np.ndarray,
+        budget: int=CLUSTER_CHUNK_PAIRS
+    ) -> Iterator[np.ndarray] :
+    """
+    Morceaux consécutifs de array dont la somme des poids reste sous budget
+    (sauf élément seul plus lourd).
+    """
+
+    cumulated = np.cumsum(weights)
+    start = 0
+    while start < len(array) :
+        base = cumulated[start - 1] if start else 0
+        end = max(int(np.searchsorted(cumulated, base + budget, side="right")), start + 1)
+        yield array[start:end]
+        start = end
+
+
+def _ragged(
+        starts: np.ndarray,
+        counts: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray] :
+    """
+    Concatène les plages [starts[i], starts[i] + counts[i]) : renvoie pour chaque
+    élément l'indice i de sa plage et sa valeur.
+    """
+
+    owners = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return owners, np.repeat(starts, counts) + offsets
+
+# endregion
+
+
+# region DBSCAN
+
+class ClusterIndex :
+    """
+    DBSCAN sur une grille de hachage (cellules de côté eps / sqrt(3)) :
+    - une cellule d'au moins min_points points n'a que des points cœurs,
+      sans aucun calcul de distance ;
+    - ailleurs, les voisins d'un point ne sont cherchés que dans les cellules
+      voisines ;
+    - les clusters sont les composantes connexes des cellules à points cœurs
+      (union-find), deux cellules étant liées si deux de leurs points cœurs
+      sont à moins de eps.
+
+    Avec eps_days, deux points ne sont voisins que s'ils sont aussi à moins
+    de eps_days l'un de l'autre (ST-DBSCAN) : la grille a un 4e axe, des
+    tranches de temps de eps_days, et les mêmes règles s'appliquent aux
+    cellules (x, y, z, tranche). Les médias sans date (ou datés hors de la
+    plage de la grille) ne sont voisins que d'autres médias sans date.
+    Sans eps_days, le voisinage est seulement spatial.
+
+    L'ajout de points est incrémental : seuls les points proches des nouveaux
+    peuvent devenir cœurs, et seules les cellules qui gagnent des points
+    cœurs créent de nouveaux liens. Un ajout ne fait que grossir ou fusionner
+    des clusters : l'union-find existant reste valide.
+    """
+
+    def __init__(
+            self,
+            eps_km: float=CLUSTER_EPS_KM,
+            min_points: int=CLUSTER_MIN_POINTS,
+            eps_days: float|None=CLUSTER_EPS_DAYS
+        ) -> None :
+
+        self.eps_km = eps_km
+        self.eps_days = eps_days
+        self.min_points = min_points
+        self.side = eps_km / np.sqrt(3)
+
+        # Bits par axe : juste assez pour la sphère, le reste pour la tranche de temps
+        if eps_days is None :
+            self.bits, self.time_bits = KEY_BITS, 0
+        else :
+            self.bits = int(np.ceil(np.log2(2 * (R / self.side + 3))))
+            self.time_bits = 63 - 3 * self.bits
+            if self.time_bits < TIME_MIN_BITS :
+                raise ValueError(f"Rayon trop petit pour une fenêtre de temps : {eps_km} km")
+        self.deltas = _neighbour_deltas(self.bits, self.time_bits)
+
+        self.lats = np.empty(0, dtype=np.float64)
+        self.lons = np.empty(0, dtype=np.float64)
+        self.dates = np.empty(0, dtype="datetime64[s]")
+        self.days = np.empty(0, dtype=np.float64)
+        self.xyz = np.empty((0, 3), dtype=np.float64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.core = np.empty(0, dtype=bool)
+
+        # Union-find des cellules à points cœurs (clé de cellule -> parent)
+        self.parent: dict[int, int] = {}
+
+        # Suivi de l'import incrémental depuis le cache des métadonnées
+        self.last_rowid = 0
+        self.identities = np.empty(0, dtype=np.int64)
+
+        self._index_cells()
+
+    def __len__(self) -> int :
+        return len(self.keys)
+
+    # region |---| Cellules
+
+    def _keys(
+            self,
+            xyz: np.ndarray,
+            dates: np.ndarray
+        ) -> tuple[np.ndarray, np.ndarray] :
+        """
+        Clés de cellule de points, et leurs dates en jours (UNDATED_DAYS sans
+        date, avec une fenêtre de temps).
+        """
+
+        keys = _pack(np.floor(xyz / self.side), self.bits)
+        days = to_days(dates)
+        if not self.time_bits :
+            return keys, days
+
+        # Tranches -half + 4 à half - 4 ; tranche half - 2 pour les médias sans date.
+        # Les tranches voisines (+-1) restent ainsi dans le champ
+        half = 1 << (self.time_bits - 1)
+        slices = np.floor(days / self.eps_days)
+        undated = ~(np.abs(slices) <= half - 4)
+        days = np.where(undated, UNDATED_DAYS, days)
+        slices = np.where(undated, half - 2, slices).astype(np.int64) + half
+
+        return (keys << self.time_bits) | slices, days
+
+    def _index_cells(self) -> None :
+        """
+        Points triés par cellule : chaque cellule est une plage de self.order.
+        """
+
+        self.order = np.argsort(self.keys, kind="stable")
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            self.keys[self.order], return_index=True, return_counts=True
+        )
+
+        # Cellule de chaque point
+        self.point_cells = np.empty(len(self.keys), dtype=np.int64)
+        self.point_cells[self.order] = np.repeat(np.arange(len(self.cell_keys)), self.cell_counts)
+
+    def _find_cells(self, keys: np.ndarray) -> np.ndarray :
+        """
+        Indices des cellules de clés keys, -1 pour une cellule vide.
+        """
+
+        if len(self.cell_keys) == 0 :
+            return np.full(len(keys), -1, dtype=np.int64)
+
+        idx = np.searchsorted(self.cell_keys, keys)
+        idx = np.minimum(idx, len(self.cell_keys) - 1)
+        found = self.cell_keys[idx] == keys
+
+        return np.where(found, idx, -1)
+
+    def _neighbour_matrices(self, cells: np.ndarray) -> Iterator[np.ndarray] :
+        """
+        Cellules voisines (-1 si vide), une ligne par cellule, par morceaux de cells.
+        """
+
+        for chunk in _chunks(cells) :
+            yield self._find_cells(self.cell_keys[chunk][:, None] + self.deltas[None, :])
+
+    # endregion
+
+    # region |---| Union-find
+
+    def _find(self, key: int) -> int :
+
+        parent = self.parent
+        while parent[key] != key :
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+
+        return key
+
+    def _union(
+            self,
+            a: int,
+            b: int
+        ) -> None :
+
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b :
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def _close(
+            self,
+            p: np.ndarray,
+            q: np.ndarray
+        ) -> np.ndarray :
+        """
+        Pour chaque couple (p[i], q[i]), vrai si les points sont voisins :
+        à moins de eps_km, et de eps_days s'il y a une fenêtre de temps.
+        p et q peuvent aussi être diffusés l'un contre l'autre.
+        """
+
+        within = ((self.xyz[p] - self.xyz[q]) ** 2).sum(axis=-1) <= self.eps_km ** 2
+        if self.eps_days is not None :
+            within &= np.abs(self.days[p] - self.days[q]) <= self.eps_days
+
+        return within
+
+    def _within_eps(
+            self,
+            a: np.ndarray,
+            b: np.ndarray
+        ) -> bool :
+        """
+        Vrai si un point de a est voisin d'un point de b.
+        """
+
+        eps = self.eps_km
+        xyz_a = self.xyz[a]
+        xyz_b = self.xyz[b]
+
+        # Seuls les points proches de la boîte de l'autre ensemble peuvent se toucher
+        a = a[np.all((xyz_a >= xyz_b.min(axis=0) - eps) & (xyz_a <= xyz_b.max(axis=0) + eps), axis=1)]
+        xyz_a = self.xyz[a]
+        b = b[np.all((xyz_b >= xyz_a.min(axis=0, initial=np.inf) - eps) & (xyz_b <= xyz_a.max(axis=0, initial=-np.inf) + eps), axis=1)]
+        if len(a) == 0 or len(b) == 0 :
+            return False
+
+        # Par morceaux, avec sortie dès le premier couple trouvé
+        chunk = max(1, 1_000_000 // len(b))
+        for start in range(0, len(a), chunk) :
+            if self._close(a[start:start + chunk, None], b[None, :]).any() :
+                return True
+
+        return False
+
+    # endregion
+
+    # region |---| Ajout
+
+    def _update_core(
+            self,
+            cells: np.ndarray,
+            nb: np.ndarray
+        ) -> None :
+        """
+        Compte les voisins des points non cœurs de cells
+        (nb : leurs cellules voisines), en une passe vectorisée.
+        """
+
+        rows, positions = _ragged(self.cell_starts[cells], self.cell_counts[cells])
+        candidates = self.order[positions]
+        pending = ~self.core[candidates]
+        candidates, rows = candidates[pending], rows[pending]
+
+        # Couples (candidat, cellule voisine), puis (candidat, point voisin)
+        cand_rows, cols = np.nonzero(nb[rows] >= 0)
+        neighbour_cells = nb[rows[cand_rows], cols]
+        owners, positions = _ragged(self.cell_starts[neighbour_cells], self.cell_counts[neighbour_cells])
+        p = candidates[cand_rows[owners]]
+        q = self.order[positions]
+
+        within = self._close(p, q)
+        points, counts = np.unique(p[within], return_counts=True)
+        self.core[points[counts >= self.min_points]] = True
+
+    def _link(self, new_core_cells: np.ndarray) -> None :
+        """
+        Relie (union-find) chaque cellule de new_core_cells à ses cellules voisines
+        à points cœurs, si deux de leurs points cœurs sont voisins.
+        """
+
+        if len(new_core_cells) == 0 :
+            return
+
+        n_cells = len(self.cell_keys)
+
+        # Points cœurs triés par cellule
+        core_points = np.flatnonzero(self.core)
+        core_points = core_points[np.argsort(self.point_cells[core_points], kind="stable")]
+        core_counts = np.bincount(self.point_cells[core_points], minlength=n_cells)
+        core_starts = np.cumsum(core_counts) - core_counts
+
+        is_new = np.zeros(n_cells, dtype=bool)
+        is_new[new_core_cells] = True
+
+        for cells, nb in zip(_chunks(new_core_cells), self._neighbour_matrices(new_core_cells)) :
+            rows, cols = np.nonzero((nb >= 0) & (nb != cells[:, None]))
+            a, b = cells[rows], nb[rows, cols]
+
+            # Cellules voisines à points cœurs, chaque couple de nouvelles cellules une seule fois
+            keep = (core_counts[b] > 0) & ~(is_new[b] & (b < a))
+            a, b = a[keep], b[keep]
+            count_a, count_b = core_counts[a], core_counts[b]
+
+            # 1er passage sur un échantillon de chaque cellule : dans une zone dense,
+            # presque tous les couples sont reliés dès ce passage
+            sample_a = np.minimum(count_a, CLUSTER_LINK_SAMPLE)
+            sample_b = np.minimum(count_b, CLUSTER_LINK_SAMPLE)
+            linked = self._pairs_within(core_points, core_starts[a], sample_a, core_starts[b], sample_b)
+            self._union_cells(a[linked], b[linked])
+
+            # 2e passage complet, seulement pour les couples non échantillonnés en entier
+            # et pas encore dans le même cluster
+            undecided = np.flatnonzero(~linked & ((sample_a < count_a) | (sample_b < count_b)))
+            undecided = undecided[[
+                self._find(key_a) != self._find(key_b)
+                for key_a, key_b in zip(self.cell_keys[a[undecided]].tolist(), self.cell_keys[b[undecided]].tolist())
+            ]] if len(undecided) else undecided
+
+            sizes = count_a[undecided] * count_b[undecided]
+            small = undecided[sizes <= CLUSTER_PAIR_LIMIT]
+            linked = self._pairs_within(core_points, core_starts[a[small]], count_a[small], core_starts[b[small]], count_b[small])
+            self._union_cells(a[small][linked], b[small][linked])
+
+            # Gros couples : un par un, avec sortie au premier couple de points trouvé
+            for i in undecided[sizes > CLUSTER_PAIR_LIMIT] :
+                key_a, key_b = int(self.cell_keys[a[i]]), int(self.cell_keys[b[i]])
+                if self._find(key_a) == self._find(key_b) :
+                    continue
+                points_a = core_points[core_starts[a[i]]:core_starts[a[i]] + count_a[i]]
+                points_b = core_points[core_starts[b[i]]:core_starts[b[i]] + count_b[i]]
+                if self._within_eps(points_a, points_b) :
+                    self._union(key_a, key_b)
+
+    def _pairs_within(
+            self,
+            points: np.ndarray,
+            starts_a: np.ndarray,
+            counts_a: np.ndarray,
+            starts_b: np.ndarray,
+            counts_b: np.ndarray
+        ) -> np.ndarray :
+        """
+        Pour chaque couple de plages de points, vrai si un point de l'une est
+        voisin d'un point de l'autre (tous les couples de points, par lots).
+        """
+
+        linked = np.zeros(len(counts_a), dtype=bool)
+        sizes = counts_a * counts_b
+
+        for chunk in _chunks_by_weight(np.arange(len(sizes)), sizes) :
+            pairs, k = _ragged(np.zeros(len(chunk), dtype=np.int64), sizes[chunk])
+            count_b = counts_b[chunk][pairs]
+            p = points[starts_a[chunk][pairs] + k // count_b]
+            q = points[starts_b[chunk][pairs] + k % count_b]
+            within = self._close(p, q)
+            linked[chunk[np.unique(pairs[within])]] = True
+
+        return linked
+
+    def _union_cells(
+            self,
+            cells_a: np.ndarray,
+            cells_b: np.ndarray
+        ) -> None :
+
+        for key_a, key_b in zip(self.cell_keys[cells_a].tolist(), self.cell_keys[cells_b].tolist()) :
+            self._union(key_a, key_b)
+
+    def add(
+            self,
+            lats: np.ndarray,
+            lons: np.ndarray,
+            dates: np.ndarray
+        ) -> int :
+        """
+        Ajoute des points et met à jour les clusters. Renvoie le nombre de cellules recalculées.
+        """
+
+        lats = np.asarray(lats, dtype=np.float64)
+        if len(lats) == 0 :
+            return 0
+
+        dates = np.asarray(dates, dtype="datetime64[s]")
+        xyz = to_xyz(lats, np.asarray(lons, dtype=np.float64))
+        new_keys, days = self._keys(xyz, dates)
+
+        self.lats = np.concatenate([self.lats, lats])
+        self.lons = np.concatenate([self.lons, lons])
+        self.dates = np.concatenate([self.dates, dates])
+        self.days = np.concatenate([self.days, days])
+        self.xyz = np.concatenate([self.xyz, xyz])
+        self.keys = np.concatenate([self.keys, new_keys])
+        self.core = np.concatenate([self.core, np.zeros(len(lats), dtype=bool)])
+        self._index_cells()
+
+        # Cellules où un point peut avoir gagné des voisins
+        new_cells = np.unique(self._find_cells(np.unique(new_keys)))
+        touched = np.unique(np.concatenate([
+            nb[nb >= 0] for nb in self._neighbour_matrices(new_cells)
+        ]))
+
+        # Points cœurs : seuls les points non cœurs des cellules touchées sont recalculés.
+        # Cellule dense : tous ses points sont cœurs
+        was_core = self.core.copy()
+        is_dense = np.zeros(len(self.cell_keys), dtype=bool)
+        is_dense[touched[self.cell_counts[touched] >= self.min_points]] = True
+        self.core |= is_dense[self.point_cells]
+
+        # Cellule clairsemée : distances seulement si son voisinage compte assez de points
+        sparse = touched[self.cell_counts[touched] < self.min_points]
+        for cells, nb in zip(_chunks(sparse), self._neighbour_matrices(sparse)) :
+            enough = np.where(nb >= 0, self.cell_counts[nb], 0).sum(axis=1) >= self.min_points
+            self._update_core(cells[enough], nb[enough])
+
+        new_core_cells = np.unique(self.point_cells[self.core & ~was_core])
+        for key in self.cell_keys[new_core_cells].tolist() :
+            self.parent.setdefault(key, key)
+
+        # Liens : seules les cellules qui ont gagné des points cœurs en créent
+        self._link(new_core_cells)
+
+        return len(touched)
+
+    # endregion
+
+    # region |---| Clusters
+
+    def clusters(self) -> list[np.ndarray] :
+        """
+        Points cœurs de chaque cluster, du plus grand au plus petit.
+        Les points de bordure sont couverts par la marge de eps des suggestions.
+        """
+
+        core = np.flatnonzero(self.core)
+        if len(core) == 0 :
+            return []
+
+        core_cells, cells = np.unique(self._find_cells(self.keys[core]), return_inverse=True)
+        roots = np.array([self._find(int(self.cell_keys[c])) for c in core_cells], dtype=np.int64)
+        labels = roots[cells.ravel()]
+
+        order = np.argsort(labels, kind="stable")
+        _, starts = np.unique(labels[order], return_index=True)
+        clusters = np.split(core[order], starts[1:])
+
+        return sorted(clusters, key=len, reverse=True)
+
+    # endregion
+
+    # region |---| Sauvegarde
+
+    def save(self, path: Path=CLUSTERS_PATH) -> None :
+
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as f :
+            pickle.dump({
+                "version": CLUSTERS_VERSION,
+                "eps_km": self.eps_km,
+                "eps_days": self.eps_days,
+                "min_points": self.min_points,
+                "lats": self.lats,
+                "lons": self.lons,
+                "dates": self.dates,
+                "core": self.core,
+                "parent": self.parent,
+                "last_rowid": self.last_rowid,
+                "identities": self.identities
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(
+            cls,
+            path: Path=CLUSTERS_PATH,
+            eps_km: float=CLUSTER_EPS_KM,
+            min_points: int=CLUSTER_MIN_POINTS,
+            eps_days: float|None=CLUSTER_EPS_DAYS
+        ) -> "ClusterIndex" :
+        """
+        Etat sauvegardé, ou index vide s'il est absent, illisible ou
+        calculé avec d'autres paramètres.
+        """
+
+        index = cls(eps_km, min_points, eps_days)
+
+        try :
+            with open(path, "rb") as f :
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) :
+            return index
+
+        if (
+            state.get("version") != CLUSTERS_VERSION
+            or state["eps_km"] != eps_km
+            or state.get("eps_days") != eps_days
+            or state["min_points"] != min_points
+        ) :
+            return index
+
+        index.lats = state["lats"]
+        index.lons = state["lons"]
+        index.dates = state["dates"]
+        index.core = state["core"]
+        index.parent = state["parent"]
+        index.last_rowid = state["last_rowid"]
+        index.identities = state["identities"]
+
+        # Coordonnées et cellules recalculées plutôt que stockées
+        index.xyz = to_xyz(index.lats, index.lons)
+        index.keys, index.days = index._keys(index.xyz, index.dates)
+        index._index_cells()
+
+        return index
+
+    # endregion
+
+# endregion
+
+
+# region IMPORT
+
+def _identity(row: tuple) -> int :
+    """
+    Identité d'un média indépendante de son chemin (taille, mtime, position,
+    date) : un média déplacé par le tri n'est pas compté deux fois.
+    """
+
+    digest = hashlib.blake2b(repr(row).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def update_clusters(
+        cache_path: Path=METADATA_CACHE_PATH,
+        state_path: Path=CLUSTERS_PATH,
+        eps_km: float=CLUSTER_EPS_KM,
+        min_points: int=CLUSTER_MIN_POINTS,
+        eps_days: float|None=CLUSTER_EPS_DAYS,
+        rebuild: bool=False
+    ) -> tuple[ClusterIndex, int, int] :
+    """
+    Ajoute aux clusters les médias géolocalisés entrés dans le cache des
+    métadonnées depuis la dernière mise à jour. Avec rebuild, ou si les
+    paramètres ont changé, tout est recalculé (à faire après des suppressions).
+    Renvoie (index, médias ajoutés, cellules recalculées).
+    """
+
+    if rebuild :
+        index = ClusterIndex(eps_km, min_points, eps_days)
+    else :
+        index = ClusterIndex.load(state_path, eps_km, min_points, eps_days)
+
+    conn = sqlite3.connect(cache_path)
+    try :
+        # Cache vidé depuis : les rowid repartent de zéro
+        max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM metadata").fetchone()[0]
+        if max_rowid < index.last_rowid :
+            index.last_rowid = 0
+
+        rows = conn.execute(
+            "SELECT rowid, size, mtime_ns, lat, lon, date FROM metadata WHERE rowid > ? AND lat IS NOT NULL AND lon IS NOT NULL",
+            (index.last_rowid,)
+        ).fetchall()
+    except sqlite3.OperationalError :
+        rows = []
+    finally :
+        conn.close()
+
+    added = 0
+    updated = 0
+    if rows :
+        index.last_rowid = max(index.last_rowid, max(row[0] for row in rows))
+
+        identities = np.fromiter((_identity(row[1:]) for row in rows), dtype=np.int64, count=len(rows))
+        identities, first = np.unique(identities, return_index=True)
+        is_new = ~np.isin(identities, index.identities)
+        new_rows = [rows[i] for i in first[is_new]]
+
+        # Coordonnées (0, 0) : position absente, comme sur la carte
+        new_rows = [row for row in new_rows if row[3] and row[4]]
+
+        index.identities = np.union1d(index.identities, identities[is_new])
+
+        # Heure locale de prise de vue, décalage "+hh:mm" ignoré (pas de conversion en UTC), comme sur la carte
+        dates = np.array(
+            [np.datetime64(row[5][:19]) if row[5] else np.datetime64("NaT") for row in new_rows],
+            dtype="datetime64[s]"
+        )
+        updated = index.add(
+            np.array([row[3] for row in new_rows], dtype=np.float64),
+            np.array([row[4] for row in new_rows], dtype=np.float64),
+            dates
+        )
+        added = len(new_rows)
+
+    index.save(state_path)
+
+    return index, added, updated
+
+# endregion
+
+
+# region SUGGESTIONS
+
+def _local_xy(
+        lats: np.ndarray,
+        lons: np.ndarray,
+        lat0: float,
+        lon0: float
+    ) -> np.ndarray :
+    """
+    Projection locale (km) autour de (lat0, lon0), pour les contours.
+    """
+
+    dlon = normalize_lon_array(lons - lon0)
+    return np.stack([R * np.radians(dlon) * np.cos(np.radians(lat0)), R * np.radians(lats - lat0)], axis=1)
+
+
+def _period(dates: np.ndarray) -> str|None :
+
+    dates = dates[~np.isnat(dates)]
+    if len(dates) == 0 :
+        return None
+
+    first, last = str(dates.min())[:4], str(dates.max())[:4]
+    return first if first == last else f"{first}-{last}"
+
+
+def suggest_groups(
+        index: ClusterIndex,
+        existing_groups: list[dict],
+        shape: str="circle",
+        min_size: int=CLUSTER_MIN_SIZE
+    ) -> list[dict] :
+    """
+    Groupes candidats (cercles ou polygones, au format de drawn_groups.json)
+    pour les clusters d'au moins min_size médias qui ne sont pas déjà
+    majoritairement couverts par un groupe de lieu existant.
+    """
+
+    location_groups = [g for g in existing_groups if g.get("type") in ("circle", "polygone")]
+    groups_index = GroupIndex(location_groups) if location_groups else None
+
+    suggestions = []
+    for points in index.clusters() :
+        if len(points) < min_size :
+            break
+
+        lats = index.lats[points]
+        lons = index.lons[points]
+
+        if groups_index is not None :
+            covered = groups_index.find_priorities(lats, lons, np.full(len(points), np.datetime64("NaT"))) >= 0
+            if covered.mean() >= CLUSTER_COVERED_RATIO :
+                continue
+
+        # Centre : barycentre sur la sphère
+        center = index.xyz[points].mean(axis=0)
+        lat0 = float(np.degrees(np.arcsin(center[2] / np.linalg.norm(center))))
+        lon0 = float(np.degrees(np.arctan2(center[1], center[0])))
+
+        period = _period(index.dates[points])
+        name = f"Suggestion {len(suggestions) + 1}" + (f" ({period})" if period else "")
+
+        if shape == "circle" :
+            rayon_km = float(haversine_array(lat0, lon0, lats, lons).max()) + index.eps_km
+            geometry = {
+                "type": "circle",
+                "latitude": lat0,
+                "longitude": lon0,
+                "rayon_km": round(rayon_km, 3)
+            }
+
+        else :
+            # Enveloppe convexe élargie de eps, dans le plan local
+            hull = shapely.MultiPoint(_local_xy(lats, lons, lat0, lon0)).convex_hull
+            outline = hull.buffer(index.eps_km, quad_segs=4).simplify(index.eps_km / 10)
+            x, y = np.asarray(outline.exterior.coords).T
+            ring_lats = lat0 + np.degrees(y / R)
+            ring_lons = normalize_lon_array(lon0 + np.degrees(x / (R * np.cos(np.radians(lat0)))))
+            geometry = {
+                "type": "polygone",
+                "coordinates": [[float(lon), float(lat)] for lon, lat in zip(ring_lons, ring_lats)]
+            }
+
+        # Identifiant stable d'une mise à jour à l'autre tant que le cluster ne change pas
+        fid = hashlib.md5(json.dumps(geometry, sort_keys=True).encode("utf-8")).hexdigest()
+        suggestions.append({"nom": name, "id": fid, **geometry})
+
+    return suggestions
+
+# endregion
@@ -0,0 +1,366 @@
+import os
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Iterable, Iterator
+from photobot.parameters import (
+    HASH_INDEX_PATH,
+    DEDUP_PARTIAL_SIZE,
+    METADATA_CACHE_COMMIT_EVERY
+)
+from photobot.discovery import iter_medias
+from photobot.moves import Move
+from photobot.utils import hash_file
+
+
+DEDUP_POLICIES = ("skip", "hardlink")
+
+
+def partial_hash(
+        path: Path,
+        size: int,
+        chunk_size: int=DEDUP_PARTIAL_SIZE
+    ) -> str :
+    """
+    Hash BLAKE2b du début et de la fin du fichier : écarte vite les fichiers
+    de même taille mais différents sans tout lire.
+    """
+
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f :
+        h.update(f.read(chunk_size))
+        if size > 2 * chunk_size :
+            f.seek(-chunk_size, os.SEEK_END)
+        h.update(f.read(chunk_size))
+
+    return h.hexdigest()
+
+
+class HashIndex :
+    """
+    Index persistant (SQLite) du contenu des médias : taille, puis hash partiel
+    et hash complet calculés seulement en cas de collision, et conservés.
+    Les fichiers de la destination n'ont donc à être lus qu'une seule fois.
+    Une entrée est valide tant que la taille et la date de modification n'ont pas changé.
+
+    Seuls les fichiers de la destination y sont conservés. Les médias prévus par
+    le tri en cours sont gardés à part (table temporaire, par destination) et
+    n'entrent dans l'index qu'une fois placés (move / copy).
+    Sans persist (simulation), rien n'est écrit dans path.
+    """
+
+    def __init__(
+            self,
+            path: Path=HASH_INDEX_PATH,
+            persist: bool=True
+        ) -> None :
+
+        self.path = path
+        self.persist = persist
+        self.root = None
+        self.duplicates = 0
+        self._pending = 0
+
+        # Simulation sans index existant : rien à relire, rien à créer sur le disque
+        if not persist and not path.exists() :
+            path = ":memory:"
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                partial TEXT,
+                full TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS hashes_size ON hashes (size)")
+
+        # Médias prévus par ce tri, par destination : path est la destination, src le fichier à lire
+        self.conn.execute("""
+            CREATE TEMP TABLE planned (
+                path TEXT PRIMARY KEY,
+                src TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                partial TEXT,
+                full TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX temp.planned_size ON planned (size)")
+
+    # region |---| Enregistrement
+
+    def add(
+            self,
+            path: Path,
+            stat: os.stat_result|None=None
+        ) -> None :
+        """
+        Enregistre un fichier. Ses hash ne sont calculés qu'en cas de collision de taille.
+        """
+
+        if stat is None :
+            stat = os.stat(path)
+
+        row = self.conn.execute("SELECT size, mtime_ns FROM hashes WHERE path = ?", (_key(path),)).fetchone()
+        if row == (stat.st_size, stat.st_mtime_ns) :
+            return
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, NULL, NULL)",
+            (_key(path), stat.st_size, stat.st_mtime_ns)
+        )
+        self._autocommit()
+
+    def sync(self, root: Path) -> int :
+        """
+        Enregistre les médias de root (la destination) qui ne sont pas encore indexés,
+        sans les lire. Renvoie le nombre de médias parcourus.
+        Seuls les fichiers de root pourront ensuite servir d'original.
+        """
+
+        self.root = _key(root)
+
+        count = 0
+        for count, media in enumerate(iter_medias(root, recursive=True), start=1) :
+            self.add(media.path, media.stat)
+        self.commit()
+
+        return count
+
+    def _place_planned(
+            self,
+            src: Path,
+            dst: Path
+        ) -> bool :
+        """
+        Fait entrer dans l'index un média prévu par ce tri, maintenant placé
+        en dst, avec les hash déjà calculés. Renvoie False s'il n'était pas prévu.
+        """
+
+        placed = self.conn.execute(
+            "INSERT OR REPLACE INTO hashes SELECT path, size, mtime_ns, partial, full FROM temp.planned WHERE path = ? AND src = ?",
+            (_key(dst), _key(src))
+        ).rowcount
+        if placed :
+            self.conn.execute("DELETE FROM temp.planned WHERE path = ?", (_key(dst),))
+
+        return placed > 0
+
+    def move(
+            self,
+            src: Path,
+            dst: Path
+        ) -> None :
+        """
+        Suit un fichier déplacé : son contenu, donc ses hash, ne change pas.
+        """
+
+        if not self._place_planned(src, dst) :
+            self.conn.execute("DELETE FROM hashes WHERE path = ?", (_key(dst),))
+            self.conn.execute("UPDATE hashes SET path = ? WHERE path = ?", (_key(dst), _key(src)))
+        self._autocommit()
+
+    def copy(
+            self,
+            src: Path,
+            dst: Path
+        ) -> None :
+
+        if not self._place_planned(src, dst) :
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hashes SELECT ?, size, mtime_ns, partial, full FROM hashes WHERE path = ?",
+                (_key(dst), _key(src))
+            )
+        self._autocommit()
+
+    # endregion
+
+    # region |---| Recherche
+
+    def _hash(
+            self,
+            table: str,
+            key: str,
+            path: str,
+            size: int,
+            column: str
+        ) -> str :
+        """
+        Hash du fichier path, conservé dans la ligne key de table (hashes ou planned).
+        """
+
+        (value,) = self.conn.execute(f"SELECT {column} FROM {table} WHERE path = ?", (key,)).fetchone()
+        if value is None :
+            try :
+                value = partial_hash(path, size) if column == "partial" else hash_file(path)
+            except FileNotFoundError :
+                if table != "planned" :
+                    raise
+                # Déjà placé (placements asynchrones) : même contenu, à sa destination
+                value = partial_hash(key, size) if column == "partial" else hash_file(key)
+            self.conn.execute(f"UPDATE {table} SET {column} = ? WHERE path = ?", (value, key))
+            self._autocommit()
+
+        return value
+
+    def _candidates(
+            self,
+            path: str,
+            size: int
+        ) -> list[tuple[str, str, str]] :
+        """
+        Originaux possibles de même taille, en (table, clé, fichier à lire) :
+        fichiers de la destination encore présents et inchangés, puis médias
+        prévus plus tôt dans ce tri (clé : leur destination).
+        """
+
+        rows = self.conn.execute(
+            "SELECT path, mtime_ns FROM hashes WHERE size = ? AND path != ? ORDER BY rowid",
+            (size, path)
+        ).fetchall()
+
+        prefix = self.root + os.sep if self.root is not None else None
+
+        candidates = []
+        for candidate, mtime_ns in rows :
+            # Hors de la destination (source d'un ancien tri...) : rien ne garantit qu'il y restera
+            if prefix is not None and not candidate.startswith(prefix) :
+                continue
+
+            try :
+                stat = os.stat(candidate)
+            except FileNotFoundError :
+                self.conn.execute("DELETE FROM hashes WHERE path = ?", (candidate,))
+                continue
+
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns) :
+                self.add(Path(candidate), stat)
+                if stat.st_size != size :
+                    continue
+
+            candidates.append(("hashes", candidate, candidate))
+
+        rows = self.conn.execute(
+            "SELECT path, src FROM temp.planned WHERE size = ? AND src != ? ORDER BY rowid",
+            (size, path)
+        ).fetchall()
+        candidates.extend(("planned", dst, src) for dst, src in rows)
+
+        return candidates
+
+    def register(
+            self,
+            path: Path,
+            dst: Path,
+            stat: os.stat_result|None=None
+        ) -> Path|None :
+        """
+        Cherche un fichier identique à path, qui doit être placé en dst.
+        Renvoie l'original (dans la destination) s'il y en a un, sinon retient
+        path comme prévu en dst et renvoie None.
+        Taille d'abord, puis hash partiel, puis hash complet seulement si tout coïncide.
+        """
+
+        if stat is None :
+            stat = os.stat(path)
+
+        key = _key(path)
+        size = stat.st_size
+        hashes = {}
+
+        def _own_hash(column: str) -> str :
+            if column not in hashes :
+                hashes[column] = partial_hash(key, size) if column == "partial" else hash_file(key)
+            return hashes[column]
+
+        candidates = self._candidates(key, size)
+        if candidates :
+            partial = _own_hash("partial")
+            candidates = [c for c in candidates if self._hash(*c, size, "partial") == partial]
+
+        if candidates :
+            full = _own_hash("full")
+            for candidate in candidates :
+                if self._hash(*candidate, size, "full") == full :
+                    self.duplicates += 1
+                    return Path(candidate[1])
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO temp.planned VALUES (?, ?, ?, ?, ?, ?)",
+            (_key(dst), key, size, stat.st_mtime_ns, hashes.get("partial"), hashes.get("full"))
+        )
+        self._autocommit()
+
+        return None
+
+    def __len__(self) -> int :
+        return self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    # endregion
+
+    # region |---| Transactions
+
+    def _autocommit(self) -> None :
+
+        self._pending += 1
+        if self._pending >= METADATA_CACHE_COMMIT_EVERY :
+            self.commit()
+
+    def commit(self) -> None :
+
+        # Simulation : une seule transaction, annulée à la fermeture
+        if self.persist :
+            self.conn.commit()
+        self._pending = 0
+
+    def close(self) -> None :
+
+        if self.persist :
+            self.commit()
+        else :
+            self.conn.rollback()
+        self.conn.close()
+
+    def __enter__(self) -> "HashIndex" :
+        return self
+
+    def __exit__(self, *exc) -> None :
+        self.close()
+
+    # endregion
+
+
+def dedup_moves(
+        moves: Iterable[Move],
+        index: HashIndex,
+        policy: str="skip"
+    ) -> Iterator[Move] :
+    """
+    Repère les doublons parmi les déplacements prévus, par rapport aux fichiers
+    de la destination et aux médias prévus plus tôt dans ce tri (l'original est
+    alors sa destination prévue).
+    skip : le doublon reste dans la source. hardlink : il est remplacé dans la
+    destination par un lien physique vers l'original.
+    """
+
+    if policy not in DEDUP_POLICIES :
+        raise ValueError(f"Politique de dédoublonnage inconnue : {policy}")
+
+    for move in moves :
+        original = index.register(move.src, move.dst)
+
+        if original is None :
+            yield move
+            continue
+
+        kind = "skip" if policy == "skip" else "link"
+        yield move._replace(kind=kind, original=original)
+
+
+def _key(path: Path) -> str :
+    return os.path.abspath(path)
@@ -0,0 +1,155 @@
+import os
+import queue
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, NamedTuple
+from photobot.parameters import (
+    IMG_EXTENSIONS,
+    VIDEO_EXTENSIONS,
+    DISCOVERY_QUEUE_SIZE
+)
+
+
+MEDIA_EXTENSIONS = frozenset(IMG_EXTENSIONS + VIDEO_EXTENSIONS)
+
+
+class MediaFile(NamedTuple) :
+    path: Path
+    stat: os.stat_result|None
+
+
+def is_media(name: str) -> bool :
+    return os.path.splitext(name)[1].lower() in MEDIA_EXTENSIONS
+
+
+def _scan_dir(
+        dir_path: str,
+        excluded: frozenset[str]
+    ) -> tuple[list[MediaFile], list[str]] :
+    """
+    Lit un dossier une seule fois : renvoie ses médias et ses sous-dossiers.
+    """
+
+    medias = []
+    subdirs = []
+
+    try :
+        with os.scandir(dir_path) as it :
+            for entry in it :
+                try :
+                    if entry.is_dir(follow_symlinks=False) :
+                        if os.path.abspath(entry.path) not in excluded :
+                            subdirs.append(entry.path)
+                    elif is_media(entry.name) and entry.is_file() :
+                        medias.append(MediaFile(Path(entry.path), entry.stat()))
+                except OSError : # Fichier supprimé pendant le parcours
+                    continue
+    except OSError :
+        pass
+
+    return medias, subdirs
+
+
+def _iter_serial(
+        root: str,
+        recursive: bool,
+        excluded: frozenset[str]
+    ) -> Iterator[MediaFile] :
+
+    stack = [root]
+    while stack :
+        medias, subdirs = _scan_dir(stack.pop(), excluded)
+        yield from medias
+
+        if recursive :
+            stack.extend(reversed(subdirs))
+
+
+def _iter_parallel(
+        root: str,
+        excluded: frozenset[str],
+        workers: int
+    ) -> Iterator[MediaFile] :
+    """
+    Parcours récursif où chaque dossier est lu par un thread du pool.
+    Les médias sont remis au fur et à mesure via une file bornée.
+    """
+
+    found = queue.Queue(maxsize=DISCOVERY_QUEUE_SIZE)
+    stop = threading.Event()
+    lock = threading.Lock()
+    outstanding = 0
+    done = object()
+
+    def _put(item) -> None :
+        while not stop.is_set() :
+            try :
+                found.put(item, timeout=0.1)
+                return
+            except queue.Full :
+                continue
+
+    def _visit(dir_path: str) -> None :
+        nonlocal outstanding
+
+        try :
+            if stop.is_set() :
+                return
+
+            medias, subdirs = _scan_dir(dir_path, excluded)
+            for subdir in subdirs :
+                _submit(subdir)
+            for media in medias :
+                _put(media)
+        finally :
+            with lock :
+                outstanding -= 1
+                finished = outstanding == 0
+            if finished :
+                _put(done)
+
+    def _submit(dir_path: str) -> None :
+        nonlocal outstanding
+
+        if stop.is_set() :
+            return
+
+        with lock :
+            outstanding += 1
+        try :
+            executor.submit(_visit, dir_path)
+        except RuntimeError : # Pool déjà arrêté
+            with lock :
+                outstanding -= 1
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try :
+        _submit(root)
+        while (item := found.get()) is not done :
+            yield item
+    finally :
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def iter_medias(
+        medias_path: Path,
+        recursive: bool,
+        exclude: Iterable[Path]=(),
+        workers: int=1
+    ) -> Iterator[MediaFile] :
+    """
+    Parcourt medias_path en un seul passage (os.scandir) et renvoie ses médias
+    au fur et à mesure, avec leur stat. Les extensions sont comparées sans casse.
+    Les dossiers de exclude ne sont pas parcourus (ex. destination dans la source).
+    Avec workers > 1, les sous-dossiers sont lus en parallèle (utile sur NAS).
+    """
+
+    root = os.path.abspath(medias_path)
+    excluded = frozenset(os.path.abspath(p) for p in exclude)
+
+    if recursive and workers > 1 :
+        return _iter_parallel(root, excluded, workers)
+
+    return _iter_serial(root, recursive, excluded)
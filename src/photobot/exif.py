@@ -0,0 +1,422 @@
+import struct
+from pathlib import Path
+from typing import BinaryIO
+from photobot.parameters import EXIF_MAX_META_SIZE
+
+
+# Tags recherchés
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+GPS_TAGS = {
+    1: "GPSLatitudeRef",
+    2: "GPSLatitude",
+    3: "GPSLongitudeRef",
+    4: "GPSLongitude",
+}
+
+# Types TIFF
+TYPE_ASCII = 2
+TYPE_RATIONAL = 5
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+HEIC_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1", b"avif"}
+
+
+class ExifParseError(Exception) :
+    pass
+
+
+# region TIFF
+
+def _parse_ifd(
+        tiff: bytes,
+        offset: int,
+        endian: str
+    ) -> dict[int, tuple[int, int, bytes]] :
+    """
+    Renvoie {tag: (type, nombre, octets de la valeur)} pour un IFD.
+    """
+
+    if offset < 8 or offset + 2 > len(tiff) :
+        raise ExifParseError("IFD hors du bloc TIFF")
+
+    (count,) = struct.unpack_from(endian + "H", tiff, offset)
+    if offset + 2 + 12 * count > len(tiff) :
+        raise ExifParseError("IFD tronqué")
+
+    entries = {}
+    for i in range(count) :
+        tag, field_type, n, value = struct.unpack_from(endian + "HHL4s", tiff, offset + 2 + 12 * i)
+
+        size = TYPE_SIZES.get(field_type, 0) * n
+        if size > 4 :
+            (value_offset,) = struct.unpack(endian + "L", value)
+            if value_offset + size > len(tiff) :
+                raise ExifParseError("Valeur hors du bloc TIFF")
+            value = tiff[value_offset:value_offset + size]
+        else :
+            value = value[:size]
+
+        entries[tag] = (field_type, n, value)
+
+    return entries
+
+
+def _pointer(
+        entries: dict,
+        tag: int,
+        endian: str
+    ) -> int|None :
+
+    if tag not in entries :
+        return None
+
+    field_type, n, value = entries[tag]
+    if n != 1 or len(value) != 4 :
+        raise ExifParseError("Pointeur d'IFD invalide")
+
+    return struct.unpack(endian + "L", value)[0]
+
+
+def _ascii(entry: tuple[int, int, bytes]) -> str :
+
+    field_type, _, value = entry
+    if field_type != TYPE_ASCII :
+        raise ExifParseError("Type inattendu")
+
+    # Comme exifread : on coupe au premier octet nul
+    return value.split(b"\x00", 1)[0].decode("utf-8")
+
+
+def _rationals(
+        entry: tuple[int, int, bytes],
+        endian: str
+    ) -> list[tuple[int, int]] :
+
+    field_type, n, value = entry
+    if field_type != TYPE_RATIONAL :
+        raise ExifParseError("Type inattendu")
+
+    values = struct.unpack(endian + "L" * (2 * n), value)
+    rationals = list(zip(values[0::2], values[1::2]))
+    if any(den == 0 for _, den in rationals) :
+        raise ExifParseError("Dénominateur nul")
+
+    return rationals
+
+
+def parse_tiff(tiff: bytes) -> dict :
+    """
+    Extrait les tags GPS et DateTimeOriginal d'un bloc TIFF (contenu d'un segment Exif).
+    """
+
+    if tiff[:2] == b"II" :
+        endian = "<"
+    elif tiff[:2] == b"MM" :
+        endian = ">"
+    else :
+        raise ExifParseError("En-tête TIFF invalide")
+
+    magic, ifd0_offset = struct.unpack_from(endian + "HL", tiff, 2)
+    if magic != 42 :
+        raise ExifParseError("En-tête TIFF invalide")
+
+    tags = {}
+    ifd0 = _parse_ifd(tiff, ifd0_offset, endian)
+
+    exif_offset = _pointer(ifd0, TAG_EXIF_IFD, endian)
+    if exif_offset is not None :
+        exif_ifd = _parse_ifd(tiff, exif_offset, endian)
+        if TAG_DATETIME_ORIGINAL in exif_ifd :
+            tags["DateTimeOriginal"] = _ascii(exif_ifd[TAG_DATETIME_ORIGINAL]).strip()
+
+    gps_offset = _pointer(ifd0, TAG_GPS_IFD, endian)
+    if gps_offset is not None :
+        gps_ifd = _parse_ifd(tiff, gps_offset, endian)
+        for tag, name in GPS_TAGS.items() :
+            if tag not in gps_ifd :
+                continue
+            if name.endswith("Ref") :
+                tags[name] = _ascii(gps_ifd[tag])
+            else :
+                tags[name] = _rationals(gps_ifd[tag], endian)
+
+    return tags
+
+# endregion
+
+
+# region JPEG
+
+def _read_exact(
+        f: BinaryIO,
+        size: int
+    ) -> bytes :
+
+    data = f.read(size)
+    if len(data) != size :
+        raise ExifParseError("Fichier tronqué")
+
+    return data
+
+
+def read_jpeg_tiff(f: BinaryIO) -> bytes|None :
+    """
+    Parcourt les segments JPEG en ne lisant que leurs en-têtes, jusqu'au segment
+    APP1 Exif. Renvoie son bloc TIFF, ou None si le fichier n'a pas d'EXIF.
+    """
+
+    if _read_exact(f, 2) != b"\xff\xd8" :
+        raise ExifParseError("Pas un JPEG")
+
+    while True :
+        marker = _read_exact(f, 2)
+        if marker[0] != 0xFF :
+            raise ExifParseError("Marqueur JPEG invalide")
+
+        # Octets de remplissage 0xFF
+        while marker[1] == 0xFF :
+            marker = marker[1:] + _read_exact(f, 1)
+
+        code = marker[1]
+
+        # Début des données image ou fin : pas d'EXIF
+        if code in (0xDA, 0xD9) :
+            return None
+
+        # Marqueurs sans longueur
+        if code == 0x01 or 0xD0 <= code <= 0xD7 :
+            continue
+
+        (length,) = struct.unpack(">H", _read_exact(f, 2))
+        if length < 2 :
+            raise ExifParseError("Segment JPEG invalide")
+
+        if code == 0xE1 :
+            header = _read_exact(f, min(6, length - 2))
+            if header == b"Exif\x00\x00" :
+                return _read_exact(f, length - 8)
+            f.seek(length - 2 - len(header), 1)
+        else :
+            f.seek(length - 2, 1)
+
+# endregion
+
+
+# region HEIC
+
+def _iter_boxes(
+        data: bytes,
+        start: int=0,
+        end: int|None=None
+    ) :
+    """
+    Boîtes ISOBMFF contenues dans data[start:end] : (type, début du contenu, fin).
+    """
+
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end :
+        size, box_type = struct.unpack_from(">L4s", data, offset)
+        header = 8
+        if size == 1 :
+            (size,) = struct.unpack_from(">Q", data, offset + 8)
+            header = 16
+        elif size == 0 :
+            size = end - offset
+
+        if size < header or offset + size > end :
+            raise ExifParseError("Boîte invalide")
+
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _read_uint(
+        data: bytes,
+        offset: int,
+        size: int
+    ) -> tuple[int, int] :
+
+    if size == 0 :
+        return 0, offset
+
+    fmt = {1: ">B", 2: ">H", 4: ">L", 8: ">Q"}.get(size)
+    if fmt is None :
+        raise ExifParseError("Taille d'entier invalide")
+
+    return struct.unpack_from(fmt, data, offset)[0], offset + size
+
+
+def _find_exif_item(
+        meta: bytes,
+        start: int,
+        end: int
+    ) -> int|None :
+    """
+    Identifiant de l'item de type "Exif" dans la boîte iinf.
+    """
+
+    for box_type, box_start, box_end in _iter_boxes(meta, start, end) :
+        if box_type != b"iinf" :
+            continue
+
+        version = meta[box_start]
+        entries_start = box_start + 4 + (2 if version == 0 else 4)
+
+        for infe_type, infe_start, infe_end in _iter_boxes(meta, entries_start, box_end) :
+            if infe_type != b"infe" :
+                continue
+
+            infe_version = meta[infe_start]
+            if infe_version < 2 :
+                continue
+
+            id_size = 2 if infe_version == 2 else 4
+            item_id, offset = _read_uint(meta, infe_start + 4, id_size)
+            item_type = meta[offset + 2:offset + 6]
+
+            if item_type == b"Exif" :
+                return item_id
+
+    return None
+
+
+def _find_item_extents(
+        meta: bytes,
+        start: int,
+        end: int,
+        item_id: int
+    ) -> list[tuple[int, int]] :
+    """
+    Extents (position dans le fichier, longueur) de l'item dans la boîte iloc.
+    """
+
+    for box_type, box_start, box_end in _iter_boxes(meta, start, end) :
+        if box_type != b"iloc" :
+            continue
+
+        version = meta[box_start]
+        offset_size = meta[box_start + 4] >> 4
+        length_size = meta[box_start + 4] & 0x0F
+        base_offset_size = meta[box_start + 5] >> 4
+        index_size = meta[box_start + 5] & 0x0F if version in (1, 2) else 0
+
+        offset = box_start + 6
+        item_count, offset = _read_uint(meta, offset, 2 if version < 2 else 4)
+
+        for _ in range(item_count) :
+            current_id, offset = _read_uint(meta, offset, 2 if version < 2 else 4)
+
+            construction_method = 0
+            if version in (1, 2) :
+                value, offset = _read_uint(meta, offset, 2)
+                construction_method = value & 0x0F
+
+            _, offset = _read_uint(meta, offset, 2) # data_reference_index
+            base_offset, offset = _read_uint(meta, offset, base_offset_size)
+            extent_count, offset = _read_uint(meta, offset, 2)
+
+            extents = []
+            for _ in range(extent_count) :
+                _, offset = _read_uint(meta, offset, index_size)
+                extent_offset, offset = _read_uint(meta, offset, offset_size)
+                extent_length, offset = _read_uint(meta, offset, length_size)
+                extents.append((base_offset + extent_offset, extent_length))
+
+            if current_id == item_id :
+                if construction_method != 0 :
+                    raise ExifParseError("Item Exif non stocké dans le fichier")
+                return extents
+
+    return []
+
+
+def read_heic_tiff(f: BinaryIO) -> bytes|None :
+    """
+    Lit la boîte "meta" d'un HEIC (en sautant les autres boîtes de premier niveau),
+    localise l'item Exif via iinf/iloc et ne lit que lui.
+    """
+
+    meta = None
+    first = True
+    while meta is None :
+        header = f.read(8)
+        if len(header) < 8 :
+            raise ExifParseError("Boîte meta introuvable")
+
+        size, box_type = struct.unpack(">L4s", header)
+        header_size = 8
+        if size == 1 :
+            (size,) = struct.unpack(">Q", _read_exact(f, 8))
+            header_size = 16
+
+        if first :
+            if box_type != b"ftyp" :
+                raise ExifParseError("Pas un fichier ISOBMFF")
+            payload = _read_exact(f, size - header_size)
+            brands = {payload[i:i + 4] for i in range(0, len(payload), 4)}
+            if not brands & HEIC_BRANDS :
+                raise ExifParseError("Marque HEIF inconnue")
+            first = False
+            continue
+
+        if box_type == b"meta" :
+            if size - header_size > EXIF_MAX_META_SIZE :
+                raise ExifParseError("Boîte meta trop grande")
+            meta = _read_exact(f, size - header_size)
+        elif size == 0 :
+            raise ExifParseError("Boîte meta introuvable")
+        else :
+            f.seek(size - header_size, 1)
+
+    # meta est une "full box" : 4 octets de version/flags avant les boîtes filles
+    item_id = _find_exif_item(meta, 4, len(meta))
+    if item_id is None :
+        return None
+
+    extents = _find_item_extents(meta, 4, len(meta), item_id)
+    if not extents :
+        raise ExifParseError("Item Exif sans extent")
+
+    data = b""
+    for extent_offset, extent_length in extents :
+        f.seek(extent_offset)
+        data += _read_exact(f, extent_length)
+
+    # L'item commence par le décalage (32 bits) de l'en-tête TIFF
+    (tiff_offset,) = struct.unpack_from(">L", data, 0)
+
+    return data[4 + tiff_offset:]
+
+# endregion
+
+
+def read_exif_tags(path: Path) -> dict|None :
+    """
+    Lecture rapide des tags GPSLatitude(Ref), GPSLongitude(Ref) et DateTimeOriginal.
+    Seuls les en-têtes de segments (JPEG) ou les boîtes meta (HEIC) puis le bloc
+    Exif sont lus, et seuls IFD0, l'IFD EXIF et l'IFD GPS sont parcourus.
+    Renvoie un dictionnaire vide si le fichier n'a pas d'EXIF, ou None si la
+    lecture rapide n'a pas abouti (l'appelant retombe alors sur exifread).
+    """
+
+    suffix = path.suffix.lower()
+
+    try :
+        with open(path, "rb") as f :
+            if suffix in (".jpg", ".jpeg") :
+                tiff = read_jpeg_tiff(f)
+            elif suffix == ".heic" :
+                tiff = read_heic_tiff(f)
+            else :
+                return None
+
+        if tiff is None :
+            return {}
+
+        return parse_tiff(tiff)
+
+    except (ExifParseError, struct.error, IndexError, UnicodeDecodeError, OSError, ValueError) :
+        return None
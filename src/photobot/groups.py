@@ -0,0 +1,629 @@
+import os
+import json
+import heapq
+import pickle
+import hashlib
+from bisect import bisect_left
+from pathlib import Path
+from datetime import (
+    datetime,
+    timezone
+)
+from math import radians, degrees, sin, cos, asin, pi
+from typing import Iterable
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point, Polygon, box
+from photobot.parameters import (
+    DRAWN_GROUP_DATA_PATH,
+    DATE_GROUP_DATA_PATH,
+    GROUP_INDEX_PATH
+)
+from photobot.utils import (
+    hash_file,
+    haversine,
+    sort_groups,
+    parse_date_groups,
+)
+
+
+# Marge (en degrés) ajoutée aux boîtes englobantes des cercles
+BOUNDS_MARGIN_DEG = 1e-7
+
+# A incrémenter quand le contenu de GroupIndex.compile() change
+GROUP_INDEX_VERSION = 1
+
+
+# region CHARGEMENT
+
+def load_groups(
+        drawn_groups_data_path: Path=DRAWN_GROUP_DATA_PATH,
+        date_groups_data_path: Path=DATE_GROUP_DATA_PATH
+    ) -> list[dict] :
+    """
+    Charge les groupes dessinés et les groupes par date, triés par priorité.
+    """
+
+    with open(drawn_groups_data_path, "r", encoding="utf-8") as f :
+        drawn_groups = json.load(f)["groups"]
+
+    date_groups = parse_date_groups(date_groups_data_path)
+
+    return sort_groups(drawn_groups + date_groups)
+
+
+def save_drawn_groups(
+        groups: list[dict],
+        drawn_groups_data_path: Path=DRAWN_GROUP_DATA_PATH
+    ) -> None :
+
+    with open(drawn_groups_data_path, "w", encoding="utf-8") as f :
+        json.dump({"groups": groups}, f, indent=2)
+
+
+def _source_state(path: Path) -> tuple[int, int]|None :
+
+    try :
+        stat = os.stat(path)
+    except FileNotFoundError :
+        return None
+
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _source_hash(path: Path) -> str|None :
+    return hash_file(path) if os.path.exists(path) else None
+
+
+def group_index_path(
+        drawn_groups_data_path: Path,
+        date_groups_data_path: Path,
+        index_dir: Path=GROUP_INDEX_PATH
+    ) -> Path :
+    """
+    Un index compilé par couple de fichiers de groupes, dans index_dir.
+    """
+
+    key = f"{os.path.abspath(drawn_groups_data_path)}\n{os.path.abspath(date_groups_data_path)}"
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    return index_dir / f"{name}.pickle"
+
+
+def load_group_index(
+        drawn_groups_data_path: Path=DRAWN_GROUP_DATA_PATH,
+        date_groups_data_path: Path=DATE_GROUP_DATA_PATH,
+        index_dir: Path=GROUP_INDEX_PATH
+    ) -> "GroupIndex" :
+    """
+    GroupIndex depuis l'index compilé dans index_dir, recompilé seulement si un
+    fichier de groupes a changé : même taille et même mtime, ou sinon même hash
+    (fichier réécrit à l'identique).
+    """
+
+    sources = (drawn_groups_data_path, date_groups_data_path)
+    index_path = group_index_path(*sources, index_dir=index_dir)
+    states = [_source_state(p) for p in sources]
+
+    compiled = None
+    try :
+        with open(index_path, "rb") as f :
+            compiled = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) :
+        pass
+
+    if compiled is not None and compiled.get("version") == GROUP_INDEX_VERSION :
+        if compiled["states"] == states :
+            return GroupIndex.from_compiled(compiled)
+
+        hashes = [_source_hash(p) for p in sources]
+        if compiled["hashes"] == hashes :
+            compiled["states"] = states
+            _write_compiled(index_path, compiled)
+            return GroupIndex.from_compiled(compiled)
+    else :
+        hashes = [_source_hash(p) for p in sources]
+
+    index = GroupIndex(load_groups(*sources))
+
+    # Fichier modifié pendant la compilation : l'index sera refait au prochain chargement
+    if [_source_state(p) for p in sources] == states :
+        _write_compiled(index_path, {
+            "version": GROUP_INDEX_VERSION,
+            "states": states,
+            "hashes": hashes,
+            **index.compile()
+        })
+
+    return index
+
+
+def _write_compiled(
+        index_path: Path,
+        compiled: dict
+    ) -> None :
+
+    os.makedirs(index_path.parent, exist_ok=True)
+    tmp_path = index_path.with_name(f".{index_path.name}.tmp")
+    with open(tmp_path, "wb") as f :
+        pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, index_path)
+
+# endregion
+
+
+# region GEO
+
+def normalize_lon(lon: float) -> float :
+    return ((lon + 180) % 360) - 180
+
+
+def normalize_lon_array(lons: np.ndarray) -> np.ndarray :
+    return ((lons + 180) % 360) - 180
+
+
+def haversine_array(
+        lat1: np.ndarray,
+        lon1: np.ndarray,
+        lat2: np.ndarray,
+        lon2: np.ndarray
+    ) -> np.ndarray :
+    """
+    Version vectorisée de utils.haversine (distance en km).
+    """
+
+    R = 6371
+    dlat, dlon = np.radians(lat2 - lat1), np.radians(lon2 - lon1)
+    a = np.sin(dlat/2)**2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon/2)**2
+
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def circle_bounds(
+        lat: float,
+        lon: float,
+        rayon_km: float
+    ) -> tuple[float, float, float, float]|None :
+    """
+    Boîte englobante (lon_min, lat_min, lon_max, lat_max) d'un cercle sur la sphère,
+    en longitude normalisée dans [-180, 180].
+    Renvoie None si le cercle couvre toute la sphère.
+    """
+
+    R = 6371
+    angle = rayon_km / R
+    if angle >= pi :
+        return None
+
+    dlat = degrees(angle) + BOUNDS_MARGIN_DEG
+    lat_min = max(lat - dlat, -90.)
+    lat_max = min(lat + dlat, 90.)
+
+    # Le cercle contient un pôle : toutes les longitudes sont possibles
+    if abs(lat) + dlat >= 90 :
+        return (-180., lat_min, 180., lat_max)
+
+    dlon = degrees(asin(min(sin(angle) / cos(radians(lat)), 1.))) + BOUNDS_MARGIN_DEG
+    lon = normalize_lon(lon)
+
+    # Le cercle traverse l'antiméridien
+    if lon - dlon < -180 or lon + dlon > 180 :
+        return (-180., lat_min, 180., lat_max)
+
+    return (lon - dlon, lat_min, lon + dlon, lat_max)
+
+# endregion
+
+
+# region DATES
+
+def normalize_bound(bound) -> datetime|None :
+    """
+    Borne d'un groupe par date en datetime naïf (UTC implicite), ou None si absente.
+    """
+
+    if bound is None or bound != bound : # NaT
+        return None
+
+    if hasattr(bound, "to_pydatetime") :
+        bound = bound.to_pydatetime()
+
+    return bound.replace(tzinfo=None)
+
+
+def normalize_media_date(media_date: datetime) -> datetime :
+    """
+    Les bornes sont comparées en UTC à une date avec fuseau horaire :
+    on ramène donc la date du média en UTC naïf.
+    """
+
+    if media_date.tzinfo is not None and media_date.tzinfo.utcoffset(media_date) is not None :
+        return media_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return media_date
+
+
+def to_datetime64(dates: Iterable[datetime|None]|np.ndarray) -> np.ndarray :
+    """
+    Convertit des dates (datetime, éventuellement avec fuseau, ou None) en
+    datetime64 UTC naïf, NaT pour une date absente.
+    """
+
+    if isinstance(dates, np.ndarray) and np.issubdtype(dates.dtype, np.datetime64) :
+        return dates.astype("datetime64[us]")
+
+    return np.array(
+        [np.datetime64("NaT") if d is None else normalize_media_date(d) for d in dates],
+        dtype="datetime64[us]"
+    )
+
+
+class DateIndex :
+    """
+    Index d'intervalles pour les groupes par date.
+    Les bornes de tous les groupes découpent le temps en segments élémentaires
+    (chaque borne, puis chaque intervalle ouvert entre deux bornes). Le groupe
+    prioritaire de chaque segment est calculé une fois par balayage, et une
+    recherche se fait ensuite par bisection en O(log n).
+    """
+
+    def __init__(self, date_groups: list[tuple[int, dict]]) -> None :
+
+        intervals = []
+        for priority, g in date_groups :
+            debut = normalize_bound(g["date_debut"])
+            fin = normalize_bound(g["date_fin"])
+            if debut is None or fin is None or fin < debut :
+                continue
+            intervals.append((debut, fin, priority))
+
+        intervals.sort()
+        self.points = sorted({b for debut, fin, _ in intervals for b in (debut, fin)})
+
+        # winners[2i] : borne i, winners[2i+1] : intervalle ouvert ]borne i, borne i+1[
+        self.winners = []
+
+        active = []
+        next_interval = 0
+        for point in self.points :
+
+            while next_interval < len(intervals) and intervals[next_interval][0] <= point :
+                debut, fin, priority = intervals[next_interval]
+                heapq.heappush(active, (priority, fin))
+                next_interval += 1
+
+            while active and active[0][1] < point :
+                heapq.heappop(active)
+            self.winners.append(active[0][0] if active else None)
+
+            while active and active[0][1] <= point :
+                heapq.heappop(active)
+            self.winners.append(active[0][0] if active else None)
+
+    @classmethod
+    def from_segments(
+            cls,
+            points: list[datetime],
+            winners: list[int|None]
+        ) -> "DateIndex" :
+        """
+        Index déjà calculé (index compilé des groupes).
+        """
+
+        index = cls.__new__(cls)
+        index.points = points
+        index.winners = winners
+
+        return index
+
+    def find(self, media_date: datetime|None) -> int|None :
+        """
+        Priorité du premier groupe par date contenant la date, ou None.
+        """
+
+        if media_date is None or not self.points :
+            return None
+
+        media_date = normalize_media_date(media_date)
+
+        i = bisect_left(self.points, media_date)
+        if i < len(self.points) and self.points[i] == media_date :
+            return self.winners[2 * i]
+
+        if i == 0 :
+            return None
+
+        return self.winners[2 * i - 1]
+
+    def find_many(self, dates: np.ndarray) -> np.ndarray :
+        """
+        Version vectorisée de find (searchsorted) : dates en datetime64 UTC naïf,
+        NaT pour une date absente. Renvoie les priorités, -1 si aucun groupe.
+        """
+
+        result = np.full(len(dates), -1, dtype=np.int64)
+        if not self.points :
+            return result
+
+        points = np.array(self.points, dtype="datetime64[us]")
+        winners = np.array([-1 if w is None else w for w in self.winners], dtype=np.int64)
+
+        i = np.searchsorted(points, dates, side="left")
+        exact = (i < len(points)) & (points[np.minimum(i, len(points) - 1)] == dates)
+        slots = np.where(exact, 2 * i, 2 * i - 1)
+
+        valid = ~np.isnat(dates) & (exact | (i > 0))
+        result[valid] = winners[slots[valid]]
+
+        return result
+
+# endregion
+
+
+# region INDEX
+
+class GroupIndex :
+    """
+    Groupes compilés une seule fois pour la classification des médias.
+    Les groupes par date sont rangés dans un DateIndex.
+    Les polygones sont préparés et indexés dans un STRtree, les cercles par leur
+    boîte englobante. Seuls les candidats dont la boîte contient le point sont testés,
+    et le premier groupe dans l'ordre de priorité (sort_groups) l'emporte.
+    """
+
+    def __init__(self, groups: list[dict]) -> None :
+
+        date_groups = []
+
+        polygons = []
+        polygon_priorities = []
+        circles_bounds = []
+        circle_priorities = []
+        global_circles = []
+
+        for priority, g in enumerate(groups) :
+
+            if g["type"] == "date" :
+                date_groups.append((priority, g))
+
+            elif g["type"] == "polygone" :
+                polygons.append(Polygon(g["coordinates"]))
+                polygon_priorities.append(priority)
+
+            elif g["type"] == "circle" :
+                bounds = circle_bounds(g["latitude"], g["longitude"], g["rayon_km"])
+                if bounds is None :
+                    global_circles.append(priority)
+                else :
+                    circles_bounds.append(bounds)
+                    circle_priorities.append(priority)
+
+        self._build(
+            groups,
+            DateIndex(date_groups),
+            polygons,
+            polygon_priorities,
+            circles_bounds,
+            circle_priorities,
+            global_circles
+        )
+
+    def _build(
+            self,
+            groups: list[dict],
+            date_index: "DateIndex",
+            polygons: list[Polygon],
+            polygon_priorities: list[int],
+            circles_bounds: list[tuple[float, float, float, float]],
+            circle_priorities: list[int],
+            global_circles: list[int]
+        ) -> None :
+
+        self.groups = groups
+        self.date_index = date_index
+
+        shapely.prepare(polygons)
+        self.polygons = polygons
+        self._polygon_priorities = polygon_priorities
+        self._polygon_tree = STRtree(polygons)
+
+        self._circles_bounds = circles_bounds
+        self._circle_priorities = circle_priorities
+        self._global_circles = global_circles
+        self._circle_tree = STRtree([box(*bounds) for bounds in circles_bounds])
+
+    # region |---| Index compilé
+
+    def compile(self) -> dict :
+        """
+        Composants bruts de l'index (sans objets shapely, pour la sérialisation).
+        Les groupes sont déjà dans l'ordre de priorité : sort_groups, et donc le
+        calcul des aires, n'est plus nécessaire au chargement.
+        """
+
+        return {
+            "groups": self.groups,
+            "date_points": self.date_index.points,
+            "date_winners": self.date_index.winners,
+            "polygons_wkb": [shapely.to_wkb(p) for p in self.polygons],
+            "polygon_priorities": self._polygon_priorities,
+            "circles_bounds": self._circles_bounds,
+            "circle_priorities": self._circle_priorities,
+            "global_circles": self._global_circles
+        }
+
+    @classmethod
+    def from_compiled(cls, compiled: dict) -> "GroupIndex" :
+        """
+        Reconstruit l'index depuis compile() : seuls les arbres sont recalculés.
+        """
+
+        index = cls.__new__(cls)
+        index._build(
+            compiled["groups"],
+            DateIndex.from_segments(compiled["date_points"], compiled["date_winners"]),
+            list(shapely.from_wkb(compiled["polygons_wkb"])),
+            compiled["polygon_priorities"],
+            compiled["circles_bounds"],
+            compiled["circle_priorities"],
+            compiled["global_circles"]
+        )
+
+        return index
+
+    # endregion
+
+    # region |---| Lieu
+
+    def _in_circle(
+            self,
+            priority: int,
+            lat: float,
+            lon: float
+        ) -> bool :
+
+        g = self.groups[priority]
+        return haversine(lat, lon, g["latitude"], g["longitude"]) <= g["rayon_km"]
+
+    def find_location(
+            self,
+            lat: float,
+            lon: float
+        ) -> int|None :
+        """
+        Priorité du premier groupe de lieu contenant le point, ou None.
+        """
+
+        best = None
+
+        # Polygones : le STRtree filtre par boîte puis teste l'inclusion exacte
+        matches = self._polygon_tree.query(Point(lon, lat), predicate="within")
+        if len(matches) :
+            best = min(self._polygon_priorities[i] for i in matches)
+
+        # Cercles : candidats par boîte, testés dans l'ordre de priorité
+        candidates = self._circle_tree.query(Point(normalize_lon(lon), lat))
+        priorities = [self._circle_priorities[i] for i in candidates] + self._global_circles
+
+        for priority in sorted(priorities) :
+            if best is not None and priority > best :
+                break
+            if self._in_circle(priority, lat, lon) :
+                best = priority
+                break
+
+        return best
+
+    # endregion
+
+    def find_priority(
+            self,
+            media_date: datetime|None,
+            media_coords: tuple[float|None, float|None]
+        ) -> int|None :
+
+        matches = []
+
+        date_priority = self.date_index.find(media_date)
+        if date_priority is not None :
+            matches.append(date_priority)
+
+        if media_coords :
+            lat, lon = media_coords
+            if (lat is not None) and (lon is not None) :
+                location_priority = self.find_location(lat, lon)
+                if location_priority is not None :
+                    matches.append(location_priority)
+
+        return min(matches) if matches else None
+
+    # region |---| Vectorisé
+
+    def find_priorities(
+            self,
+            lats: Iterable[float|None],
+            lons: Iterable[float|None],
+            dates: Iterable[datetime|None]|np.ndarray
+        ) -> np.ndarray :
+        """
+        Classification d'un lot de médias en une fois. Renvoie pour chaque média
+        la priorité (indice dans self.groups) de son groupe, -1 si aucun.
+        Coordonnées absentes : None ou NaN. Dates absentes : None ou NaT.
+        Le résultat est identique à find_priority appelé média par média.
+        """
+
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        dates = to_datetime64(dates)
+
+        no_match = len(self.groups)
+        best = self.date_index.find_many(dates)
+        best[best < 0] = no_match
+
+        has_coords = ~(np.isnan(lats) | np.isnan(lons))
+        idx = np.flatnonzero(has_coords)
+        lats_c = lats[idx]
+        lons_c = lons[idx]
+
+        # Polygones : un seul parcours de l'arbre pour tous les points
+        if len(self.polygons) and len(idx) :
+            pts, geoms = self._polygon_tree.query(shapely.points(lons_c, lats_c), predicate="within")
+            priorities = np.asarray(self._polygon_priorities, dtype=np.int64)[geoms]
+            np.minimum.at(best, idx[pts], priorities)
+
+        # Cercles : candidats par boîte, puis haversine vectorisé
+        circle_priorities = np.asarray(self._circle_priorities, dtype=np.int64)
+        pts, circles = self._circle_tree.query(shapely.points(normalize_lon_array(lons_c), lats_c))
+        candidate_priorities = circle_priorities[circles]
+
+        for priority in self._global_circles :
+            pts = np.concatenate([pts, np.arange(len(idx))])
+            candidate_priorities = np.concatenate([candidate_priorities, np.full(len(idx), priority)])
+
+        if len(pts) :
+            inside = self._in_circles(candidate_priorities, lats_c[pts], lons_c[pts])
+            np.minimum.at(best, idx[pts[inside]], candidate_priorities[inside])
+
+        best[best == no_match] = -1
+
+        return best
+
+    def _in_circles(
+            self,
+            priorities: np.ndarray,
+            lats: np.ndarray,
+            lons: np.ndarray
+        ) -> np.ndarray :
+
+        centers_lat = np.array([self.groups[p]["latitude"] for p in priorities], dtype=np.float64)
+        centers_lon = np.array([self.groups[p]["longitude"] for p in priorities], dtype=np.float64)
+        rayons = np.array([self.groups[p]["rayon_km"] for p in priorities], dtype=np.float64)
+
+        dist = haversine_array(lats, lons, centers_lat, centers_lon)
+        inside = dist <= rayons
+
+        # Au ras du bord, on tranche avec le haversine scalaire pour coller au cas unitaire
+        borderline = np.flatnonzero(np.abs(dist - rayons) <= 1e-9 * np.maximum(rayons, 1.))
+        for i in borderline :
+            inside[i] = self._in_circle(int(priorities[i]), float(lats[i]), float(lons[i]))
+
+        return inside
+
+    # endregion
+
+    def find(
+            self,
+            media_date: datetime|None,
+            media_coords: tuple[float|None, float|None]
+        ) -> dict|None :
+        """
+        Premier groupe (par priorité) auquel appartient le média, ou None.
+        Equivalent à tester media_is_in_group sur chaque groupe dans l'ordre.
+        """
+
+        priority = self.find_priority(media_date, media_coords)
+
+        return None if priority is None else self.groups[priority]
+
+# endregion
@@ -0,0 +1,219 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import TYPE_CHECKING
+from photobot.parameters import (
+    JOURNALS_PATH,
+    JOURNAL_FSYNC_EVERY
+)
+
+if TYPE_CHECKING :
+    from photobot.cache import MetadataCache
+    from photobot.moves import Move
+
+
+Metadata = tuple[float|None, float|None, datetime|None]
+
+
+def journal_path(
+        medias_path: Path,
+        output_path: Path,
+        journals_path: Path=JOURNALS_PATH
+    ) -> Path :
+    """
+    Un journal par couple (source, destination), dans journals_path.
+    """
+
+    key = f"{os.path.abspath(medias_path)}\n{os.path.abspath(output_path)}"
+    name = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    return journals_path / f"{name}.jsonl"
+
+
+class SortJournal :
+    """
+    Journal en ajout seul d'un tri : métadonnées extraites et déplacements
+    (début puis fin). Les écritures sont fsync-ées par paquets de fsync_every :
+    une entrée perdue lors d'un crash est simplement refaite à la reprise.
+
+    S'utilise comme cache de métadonnées (get/put) devant un MetadataCache éventuel.
+    Le journal d'un tri interrompu n'est jamais écrasé sans restart : c'est la
+    seule trace des déplacements en cours au moment du crash.
+    """
+
+    def __init__(
+            self,
+            path: Path,
+            resume: bool=False,
+            cache: "MetadataCache|None"=None,
+            fsync_every: int=JOURNAL_FSYNC_EVERY,
+            restart: bool=False
+        ) -> None :
+
+        if not resume and not restart and path.exists() :
+            raise FileExistsError(
+                f"Un tri interrompu a laissé son journal ({path}) : "
+                "reprenez-le avec --resume, ou recommencez avec --restart"
+            )
+
+        self.path = path
+        self.cache = cache
+        self.fsync_every = max(fsync_every, 1)
+        self._pending = 0
+
+        self.metadata = {}
+        self.in_flight = {}
+        self.moved = 0
+
+        if resume and path.exists() :
+            self._load()
+
+        os.makedirs(path.parent, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+        # Ligne tronquée par le crash : on repart sur une ligne propre
+        if self._file.tell() > 0 :
+            with open(path, "rb") as f :
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n" :
+                    self._file.write("\n")
+
+    # region |---| Reprise
+
+    def _load(self) -> None :
+
+        with open(self.path, "r", encoding="utf-8") as f :
+            for line in f :
+                try :
+                    entry = json.loads(line)
+                except ValueError : # Dernière ligne tronquée par le crash
+                    continue
+
+                if entry["op"] == "meta" :
+                    date = datetime.fromisoformat(entry["date"]) if entry["date"] else None
+                    self.metadata[entry["path"]] = (
+                        entry["size"],
+                        entry["mtime_ns"],
+                        (entry["lat"], entry["lon"], date)
+                    )
+
+                elif entry["op"] == "begin" :
+                    self.in_flight[entry["src"]] = entry["dst"]
+
+                elif entry["op"] == "done" :
+                    self.in_flight.pop(entry["src"], None)
+                    self.moved += 1
+
+    def recover(self) -> tuple[int, int] :
+        """
+        Revérifie les déplacements commencés mais non confirmés.
+        Source absente et destination présente : le déplacement a abouti.
+        Source encore présente : le fichier sera retrouvé et redéplacé.
+        Renvoie (déplacements confirmés, fichiers à refaire).
+        """
+
+        confirmed = 0
+        redo = 0
+        for src, dst in list(self.in_flight.items()) :
+            if not os.path.exists(src) and os.path.exists(dst) :
+                self._write({"op": "done", "src": src, "dst": dst})
+                confirmed += 1
+            else :
+                redo += 1
+            del self.in_flight[src]
+
+        self.moved += confirmed
+        self.sync()
+
+        return confirmed, redo
+
+    # endregion
+
+    # region |---| Métadonnées (interface de MetadataCache)
+
+    def get(
+            self,
+            path: Path,
+            stat: os.stat_result|None=None
+        ) -> Metadata|None :
+
+        entry = self.metadata.get(os.path.abspath(path))
+        if entry is not None :
+            size, mtime_ns, metadata = entry
+            if stat is None :
+                stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns) :
+                return metadata
+
+        if self.cache is not None :
+            return self.cache.get(path, stat)
+
+        return None
+
+    def put(
+            self,
+            path: Path,
+            metadata: Metadata,
+            stat: os.stat_result|None=None
+        ) -> None :
+
+        if stat is None :
+            stat = os.stat(path)
+
+        lat, lon, date = metadata
+        self._write({
+            "op": "meta",
+            "path": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "lat": lat,
+            "lon": lon,
+            "date": date.isoformat() if date else None
+        })
+
+        if self.cache is not None :
+            self.cache.put(path, metadata, stat)
+
+    # endregion
+
+    # region |---| Déplacements
+
+    def begin(self, move: "Move") -> None :
+        self._write({"op": "begin", "src": os.path.abspath(move.src), "dst": os.path.abspath(move.dst)})
+
+    def done(self, move: "Move") -> None :
+        self._write({"op": "done", "src": os.path.abspath(move.src), "dst": os.path.abspath(move.dst)})
+        self.moved += 1
+
+    # endregion
+
+    # region |---| Ecriture
+
+    def _write(self, entry: dict) -> None :
+
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        self._pending += 1
+        if self._pending >= self.fsync_every :
+            self.sync()
+
+    def sync(self) -> None :
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self, completed: bool=False) -> None :
+        """
+        Ferme le journal. Un tri terminé n'a plus besoin de son journal.
+        """
+
+        self.sync()
+        self._file.close()
+
+        if completed :
+            os.remove(self.path)
+
+    # endregion
@@ -2,19 +2,41 @@ import sys
 from pathlib import Path
 import streamlit as st
 import folium
-from folium.plugins import Draw
+from folium.plugins import Draw, FastMarkerCluster
 from streamlit_folium import st_folium
-from datetime import datetime
+from datetime import (
+    date,
+    datetime,
+    timedelta
+)
+import numpy as np
+import pandas as pd
 import json
+import math
+import html
 import hashlib
-from photobot.utils import (
-    get_jpg_metadata,
-    get_mp4_metadata
+from photobot.cache import MetadataCache
+from photobot.pipeline import iter_classified
+from photobot.groups import save_drawn_groups
+from photobot.clusters import (
+    update_clusters,
+    suggest_groups
+)
+from photobot.thumbnails import (
+    ThumbnailCache,
+    thumbnail_data_uri
 )
 from photobot.parameters import (
-    IMG_EXTENSIONS,
-    VIDEO_EXTENSIONS,
     DRAWN_GROUP_DATA_PATH,
+    MAP_CLUSTER_THRESHOLD,
+    MAP_CELLS_PER_TILE,
+    MAP_GRID_CELL_DEG,
+    MAP_VIEWPORT_MARGIN,
+    MAP_WIDTH,
+    MAP_HEIGHT,
+    MAP_THUMBNAIL_LIMIT,
+    MAP_THUMBNAIL_REFRESH,
+    THUMBNAIL_SIZE
 )
 
 
@@ -22,6 +44,9 @@ assert len(sys.argv) > 1
 photos_path = Path(sys.argv[1])
 RECURSIVE = "-r" in sys.argv
 
+# (sud, ouest, nord, est) en degrés, longitudes non normalisées comme renvoyées par Leaflet
+Bounds = tuple[float, float, float, float]
+
 # region UTILS
 
 def feature_hash(feature: dict) -> str:
@@ -38,64 +63,302 @@ def feature_hash(feature: dict) -> str:
 
 # region LOGIC
 
-@st.cache_data
 def load_photos_videos(
     medias_path: Path,
     recursive: bool=RECURSIVE
-) -> list[dict] :
+) -> pd.DataFrame :
+    """
+    Points géolocalisés en colonnes (nom, chemin, lat/lon en float32, date en datetime64),
+    triés par date, les médias sans date à la fin.
+    """
 
-    points = []
+    noms = []
+    paths = []
+    lats = []
+    lons = []
+    dates = []
+
+    with MetadataCache() as cache :
+        for media in iter_classified(medias_path, recursive=recursive, cache=cache):
+            if media.lat and media.lon:
+                noms.append(media.path.name)
+                paths.append(str(media.path))
+                lats.append(media.lat)
+                lons.append(media.lon)
+                # Heure locale de prise de vue, comme affichée auparavant
+                dates.append(media.date.replace(tzinfo=None) if media.date else None)
+
+    points = pd.DataFrame({
+        "nom": pd.Series(noms, dtype="string"),
+        "path": pd.Series(paths, dtype="string"),
+        "lat": np.array(lats, dtype=np.float32),
+        "lon": np.array(lons, dtype=np.float32),
+        "date": pd.to_datetime(pd.Series(dates, dtype=object)),
+    })
+
+    return points.sort_values("date", na_position="last", kind="stable").reset_index(drop=True)
+
+
+def dated_count(points: pd.DataFrame) -> int :
+    return int(points["date"].notna().sum())
+
+
+def date_range(
+    points: pd.DataFrame,
+    start_date: date|None, 
+    end_date: date|None) -> tuple[int, int] :
+    """
+    Positions [lo, hi) des points dont la date (jour) est dans [start_date, end_date],
+    par recherche dichotomique sur la colonne de dates triée.
+    Sans bornes (aucun point daté), la plage est vide.
+    """
 
-    if recursive :
-        all_files = set().union(*[medias_path.rglob(f"*{suffix}") for suffix in IMG_EXTENSIONS + VIDEO_EXTENSIONS])
-    else :
-        all_files = set().union(*[medias_path.glob(f"*{suffix}") for suffix in IMG_EXTENSIONS + VIDEO_EXTENSIONS])
+    if start_date is None or end_date is None :
+        return 0, 0
 
-    for media_path in all_files:
-        filename = media_path.name
-        suffix = media_path.suffix
+    dates = points["date"].to_numpy()[:dated_count(points)]
 
-        if suffix in IMG_EXTENSIONS :
-            lat, lon, date = get_jpg_metadata(media_path)
-        elif suffix in VIDEO_EXTENSIONS :
-            lat, lon, date = get_mp4_metadata(media_path)
+    lo = np.searchsorted(dates, np.datetime64(start_date), side="left")
+    hi = np.searchsorted(dates, np.datetime64(end_date + timedelta(days=1)), side="left")
 
-        if date :
-            date_str = date.strftime("%Y:%m:%d %H:%M:%S")
-        else :
-            date_str = date
-        
-        if lat and lon:
-            points.append({"nom": filename, "lat": lat, "lon": lon, "date": date_str})
-    
-    return points
+    return int(lo), int(hi)
+
+
+def get_min_max_dates(points: pd.DataFrame) -> tuple[datetime|None, datetime|None] :
+
+    n = dated_count(points)
+    if n == 0 :
+        return None, None
+
+    dates = points["date"]
+    return dates.iloc[0].to_pydatetime(), dates.iloc[n - 1].to_pydatetime()
+
+
+class PointGrid :
+    """
+    Grille spatiale des points (cellules de MAP_GRID_CELL_DEG degrés).
+    Les positions des points sont triées par cellule : une ligne de cellules
+    est une plage contiguë, retrouvée par recherche dichotomique.
+    """
+
+    def __init__(
+            self,
+            points: pd.DataFrame,
+            cell_deg: float=MAP_GRID_CELL_DEG
+        ) -> None :
+
+        self.cell_deg = cell_deg
+        self.n_rows = math.ceil(180 / cell_deg)
+        self.n_cols = math.ceil(360 / cell_deg)
+
+        self.lats = points["lat"].to_numpy(dtype=np.float64)
+        self.lons = points["lon"].to_numpy(dtype=np.float64)
+
+        keys = self._row(self.lats) * self.n_cols + self._col(self.lons)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def _row(self, lat: np.ndarray|float) -> np.ndarray :
+        return np.clip(np.floor((np.asarray(lat) + 90) / self.cell_deg), 0, self.n_rows - 1).astype(np.int64)
+
+    def _col(self, lon: np.ndarray|float) -> np.ndarray :
+        return np.clip(np.floor((np.asarray(lon) + 180) / self.cell_deg), 0, self.n_cols - 1).astype(np.int64)
+
+    def densest_center(self) -> list[float]|None :
+        """
+        Barycentre de la cellule la plus peuplée (vue initiale), None sans points.
+        """
+
+        if len(self.keys) == 0 :
+            return None
+
+        _, starts, counts = np.unique(self.keys, return_index=True, return_counts=True)
+        best = int(np.argmax(counts))
+        positions = self.order[starts[best]:starts[best] + counts[best]]
+
+        return [float(self.lats[positions].mean()), float(self.lons[positions].mean())]
+
+    def query(self, bounds: Bounds) -> np.ndarray :
+        """
+        Positions (croissantes) des points dans bounds.
+        """
+
+        south, west, north, east = bounds
+        south, north = max(south, -90.), min(north, 90.)
+        if south > north or len(self.keys) == 0 :
+            return np.empty(0, dtype=np.int64)
+
+        lon_ranges = _lon_ranges(west, east)
+
+        chunks = []
+        for row in range(int(self._row(south)), int(self._row(north)) + 1) :
+            for lon_min, lon_max in lon_ranges :
+                lo = np.searchsorted(self.keys, row * self.n_cols + self._col(lon_min), side="left")
+                hi = np.searchsorted(self.keys, row * self.n_cols + self._col(lon_max), side="right")
+                chunks.append(self.order[lo:hi])
+
+        candidates = np.concatenate(chunks)
+
+        # Les cellules de bord débordent de la vue : filtre exact
+        lats = self.lats[candidates]
+        lons = self.lons[candidates]
+        inside = np.zeros(len(candidates), dtype=bool)
+        for lon_min, lon_max in lon_ranges :
+            inside |= (lons >= lon_min) & (lons <= lon_max)
+        inside &= (lats >= south) & (lats <= north)
+
+        return np.sort(candidates[inside])
+
+
+def _lon_ranges(
+        west: float,
+        east: float
+    ) -> list[tuple[float, float]] :
+    """
+    Intervalles de longitudes dans [-180, 180] couverts par [west, east],
+    coupé en deux s'il traverse l'antiméridien.
+    """
+
+    if east - west >= 360 :
+        return [(-180., 180.)]
+
+    west_n = (west + 180) % 360 - 180
+    east_n = west_n + (east - west)
+    if east_n <= 180 :
+        return [(west_n, east_n)]
+
+    return [(west_n, 180.), (-180., east_n - 360)]
+
+
+@st.cache_resource
+def load_map_points(
+    medias_path: Path,
+    recursive: bool=RECURSIVE
+) -> tuple[pd.DataFrame, PointGrid] :
+    """
+    Points et leur grille, construits ensemble en un seul parcours : les positions
+    renvoyées par la grille sont celles de ce DataFrame.
+    Mis en cache par chemin : les reruns Streamlit ne re-hashent pas les points.
+    """
+
+    points = load_photos_videos(medias_path, recursive)
+    return points, PointGrid(points)
+
+
+def estimate_bounds(
+        center: list[float],
+        zoom: int,
+        width: int=MAP_WIDTH,
+        height: int=MAP_HEIGHT
+    ) -> Bounds :
+    """
+    Vue d'une carte Web Mercator de width x height px, avant que st_folium
+    ne renvoie les vraies limites.
+    """
+
+    world_px = 256 * 2 ** zoom
+    half_lon = width / 2 * 360 / world_px
+
+    lat, lon = center
+    y = math.log(math.tan(math.pi / 4 + math.radians(max(min(lat, 85.), -85.)) / 2))
+    half_y = height / 2 * 2 * math.pi / world_px
+
+    def _lat(y: float) -> float :
+        return math.degrees(2 * math.atan(math.exp(y)) - math.pi / 2)
+
+    return _lat(y - half_y), lon - half_lon, _lat(y + half_y), lon + half_lon
+
+
+def expand_bounds(
+        bounds: Bounds,
+        margin: float=MAP_VIEWPORT_MARGIN
+    ) -> Bounds :
+
+    south, west, north, east = bounds
+    dlat = (north - south) * margin
+    dlon = (east - west) * margin
+
+    return max(south - dlat, -90.), west - dlon, min(north + dlat, 90.), east + dlon
+
+
+def contains_bounds(
+        outer: Bounds,
+        inner: Bounds
+    ) -> bool :
+
+    return (
+        outer[0] <= inner[0] and outer[1] <= inner[1]
+        and outer[2] >= inner[2] and outer[3] >= inner[3]
+    )
+
+
+def parse_bounds(bounds: dict|None) -> Bounds|None :
+    """
+    Limites renvoyées par st_folium ({"_southWest": {"lat", "lng"}, "_northEast": ...}).
+    """
 
+    try :
+        south_west = bounds["_southWest"]
+        north_east = bounds["_northEast"]
+        parsed = (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"])
+    except (TypeError, KeyError) :
+        return None
 
-@st.cache_data
-def filter_points(
-    points: list[dict],
-    start_date: datetime, 
-    end_date: datetime) -> list[dict] :
+    if any(v is None for v in parsed) :
+        return None
 
-    filtered_points = []
-    for p in points:
-        if not p["date"]:
-            continue
-        d = datetime.strptime(p["date"], "%Y:%m:%d %H:%M:%S")
-        if start_date <= d.date() <= end_date:
-            filtered_points.append(p)
+    return tuple(float(v) for v in parsed)
+
+
+def aggregate_points(
+        points: pd.DataFrame,
+        zoom: int
+) -> list[list] :
+    """
+    Agrège les points par cellule d'une grille dont la taille dépend du zoom
+    (MAP_CELLS_PER_TILE cellules par tuile). Renvoie [lat, lon, nombre, libellé]
+    par cellule, au barycentre de ses points.
+    """
 
-    return filtered_points
+    cell_deg = 360 / (2 ** zoom) / MAP_CELLS_PER_TILE
 
+    lats = points["lat"].to_numpy(dtype=np.float64)
+    lons = points["lon"].to_numpy(dtype=np.float64)
+    keys = np.stack([np.floor(lats / cell_deg), np.floor(lons / cell_deg)], axis=1)
 
-@st.cache_data
-def get_min_max_dates(points: list[dict]) -> tuple[datetime, datetime] :
+    _, first, inverse, counts = np.unique(keys, axis=0, return_index=True, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    lat_means = np.bincount(inverse, weights=lats) / counts
+    lon_means = np.bincount(inverse, weights=lons) / counts
+
+    noms = points["nom"].to_numpy()
+
+    return [
+        [float(lat), float(lon), int(count), noms[i] if count == 1 else f"{count} médias"]
+        for lat, lon, count, i in zip(lat_means, lon_means, counts, first)
+    ]
+
+
+@st.cache_resource
+def load_thumbnail_cache() -> ThumbnailCache :
+    return ThumbnailCache()
+
+
+def media_popup(
+        nom: str,
+        thumb_path: Path|None
+    ) -> folium.Popup :
+    """
+    Popup d'un média : sa miniature si elle est prête, puis son nom.
+    """
 
-    dates = [datetime.strptime(p["date"], "%Y:%m:%d %H:%M:%S") for p in points if p["date"]]
-    min_date = min(dates) if dates else None
-    max_date = max(dates) if dates else None
+    content = html.escape(nom)
 
-    return min_date, max_date
+    data_uri = thumbnail_data_uri(thumb_path) if thumb_path is not None else None
+    if data_uri is not None :
+        content = f'<img src="{data_uri}" style="display:block;max-width:{THUMBNAIL_SIZE}px"/>{content}'
+
+    return folium.Popup(content, max_width=THUMBNAIL_SIZE + 40)
 
 
 def export_groups(
@@ -132,16 +395,26 @@ def export_groups(
             })
     
     
+    return save_groups(groups, existing_groups)
+
+
+def save_groups(
+        groups: list[dict],
+        existing_groups: list[dict]
+) -> list[dict] :
+    """
+    Ajoute à groups.json les groupes qui n'y sont pas encore.
+    """
+
     existing_ids = [g.get("id", None) for g in existing_groups]
     new_groups = [g for g in groups if g["id"] not in existing_ids]
 
     if not new_groups :
         st.warning("⚠️ pas de nouveau groupe...")
         return existing_groups
-    
-    with open(DRAWN_GROUP_DATA_PATH, "w", encoding="utf-8") as f:
-        new_existing_groups = existing_groups + new_groups
-        json.dump({"groups": new_existing_groups}, f, indent=2)
+
+    new_existing_groups = existing_groups + new_groups
+    save_drawn_groups(new_existing_groups)
     
     st.success("✅ groups.json actualisé !")
 
@@ -152,59 +425,104 @@ def export_groups(
 
 # region WIDGETS
 
+# Marqueur d'une cellule agrégée : row = [lat, lon, nombre, libellé]
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var radius = Math.min(4 + 2 * Math.log2(row[2]), 20);
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: radius,
+        color: "blue",
+        fill: true,
+        fillOpacity: 0.6
+    });
+    marker.bindPopup(String(row[3]));
+    return marker;
+}
+"""
+
+
+def add_group_shape(
+    m: folium.Map,
+    g: dict,
+    color: str,
+    dash_array: str|None=None
+) -> None :
+
+    nom = g.get("nom", "Sans nom")
+    gtype = g.get("type", "")
+
+    if gtype == "circle":
+        folium.Circle(
+            location=[g["latitude"], g["longitude"]],
+            radius=g["rayon_km"] * 1000,
+            color=color,
+            dash_array=dash_array,
+            fill=True,
+            fill_opacity=0.3,
+            popup=nom
+        ).add_to(m)
+
+    elif gtype == "polygone" and "coordinates" in g:
+        coords = g["coordinates"]
+        # Folium attend [lat, lon]
+        coords_latlon = [(pt[1], pt[0]) for pt in coords]
+        folium.Polygon(
+            locations=coords_latlon,
+            color=color,
+            dash_array=dash_array,
+            fill=True,
+            fill_opacity=0.3,
+            popup=nom
+        ).add_to(m)
+
+
 @st.fragment
 def render_map(
-    filtered_points: list[dict],
-    existing_groups: list[dict]
+    filtered_points: pd.DataFrame,
+    existing_groups: list[dict],
+    center: list[float],
+    zoom: int=6,
+    thumbnail_paths: dict[str, Path|None]|None=None,
+    suggested_groups: list[dict]|None=None
 ) -> None :
+    """
+    filtered_points : seulement les points de la vue courante et de sa marge.
+    thumbnail_paths : miniature prête (ou None) par chemin de média, pour les popups.
+    suggested_groups : groupes suggérés, pas encore enregistrés (en pointillés).
+    """
+
+    thumbnail_paths = thumbnail_paths or {}
 
-    if len(filtered_points) == 0 :
-        return
-    
-    avg_lat = sum(p["lat"] for p in filtered_points) / len(filtered_points)
-    avg_lon = sum(p["lon"] for p in filtered_points) / len(filtered_points)
-    
     # After creating the map
-    m = folium.Map(location=[avg_lat, avg_lon], zoom_start=6)
+    m = folium.Map(location=center, zoom_start=zoom)
 
     # Existing groups
-    if existing_groups:
-        for g in existing_groups:
-            nom = g.get("nom", "Sans nom")
-            gtype = g.get("type", "")
-            
-            if gtype == "circle":
-                folium.Circle(
-                    location=[g["latitude"], g["longitude"]],
-                    radius=g["rayon_km"] * 1000,
-                    color="green",
-                    fill=True,
-                    fill_opacity=0.3,
-                    popup=nom
-                ).add_to(m)
-
-            elif gtype == "polygone" and "coordinates" in g:
-                coords = g["coordinates"]
-                # Folium attend [lat, lon]
-                coords_latlon = [(pt[1], pt[0]) for pt in coords]
-                folium.Polygon(
-                    locations=coords_latlon,
-                    color="green",
-                    fill=True,
-                    fill_opacity=0.3,
-                    popup=nom
-                ).add_to(m)
+    for g in existing_groups or [] :
+        add_group_shape(m, g, color="green")
+
+    # Suggested groups
+    for g in suggested_groups or [] :
+        add_group_shape(m, g, color="orange", dash_array="6")
 
 
     # Add photos
-    for p in filtered_points:
-        folium.CircleMarker(
-            location=[p["lat"], p["lon"]],
-            radius=4,
-            color="blue",
-            fill=True,
-            fill_opacity=0.6,
-            popup=f"{p['nom']}"
+    if len(filtered_points) <= MAP_CLUSTER_THRESHOLD :
+        for nom, path, lat, lon in zip(filtered_points["nom"], filtered_points["path"], filtered_points["lat"], filtered_points["lon"]):
+            folium.CircleMarker(
+                location=[float(lat), float(lon)],
+                radius=4,
+                color="blue",
+                fill=True,
+                fill_opacity=0.6,
+                popup=media_popup(nom, thumbnail_paths.get(path))
+            ).add_to(m)
+
+    else :
+        # Grosse bibliothèque : agrégation côté serveur selon le zoom,
+        # puis clustering côté client à partir d'un simple tableau JS
+        FastMarkerCluster(
+            data=aggregate_points(filtered_points, zoom),
+            callback=CLUSTER_MARKER_CALLBACK
         ).add_to(m)
 
     # Add Draw plugin
@@ -226,6 +544,17 @@ def render_map(
     return m
 
 
+@st.fragment(run_every=MAP_THUMBNAIL_REFRESH)
+def refresh_thumbnails(generation: int) -> None :
+    """
+    Relance l'application dès que de nouvelles miniatures sont prêtes :
+    la carte n'attend jamais leur génération.
+    """
+
+    if load_thumbnail_cache().generation != generation :
+        st.rerun(scope="app")
+
+
 @st.dialog(f"Nom du groupe")
 def ask_group_name(idx: str) -> str :
 
@@ -249,6 +578,40 @@ def groups_sidebar(existing_groups: list[dict]) -> None :
             type_g = g.get("type", "inconnu")
             st.sidebar.markdown(f"**• {nom}** — _{type_g}_")
 
+
+def suggestions_sidebar(existing_groups: list[dict]) -> None :
+
+    st.sidebar.title("💡 Suggestions")
+
+    shape = st.sidebar.radio(
+        "Forme",
+        options=["circle", "polygone"],
+        format_func=lambda s : "Cercles" if s == "circle" else "Polygones",
+        horizontal=True
+    )
+
+    # Clustering incrémental : seuls les médias ajoutés au cache depuis la dernière fois sont traités
+    if st.sidebar.button("Suggérer des groupes") :
+        with st.spinner("Recherche des lieux fréquents...") :
+            index, _, _ = update_clusters()
+        st.session_state.suggested_groups = suggest_groups(index, existing_groups, shape=shape)
+        if not st.session_state.suggested_groups :
+            st.sidebar.info("Aucun nouveau lieu fréquent.")
+
+    suggested_groups = st.session_state.get("suggested_groups", [])
+    for g in suggested_groups :
+        st.sidebar.markdown(f"**• {g['nom']}** — _{g['type']}_")
+
+    if suggested_groups :
+        col1, col2 = st.sidebar.columns(2)
+        if col1.button("Ajouter") :
+            st.session_state.existing_groups = save_groups(suggested_groups, existing_groups)
+            st.session_state.suggested_groups = []
+            st.rerun()
+        if col2.button("Ignorer") :
+            st.session_state.suggested_groups = []
+            st.rerun()
+
 # endregion
 
 
@@ -277,8 +640,9 @@ if "groups_dict" not in st.session_state:
 # endregion
 
 groups_sidebar(existing_groups=st.session_state.existing_groups)
+suggestions_sidebar(existing_groups=st.session_state.existing_groups)
 
-points = load_photos_videos(photos_path)
+points, point_grid = load_map_points(photos_path)
 
 min_date, max_date = get_min_max_dates(points)
 
@@ -286,17 +650,66 @@ col1, col2= st.columns(2, vertical_alignment="bottom")
 start_date = col1.date_input("📅 Date début", min_value=min_date, max_value=max_date, value=min_date)
 end_date = col2.date_input("📅 Date fin", min_value=min_date, max_value=max_date, value=max_date)
 
-filtered_points = filter_points(
+lo, hi = date_range(
     points=points, 
     start_date=start_date,
     end_date=end_date
 )
 
+# Vue courante (zoom, centre, limites) renvoyée par la carte au passage précédent
+view = st.session_state.get("map_view", {})
+zoom = view.get("zoom", 6)
+center = view.get("center") or point_grid.densest_center() or [0., 0.]
+bounds = view.get("bounds") or estimate_bounds(center, zoom)
+
+# Seuls les points de la vue et de sa marge sont envoyés à la carte
+loaded_bounds = expand_bounds(bounds)
+positions = point_grid.query(loaded_bounds)
+positions = positions[(positions >= lo) & (positions < hi)]
+filtered_points = points.iloc[positions]
+
+# Miniatures des popups : celles qui manquent sont générées en arrière-plan
+thumbnails = load_thumbnail_cache()
+generation = thumbnails.generation
+thumbnail_paths = {}
+if len(filtered_points) <= MAP_THUMBNAIL_LIMIT :
+    thumbnail_paths = {path: thumbnails.get(Path(path)) for path in filtered_points["path"]}
+
 map = render_map(
     filtered_points=filtered_points,
-    existing_groups=st.session_state.existing_groups
+    existing_groups=st.session_state.existing_groups,
+    center=center,
+    zoom=zoom,
+    thumbnail_paths=thumbnail_paths,
+    suggested_groups=st.session_state.get("suggested_groups")
 )
-drawn_groups = st_folium(map, width=1400, height=500, returned_objects=["all_drawings"])
+drawn_groups = st_folium(
+    map,
+    width=MAP_WIDTH,
+    height=MAP_HEIGHT,
+    center=view.get("center"),
+    zoom=view.get("zoom"),
+    returned_objects=["all_drawings", "zoom", "center", "bounds"]
+)
+
+if drawn_groups and drawn_groups.get("zoom") is not None and drawn_groups.get("center") :
+    new_bounds = parse_bounds(drawn_groups.get("bounds"))
+    st.session_state.map_view = {
+        "zoom": drawn_groups["zoom"],
+        "center": [drawn_groups["center"]["lat"], drawn_groups["center"]["lng"]],
+        "bounds": new_bounds
+    }
+
+    # Vue sortie de la zone chargée (déplacement, dézoom) : on charge les points autour.
+    # L'agrégation dépend du zoom : on la recalcule aussi quand il change
+    if (
+        (new_bounds is not None and not contains_bounds(loaded_bounds, new_bounds))
+        or (len(filtered_points) > MAP_CLUSTER_THRESHOLD and drawn_groups["zoom"] != zoom)
+    ) :
+        st.rerun()
+
+if thumbnails.pending :
+    refresh_thumbnails(generation)
 
 if drawn_groups and drawn_groups.get("all_drawings"):
 
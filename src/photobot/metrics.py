@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import heapq
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterable, Iterator
+from photobot.parameters import (
+    METRICS_SLOWEST_FILES,
+    METRICS_HISTOGRAM_BUCKETS
+)
+
+if TYPE_CHECKING :
+    from photobot.discovery import MediaFile
+
+
+def read_io_bytes() -> int|None :
+    """
+    Octets lus par ce processus (rchar de /proc/self/io, Linux seulement).
+    """
+
+    try :
+        with open("/proc/self/io", "r") as f :
+            for line in f :
+                if line.startswith("rchar:") :
+                    return int(line.split()[1])
+    except OSError :
+        pass
+
+    return None
+
+
+class SortMetrics :
+    """
+    Chronomètres par étape et compteurs d'un tri.
+    Les étapes s'emboîtent (le pipeline est paresseux : la découverte avance
+    quand l'extraction demande un fichier) : chaque étape ne compte que son
+    temps propre, hors étapes imbriquées.
+    """
+
+    def __init__(self) -> None :
+
+        self.stages = Counter()
+        self.counters = Counter()
+        self.groups = Counter()
+        self.exiftool = Counter()
+
+        # Histogramme des durées d'extraction : une case par borne, plus +Inf
+        self.histogram = [0] * (len(METRICS_HISTOGRAM_BUCKETS) + 1)
+        self.extraction_seconds = 0.
+        self._slowest = []
+
+        self._stack = []
+        self._last = None
+        self._start = time.perf_counter()
+        self._io_start = read_io_bytes()
+        self.total_seconds = None
+        self.io_read_bytes = None
+
+    # region |---| Etapes
+
+    def _switch(self) -> None :
+
+        now = time.perf_counter()
+        if self._stack :
+            self.stages[self._stack[-1]] += now - self._last
+        self._last = now
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None] :
+
+        self._switch()
+        self._stack.append(name)
+        try :
+            yield
+        finally :
+            self._switch()
+            self._stack.pop()
+
+    def wrap(
+            self,
+            name: str,
+            iterable: Iterable
+        ) -> Iterator :
+        """
+        Compte dans l'étape name le temps passé à produire chaque élément.
+        """
+
+        iterator = iter(iterable)
+        while True :
+            with self.stage(name) :
+                try :
+                    item = next(iterator)
+                except StopIteration :
+                    return
+            yield item
+
+    # endregion
+
+    # region |---| Relevés
+
+    def record_extraction(
+            self,
+            batch: list["MediaFile"],
+            hits: dict[Path, tuple],
+            durations: dict[Path, float],
+            exiftool_calls: dict
+        ) -> None :
+
+        self.counters["cache_hits"] += len(hits)
+        self.counters["extracted"] += len(durations)
+        self.exiftool.update(exiftool_calls)
+
+        for media in batch :
+            seconds = durations.get(media.path)
+            if seconds is None :
+                continue
+
+            if media.stat is not None :
+                self.counters["extracted_bytes"] += media.stat.st_size
+
+            self.extraction_seconds += seconds
+            bucket = next(
+                (i for i, bound in enumerate(METRICS_HISTOGRAM_BUCKETS) if seconds <= bound),
+                len(METRICS_HISTOGRAM_BUCKETS)
+            )
+            self.histogram[bucket] += 1
+
+            entry = (seconds, str(media.path))
+            if len(self._slowest) < METRICS_SLOWEST_FILES :
+                heapq.heappush(self._slowest, entry)
+            else :
+                heapq.heappushpop(self._slowest, entry)
+
+    def record_classification(
+            self,
+            lat: float|None,
+            lon: float|None,
+            date,
+            group: dict|None
+        ) -> None :
+
+        self.counters["files"] += 1
+        if lat is not None and lon is not None :
+            self.counters["with_gps"] += 1
+        if date is not None :
+            self.counters["with_date"] += 1
+
+        self.groups[group["nom"] if group else None] += 1
+
+    def finish(self) -> None :
+
+        self.total_seconds = time.perf_counter() - self._start
+
+        io_end = read_io_bytes()
+        if self._io_start is not None and io_end is not None :
+            self.io_read_bytes = io_end - self._io_start
+
+    # endregion
+
+    # region |---| Export
+
+    def to_dict(self) -> dict :
+
+        total = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self._start
+        files = self.counters["files"]
+
+        return {
+            "total_seconds": round(total, 6),
+            "files": files,
+            "files_per_second": round(files / total, 1) if total > 0 else None,
+            "io_read_bytes": self.io_read_bytes,
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "exiftool": dict(self.exiftool),
+            "groups": {
+                "matched": sum(n for name, n in self.groups.items() if name is not None),
+                "unmatched": self.groups[None],
+                "by_group": {name: n for name, n in self.groups.most_common() if name is not None}
+            },
+            "extraction": {
+                "seconds": round(self.extraction_seconds, 6),
+                "histogram": {
+                    **{str(bound): n for bound, n in zip(METRICS_HISTOGRAM_BUCKETS, self.histogram)},
+                    "+Inf": self.histogram[-1]
+                }
+            },
+            "slowest_files": [
+                {"path": path, "seconds": round(seconds, 6)}
+                for seconds, path in sorted(self._slowest, reverse=True)
+            ]
+        }
+
+    def to_prometheus(self) -> str :
+        """
+        Format texte de Prometheus, pour le collecteur textfile de node_exporter.
+        """
+
+        data = self.to_dict()
+        lines = []
+
+        def _metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]) -> None :
+            lines.append(f"# HELP photobot_sort_{name} {help_text}")
+            lines.append(f"# TYPE photobot_sort_{name} {kind}")
+            for labels, value in samples :
+                lines.append(f"photobot_sort_{name}{labels} {value}")
+
+        _metric("duration_seconds", "gauge", "Durée totale du dernier tri", [("", data["total_seconds"])])
+        _metric("last_run_timestamp_seconds", "gauge", "Fin du dernier tri", [("", round(time.time(), 3))])
+        _metric("files", "gauge", "Médias traités", [("", data["files"])])
+        _metric("stage_seconds", "gauge", "Temps propre de chaque étape", [
+            (f'{{stage="{_escape(name)}"}}', seconds) for name, seconds in data["stages"].items()
+        ])
+        _metric("events", "gauge", "Compteurs du dernier tri", [
+            (f'{{counter="{_escape(name)}"}}', value) for name, value in data["counters"].items()
+        ])
+        _metric("exiftool", "gauge", "Appels à ExifTool", [
+            (f'{{counter="{_escape(name)}"}}', value) for name, value in data["exiftool"].items()
+        ])
+        _metric("group_matches", "gauge", "Médias par groupe", [
+            (f'{{group="{_escape(name)}"}}', n) for name, n in data["groups"]["by_group"].items()
+        ] + [('{group=""}', data["groups"]["unmatched"])])
+
+        if data["io_read_bytes"] is not None :
+            _metric("io_read_bytes", "gauge", "Octets lus par le processus principal", [("", data["io_read_bytes"])])
+
+        # Histogramme cumulatif
+        cumulative = 0
+        samples = []
+        for bound, n in zip(METRICS_HISTOGRAM_BUCKETS, self.histogram) :
+            cumulative += n
+            samples.append((f'_bucket{{le="{bound}"}}', cumulative))
+        cumulative += self.histogram[-1]
+        samples.append(('_bucket{le="+Inf"}', cumulative))
+        samples.append(("_sum", round(self.extraction_seconds, 6)))
+        samples.append(("_count", cumulative))
+        _metric("extraction_seconds", "histogram", "Durée d'extraction des métadonnées par média", samples)
+
+        return "\n".join(lines) + "\n"
+
+    def write(
+            self,
+            path: Path,
+            fmt: str="auto"
+        ) -> None :
+        """
+        Ecrit les métriques en JSON, ou au format Prometheus (fmt="prometheus"
+        ou extension .prom). Ecriture atomique : le collecteur ne lit jamais
+        un fichier à moitié écrit.
+        """
+
+        if fmt == "auto" :
+            fmt = "prometheus" if path.suffix == ".prom" else "json"
+
+        content = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.to_dict(), indent=2, ensure_ascii=False) + "\n"
+
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f :
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    # endregion
+
+
+def _escape(value: str) -> str :
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
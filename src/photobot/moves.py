@@ -0,0 +1,428 @@
+import os
+import json
+import errno
+import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple
+from photobot.parameters import (
+    MOVE_BATCH_SIZE,
+    COPY_WORKERS,
+    HASH_CHUNK_SIZE
+)
+from photobot.utils import (
+    hash_file,
+    iter_batches,
+    ordered_map
+)
+
+if TYPE_CHECKING :
+    from photobot.journal import SortJournal
+
+
+PLACEMENT_MODES = ("move", "copy", "hardlink", "symlink", "reflink")
+
+# ioctl de clonage de fichier (linux/fs.h)
+FICLONE = 0x40049409
+
+# Erreurs signifiant "non supporté ici" : on passe à la méthode de copie suivante
+ZERO_COPY_ERRNOS = frozenset({
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY
+})
+
+
+class Move(NamedTuple) :
+    src: Path
+    dst: Path
+    # "move", "skip" (doublon laissé dans la source) ou "link" (doublon remplacé par un lien vers original)
+    kind: str="move"
+    original: Path|None=None
+
+
+# region MANIFESTE
+
+def write_manifest(
+        moves: Iterable[Move],
+        manifest_path: Path
+    ) -> Iterator[Move] :
+    """
+    Ecrit chaque déplacement prévu (une ligne JSON par fichier) au fil de l'eau,
+    et le renvoie pour pouvoir enchaîner sur l'exécution.
+    """
+
+    os.makedirs(manifest_path.parent, exist_ok=True)
+
+    with open(manifest_path, "w", encoding="utf-8") as f :
+        for move in moves :
+            entry = {"src": str(move.src), "dst": str(move.dst)}
+            if move.kind != "move" :
+                entry["kind"] = move.kind
+                entry["original"] = str(move.original)
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            yield move
+
+
+def read_manifest(manifest_path: Path) -> Iterator[Move] :
+
+    with open(manifest_path, "r", encoding="utf-8") as f :
+        for line in f :
+            if line.strip() :
+                entry = json.loads(line)
+                original = entry.get("original")
+                yield Move(
+                    Path(entry["src"]),
+                    Path(entry["dst"]),
+                    entry.get("kind", "move"),
+                    Path(original) if original else None
+                )
+
+# endregion
+
+
+# region PLACEMENT
+
+def _is_same_file(
+        src: Path,
+        dst: Path
+    ) -> bool :
+
+    try :
+        return os.path.samefile(src, dst)
+    except OSError :
+        return False
+
+
+def _is_up_to_date(
+        src: Path,
+        dst: Path
+    ) -> bool :
+    """
+    Copie déjà faite (tri relancé, reprise) : même taille et même date de modification.
+    """
+
+    try :
+        src_stat = os.stat(src)
+        dst_stat = os.stat(dst)
+    except OSError :
+        return False
+
+    return (src_stat.st_size, src_stat.st_mtime_ns) == (dst_stat.st_size, dst_stat.st_mtime_ns)
+
+
+def _copy_data(
+        fd_in: int,
+        fd_out: int,
+        size: int
+    ) -> None :
+    """
+    Copie dans le noyau : copy_file_range (et copie côté serveur sur NFS/SMB),
+    puis sendfile, puis lecture/écriture classique si aucun n'est supporté.
+    """
+
+    copied = 0
+
+    if hasattr(os, "copy_file_range") :
+        try :
+            while copied < size and (n := os.copy_file_range(fd_in, fd_out, size - copied)) :
+                copied += n
+        except OSError as e :
+            if e.errno not in ZERO_COPY_ERRNOS :
+                raise
+
+    if copied < size and hasattr(os, "sendfile") :
+        try :
+            while copied < size and (n := os.sendfile(fd_out, fd_in, copied, size - copied)) :
+                copied += n
+        except OSError as e :
+            if e.errno not in ZERO_COPY_ERRNOS :
+                raise
+
+    if copied < size :
+        os.lseek(fd_in, copied, os.SEEK_SET)
+        os.lseek(fd_out, copied, os.SEEK_SET)
+        while chunk := os.read(fd_in, HASH_CHUNK_SIZE) :
+            while chunk :
+                chunk = chunk[os.write(fd_out, chunk):]
+
+
+def _verify_copy(
+        src: Path,
+        dst: Path
+    ) -> None :
+
+    if hash_file(src) != hash_file(dst) :
+        os.remove(dst)
+        raise OSError(errno.EIO, "Copie différente de l'original", str(dst))
+
+
+def copy_file(
+        src: Path,
+        dst: Path,
+        verify: bool=False,
+        reflink: bool=False,
+        skip_up_to_date: bool=True
+    ) -> None :
+    """
+    Copie src vers dst en conservant les dates (le cache reste valide pour la copie).
+    Avec reflink, les données sont partagées (FICLONE, Btrfs/XFS) quand le
+    système de fichiers le permet, sinon copie classique.
+    Avec skip_up_to_date, un dst de même taille et même mtime est considéré
+    comme la copie déjà faite (sans lire son contenu).
+    """
+
+    if _is_same_file(src, dst) :
+        return
+    if skip_up_to_date and _is_up_to_date(src, dst) :
+        return
+
+    # On ne réécrit jamais un fichier existant en place : il peut partager ses données
+    if os.path.lexists(dst) :
+        os.remove(dst)
+
+    with open(src, "rb") as f_in, open(dst, "wb") as f_out :
+        cloned = False
+        if reflink :
+            cloned = _reflink(f_in.fileno(), f_out.fileno())
+        if not cloned :
+            _copy_data(f_in.fileno(), f_out.fileno(), os.fstat(f_in.fileno()).st_size)
+
+    shutil.copystat(src, dst)
+
+    if verify :
+        _verify_copy(src, dst)
+
+
+def _reflink(
+        fd_in: int,
+        fd_out: int
+    ) -> bool :
+
+    try :
+        import fcntl
+        fcntl.ioctl(fd_out, FICLONE, fd_in)
+    except ImportError :
+        return False
+    except OSError as e :
+        if e.errno not in ZERO_COPY_ERRNOS :
+            raise
+        return False
+
+    return True
+
+
+def move_file(
+        src: Path,
+        dst: Path,
+        verify: bool=False
+    ) -> None :
+    """
+    os.rename quand source et destination sont sur le même système de fichiers,
+    sinon copie + suppression.
+    """
+
+    if not rename_file(src, dst) :
+        # La source va être supprimée : un dst de même taille et même mtime peut
+        # être un autre fichier, il est donc toujours remplacé par la copie
+        copy_file(src, dst, verify=verify, skip_up_to_date=False)
+        os.remove(src)
+
+
+def rename_file(
+        src: Path,
+        dst: Path
+    ) -> bool :
+    """
+    Renvoie False si source et destination ne sont pas sur le même système de fichiers.
+    """
+
+    try :
+        os.rename(src, dst)
+    except OSError as e :
+        if e.errno != errno.EXDEV :
+            raise
+        return False
+
+    return True
+
+
+def hardlink_file(
+        src: Path,
+        dst: Path
+    ) -> None :
+
+    if _is_same_file(src, dst) :
+        return
+    if os.path.lexists(dst) :
+        os.remove(dst)
+    os.link(src, dst)
+
+
+def symlink_file(
+        src: Path,
+        dst: Path
+    ) -> None :
+
+    target = os.path.abspath(src)
+    if os.path.islink(dst) and os.readlink(dst) == target :
+        return
+    if os.path.lexists(dst) :
+        os.remove(dst)
+    os.symlink(target, dst)
+
+
+def link_file(
+        original: Path,
+        src: Path,
+        dst: Path,
+        remove_src: bool=True
+    ) -> None :
+    """
+    Remplace le doublon src par un lien physique dst vers original.
+    """
+
+    try :
+        os.link(original, dst)
+    except FileExistsError :
+        # Même nom, même contenu : le doublon est déjà à sa place
+        if not os.path.samefile(original, dst) :
+            raise
+    if remove_src :
+        os.remove(src)
+
+
+def place_file(
+        move: Move,
+        mode: str="move",
+        verify: bool=False
+    ) -> None :
+    """
+    Place move.src en move.dst selon le mode : move, copy, hardlink, symlink ou reflink.
+    """
+
+    if move.kind == "link" :
+        link_file(move.original, move.src, move.dst, remove_src=mode == "move")
+    elif mode == "move" :
+        move_file(move.src, move.dst, verify=verify)
+    elif mode == "copy" :
+        copy_file(move.src, move.dst, verify=verify)
+    elif mode == "reflink" :
+        copy_file(move.src, move.dst, verify=verify, reflink=True)
+    elif mode == "hardlink" :
+        hardlink_file(move.src, move.dst)
+    elif mode == "symlink" :
+        symlink_file(move.src, move.dst)
+    else :
+        raise ValueError(f"Mode de placement inconnu : {mode}")
+
+# endregion
+
+
+# region EXECUTION
+
+def group_by_folder(moves: list[Move]) -> dict[Path, list[Move]] :
+    """
+    Regroupe les déplacements par dossier cible, en gardant l'ordre d'origine
+    à l'intérieur de chaque dossier (même résultat en cas de noms en double).
+    """
+
+    folders = {}
+    for move in moves :
+        folders.setdefault(move.dst.parent, []).append(move)
+
+    return folders
+
+
+def execute_moves(
+        moves: Iterable[Move],
+        batch_size: int=MOVE_BATCH_SIZE,
+        journal: "SortJournal|None"=None,
+        mode: str="move",
+        verify: bool=False,
+        copy_workers: int=COPY_WORKERS
+    ) -> Iterator[Move] :
+    """
+    Exécute les déplacements par lots, dossier cible par dossier cible.
+    Chaque dossier n'est créé qu'une fois. Renvoie les déplacements effectués.
+    Avec un journal, chaque déplacement y est inscrit avant et après.
+    Les doublons "skip" sont ignorés, les liens sont faits après les déplacements
+    du lot (leur original peut en faire partie).
+    Les copies (mode copy/reflink, ou move entre deux systèmes de fichiers) sont
+    faites en parallèle par copy_workers threads.
+    """
+
+    if mode not in PLACEMENT_MODES :
+        raise ValueError(f"Mode de placement inconnu : {mode}")
+
+    created = set()
+
+    with ThreadPoolExecutor(max_workers=max(copy_workers, 1)) as executor :
+        for batch in iter_batches(moves, batch_size) :
+            yield from _execute_batch(batch, created, journal, mode, verify, executor, copy_workers)
+
+
+def _execute_batch(
+        batch: list[Move],
+        created: set[Path],
+        journal: "SortJournal|None",
+        mode: str,
+        verify: bool,
+        executor: ThreadPoolExecutor,
+        copy_workers: int
+    ) -> Iterator[Move] :
+
+    moves = [m for m in batch if m.kind == "move"]
+    links = [m for m in batch if m.kind == "link"]
+
+    for folder in list(group_by_folder(moves)) + list(group_by_folder(links)) :
+        if folder not in created :
+            os.makedirs(folder, exist_ok=True)
+            created.add(folder)
+
+    # Opérations sur les métadonnées du système de fichiers : directement
+    copies = []
+    for folder_moves in group_by_folder(moves).values() :
+        for move in folder_moves :
+            if journal is not None :
+                journal.begin(move)
+
+            if mode == "move" :
+                done = rename_file(move.src, move.dst)
+            elif mode in ("hardlink", "symlink") :
+                place_file(move, mode)
+                done = True
+            else :
+                done = False
+
+            if not done :
+                copies.append(move)
+                continue
+
+            if journal is not None :
+                journal.done(move)
+            yield move
+
+    # Copies de données : en parallèle (le journal reste écrit par ce thread)
+    def _copy(move: Move) -> None :
+        place_file(move, mode, verify=verify)
+
+    for move, _ in ordered_map(executor, _copy, copies, max_in_flight=2 * copy_workers) :
+        if journal is not None :
+            journal.done(move)
+        yield move
+
+    for folder_links in group_by_folder(links).values() :
+        for move in folder_links :
+            if journal is not None :
+                journal.begin(move)
+
+            place_file(move, mode)
+
+            if journal is not None :
+                journal.done(move)
+            yield move
+
+# endregion
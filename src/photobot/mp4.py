@@ -0,0 +1,258 @@
+import re
+import struct
+from pathlib import Path
+from datetime import (
+    datetime,
+    timedelta
+)
+from typing import BinaryIO, Iterator
+from photobot.parameters import MP4_MAX_META_SIZE
+
+
+# Origine des dates QuickTime / ISO BMFF
+MP4_EPOCH = datetime(1904, 1, 1)
+
+# "+48.8584+002.2945/" ou "+48.8584+002.2945+035.000/"
+ISO6709_PATTERN = re.compile(r"^([+-]\d{2}(?:\.\d+)?)([+-]\d{3}(?:\.\d+)?)")
+
+KEY_LOCATION = b"com.apple.quicktime.location.ISO6709"
+KEY_CREATION_DATE = b"com.apple.quicktime.creationdate"
+
+
+class Mp4ParseError(Exception) :
+    pass
+
+
+# region BOITES
+
+def _iter_boxes(
+        f: BinaryIO,
+        start: int,
+        end: int
+    ) -> Iterator[tuple[bytes, int, int]] :
+    """
+    Boîtes entre start et end : (type, début du contenu, fin).
+    Seuls les en-têtes sont lus, on saute directement d'une boîte à la suivante.
+    """
+
+    offset = start
+    while offset + 8 <= end :
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8 :
+            raise Mp4ParseError("Boîte tronquée")
+
+        size, box_type = struct.unpack(">L4s", header)
+        header_size = 8
+        if size == 1 :
+            large = f.read(8)
+            if len(large) < 8 :
+                raise Mp4ParseError("Boîte tronquée")
+            (size,) = struct.unpack(">Q", large)
+            header_size = 16
+        elif size == 0 :
+            size = end - offset
+
+        if size < header_size or offset + size > end :
+            raise Mp4ParseError("Boîte invalide")
+
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def _find_box(
+        f: BinaryIO,
+        start: int,
+        end: int,
+        box_type: bytes
+    ) -> tuple[int, int]|None :
+
+    for current_type, box_start, box_end in _iter_boxes(f, start, end) :
+        if current_type == box_type :
+            return box_start, box_end
+
+    return None
+
+
+def _read_payload(
+        f: BinaryIO,
+        start: int,
+        end: int
+    ) -> bytes :
+
+    if end - start > MP4_MAX_META_SIZE :
+        raise Mp4ParseError("Boîte trop grande")
+
+    f.seek(start)
+    data = f.read(end - start)
+    if len(data) != end - start :
+        raise Mp4ParseError("Boîte tronquée")
+
+    return data
+
+# endregion
+
+
+# region TAGS
+
+def _parse_mvhd(payload: bytes) -> str :
+    """
+    Date de création du film (UTC), au format d'ExifTool (QuickTime:CreateDate).
+    """
+
+    version = payload[0]
+    if version == 1 :
+        (seconds,) = struct.unpack_from(">Q", payload, 4)
+    else :
+        (seconds,) = struct.unpack_from(">L", payload, 4)
+
+    if seconds == 0 :
+        return "0000:00:00 00:00:00"
+
+    return (MP4_EPOCH + timedelta(seconds=seconds)).strftime("%Y:%m:%d %H:%M:%S")
+
+
+def _parse_iso6709(value: str) -> tuple[float, float]|None :
+
+    match = ISO6709_PATTERN.match(value.strip())
+    if not match :
+        return None
+
+    return float(match.group(1)), float(match.group(2))
+
+
+def _parse_xyz(payload: bytes) -> tuple[float, float]|None :
+    """
+    Boîte udta/©xyz : longueur (16 bits), langue (16 bits), chaîne ISO 6709.
+    """
+
+    (length,) = struct.unpack_from(">H", payload, 0)
+
+    return _parse_iso6709(payload[4:4 + length].decode("utf-8", errors="replace"))
+
+
+def _format_creation_date(value: str) -> str :
+    """
+    "2022-03-18T14:22:05+0100" -> "2022:03:18 14:22:05+01:00", comme ExifTool.
+    """
+
+    value = value.strip()
+    date = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z") if re.search(r"[+-]\d{4}$|Z$", value) \
+        else datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+
+    formatted = date.strftime("%Y:%m:%d %H:%M:%S")
+    if date.tzinfo is not None :
+        offset = date.strftime("%z")
+        formatted += f"{offset[:3]}:{offset[3:]}"
+
+    return formatted
+
+
+def _parse_mdta(
+        f: BinaryIO,
+        start: int,
+        end: int
+    ) -> dict[bytes, str] :
+    """
+    Métadonnées QuickTime "mdta" (moov/meta) : boîte keys puis ilst.
+    Renvoie {clé: valeur texte}.
+    """
+
+    keys_box = _find_box(f, start, end, b"keys")
+    ilst_box = _find_box(f, start, end, b"ilst")
+    if keys_box is None or ilst_box is None :
+        return {}
+
+    keys_payload = _read_payload(f, *keys_box)
+    (count,) = struct.unpack_from(">L", keys_payload, 4)
+
+    keys = []
+    offset = 8
+    for _ in range(count) :
+        size, _namespace = struct.unpack_from(">L4s", keys_payload, offset)
+        keys.append(keys_payload[offset + 8:offset + size])
+        offset += size
+
+    values = {}
+    for item_type, item_start, item_end in _iter_boxes(f, *ilst_box) :
+        (index,) = struct.unpack(">L", item_type)
+        if not 1 <= index <= len(keys) or keys[index - 1] not in (KEY_LOCATION, KEY_CREATION_DATE) :
+            continue
+
+        data_box = _find_box(f, item_start, item_end, b"data")
+        if data_box is None :
+            continue
+
+        # data : type (32 bits), locale (32 bits), valeur
+        data = _read_payload(f, *data_box)
+        values[keys[index - 1]] = data[8:].decode("utf-8", errors="replace")
+
+    return values
+
+
+def _meta_children_start(
+        f: BinaryIO,
+        start: int
+    ) -> int :
+    """
+    La boîte meta est une "full box" en ISO (4 octets version/flags) mais pas
+    en QuickTime : on regarde si la première boîte fille commence tout de suite.
+    """
+
+    f.seek(start + 4)
+    if f.read(4) in (b"hdlr", b"keys", b"ilst") :
+        return start
+
+    return start + 4
+
+# endregion
+
+
+def read_mp4_tags(path: Path) -> dict|None :
+    """
+    Lit la date de création (mvhd, Apple creationdate) et la position (©xyz,
+    Apple ISO 6709) d'une vidéo MP4/MOV en parcourant l'arbre de boîtes moov,
+    sans lire les données des pistes.
+    Renvoie un dictionnaire avec les noms de tags d'ExifTool, ou None si le
+    conteneur n'a pas pu être lu (l'appelant retombe alors sur ExifTool).
+    """
+
+    try :
+        with open(path, "rb") as f :
+            f.seek(0, 2)
+            file_size = f.tell()
+
+            moov = _find_box(f, 0, file_size, b"moov")
+            if moov is None :
+                return None
+
+            tags = {}
+            location = None
+
+            mvhd = _find_box(f, *moov, b"mvhd")
+            if mvhd is not None :
+                tags["QuickTime:CreateDate"] = _parse_mvhd(_read_payload(f, *mvhd))
+
+            udta = _find_box(f, *moov, b"udta")
+            if udta is not None :
+                xyz = _find_box(f, *udta, b"\xa9xyz")
+                if xyz is not None :
+                    location = _parse_xyz(_read_payload(f, *xyz))
+
+            meta = _find_box(f, *moov, b"meta")
+            if meta is not None :
+                meta_start, meta_end = meta
+                mdta = _parse_mdta(f, _meta_children_start(f, meta_start), meta_end)
+
+                if KEY_CREATION_DATE in mdta :
+                    tags["QuickTime:CreationDate"] = _format_creation_date(mdta[KEY_CREATION_DATE])
+                if location is None and KEY_LOCATION in mdta :
+                    location = _parse_iso6709(mdta[KEY_LOCATION])
+
+            if location is not None :
+                tags["Composite:GPSLatitude"], tags["Composite:GPSLongitude"] = location
+
+            return tags
+
+    except (Mp4ParseError, struct.error, IndexError, OSError, ValueError) :
+        return None
@@ -10,6 +10,101 @@ if not DATA_PATH.exists() :
 
 DRAWN_GROUP_DATA_PATH = DATA_PATH / "drawn_groups.json"
 DATE_GROUP_DATA_PATH = DATA_PATH / "date_groups.csv"
+METADATA_CACHE_PATH = DATA_PATH / "metadata_cache.sqlite"
+MANIFEST_PATH = DATA_PATH / "manifest.jsonl"
+JOURNALS_PATH = DATA_PATH / "journals"
+HASH_INDEX_PATH = DATA_PATH / "hash_index.sqlite"
+GROUP_INDEX_PATH = DATA_PATH / "group_index"
+THUMBNAIL_CACHE_PATH = DATA_PATH / "thumbnails"
+CLUSTERS_PATH = DATA_PATH / "clusters.pickle"
 
 IMG_EXTENSIONS = [".jpg", ".jpeg", ".png", ".heic"]
-VIDEO_EXTENSIONS = [".mp4"]
\ No newline at end of file
+VIDEO_EXTENSIONS = [".mp4"]
+
+# Nombre de vidéos envoyées à ExifTool en une seule commande
+EXIFTOOL_BATCH_SIZE = 64
+
+# Cache des métadonnées : nombre d'écritures entre deux commits SQLite
+METADATA_CACHE_COMMIT_EVERY = 1000
+
+# Taille des morceaux lus pour hasher un fichier
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Nombre maximal de médias découverts en attente de traitement
+DISCOVERY_QUEUE_SIZE = 10_000
+
+# Nombre de déplacements regroupés par dossier cible avant exécution
+MOVE_BATCH_SIZE = 1000
+
+# Journal de tri : nombre d'entrées écrites entre deux fsync
+JOURNAL_FSYNC_EVERY = 100
+
+# Carte : au-delà de ce nombre de points, agrégation par zoom + clustering client
+MAP_CLUSTER_THRESHOLD = 2000
+# Carte : nombre de cellules d'agrégation par tuile (256 px) à chaque niveau de zoom
+MAP_CELLS_PER_TILE = 8
+# Carte : taille (en degrés) des cellules de la grille spatiale des points
+MAP_GRID_CELL_DEG = 1.
+# Carte : marge chargée autour de la vue, en fraction de sa largeur / hauteur
+MAP_VIEWPORT_MARGIN = 0.5
+# Carte : taille d'affichage (px), pour estimer la vue avant le premier retour de st_folium
+MAP_WIDTH = 1400
+MAP_HEIGHT = 500
+# Carte : miniatures dans les popups seulement si la vue contient au plus ce nombre de points
+MAP_THUMBNAIL_LIMIT = 300
+# Carte : intervalle (s) de vérification des miniatures terminées en arrière-plan
+MAP_THUMBNAIL_REFRESH = 2.0
+
+# Miniatures : côté maximal (px), qualité JPEG, taille maximale du cache (octets) et processus
+THUMBNAIL_SIZE = 160
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_CACHE_MAX_BYTES = 200 * 1024 * 1024
+THUMBNAIL_WORKERS = 2
+
+# Lecture EXIF rapide des HEIC : taille maximale de la boîte "meta" lue
+EXIF_MAX_META_SIZE = 4 * 1024 * 1024
+
+# Lecture directe des MP4 : taille maximale d'une boîte de métadonnées lue
+MP4_MAX_META_SIZE = 4 * 1024 * 1024
+
+# Surveillance : durée (s) pendant laquelle la taille d'un fichier doit rester stable avant son tri
+WATCH_DEBOUNCE = 2.0
+# Surveillance sans inotify : intervalle (s) entre deux parcours de la source
+WATCH_POLL_INTERVAL = 5.0
+# Surveillance inotify : intervalle (s) de vérification des fichiers de groupes au repos
+WATCH_IDLE_TIMEOUT = 5.0
+# Surveillance : délai (s) avant de retenter un fichier en échec, doublé à chaque échec
+WATCH_RETRY_DELAY = 5.0
+# Surveillance : nombre d'essais d'un fichier avant de l'ignorer jusqu'à sa prochaine modification
+WATCH_MAX_RETRIES = 5
+
+# Dédoublonnage : octets lus au début et à la fin d'un fichier pour le hash partiel
+DEDUP_PARTIAL_SIZE = 64 * 1024
+
+# Tri : nombre de threads pour les copies (mode copy/reflink, déplacement entre disques)
+COPY_WORKERS = 8
+
+# Mode asynchrone (NAS) : nombre maximal d'opérations sur les fichiers en cours à la fois
+IO_CONCURRENCY = 32
+
+# Métriques du tri : nombre de fichiers les plus lents conservés
+METRICS_SLOWEST_FILES = 20
+# Métriques du tri : bornes (s) de l'histogramme des durées d'extraction par média
+METRICS_HISTOGRAM_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1., 5.]
+
+# Suggestions de groupes (DBSCAN) : rayon de voisinage (km) et nombre de voisins d'un point cœur
+CLUSTER_EPS_KM = 0.5
+CLUSTER_MIN_POINTS = 10
+# Suggestions de groupes : fenêtre de temps (jours) du voisinage, None pour un voisinage seulement spatial
+CLUSTER_EPS_DAYS = None
+# Suggestions de groupes : nombre minimal de médias d'un cluster suggéré
+CLUSTER_MIN_SIZE = 30
+# Suggestions de groupes : cluster ignoré si cette part de ses médias est déjà dans un groupe de lieu
+CLUSTER_COVERED_RATIO = 0.5
+# Suggestions de groupes : cellules de la grille traitées par lot (mémoire des calculs vectorisés)
+CLUSTER_CHUNK_CELLS = 10_000
+# Suggestions de groupes : couples de points comparés par lot, et au-delà desquels deux cellules sont comparées à part
+CLUSTER_CHUNK_PAIRS = 4_000_000
+CLUSTER_PAIR_LIMIT = 10_000
+# Suggestions de groupes : points de chaque cellule comparés au premier passage de liaison
+CLUSTER_LINK_SAMPLE = 16
@@ -0,0 +1,214 @@
+import queue
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple
+from photobot.parameters import DISCOVERY_QUEUE_SIZE
+from photobot.discovery import (
+    MediaFile,
+    iter_medias
+)
+from photobot.utils import iter_medias_metadata
+
+if TYPE_CHECKING :
+    from photobot.aio import AsyncIO
+    from photobot.cache import MetadataCache
+    from photobot.groups import GroupIndex
+    from photobot.metrics import SortMetrics
+
+
+class ClassifiedMedia(NamedTuple) :
+    path: Path
+    lat: float|None
+    lon: float|None
+    date: datetime|None
+    group: dict|None
+    destination: Path|None
+
+
+# region ETAPES
+
+def get_target_folder(
+        output_path: Path,
+        date: datetime|None,
+        group: dict|None
+    ) -> Path :
+    """
+    Dossier de destination d'un média selon sa date et son groupe.
+    """
+
+    if date:
+        year = date.strftime("%Y")
+        year_path = output_path / year
+    else:
+        year_path = output_path / "inconnue"
+
+    if group:
+
+        # Dossier cible
+        group_path = year_path / group["nom"]
+
+        # Si groupe lieu -> sous-dossier par mois
+        if group["type"] != "date" and date:
+            mois = date.strftime("%m")
+            group_path = group_path / mois
+
+    else :
+        group_path = year_path / "z_autre"
+        if date :
+            mois = date.strftime("%m")
+            group_path = group_path / mois
+
+    return group_path
+
+
+class _Failure(NamedTuple) :
+    error: BaseException
+
+
+def iter_threaded(
+        iterable: Iterable,
+        maxsize: int=DISCOVERY_QUEUE_SIZE
+    ) -> Iterator :
+    """
+    Consomme iterable dans un thread et en renvoie les éléments à travers une
+    file bornée : l'étape amont avance pendant que l'aval travaille, sans
+    jamais prendre plus de maxsize éléments d'avance.
+    Une exception de l'amont est relancée ici ; fermer ce générateur arrête l'amont.
+    """
+
+    found = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+
+    def _put(item) -> bool :
+        while not stop.is_set() :
+            try :
+                found.put(item, timeout=0.1)
+                return True
+            except queue.Full :
+                continue
+        return False
+
+    def _produce() -> None :
+        iterator = iter(iterable)
+        try :
+            for item in iterator :
+                if not _put(item) :
+                    return
+            _put(done)
+        except BaseException as e :
+            _put(_Failure(e))
+        finally :
+            close = getattr(iterator, "close", None)
+            if close is not None :
+                close()
+
+    producer = threading.Thread(target=_produce, name="photobot-stage", daemon=True)
+    producer.start()
+
+    try :
+        while (item := found.get()) is not done :
+            if isinstance(item, _Failure) :
+                raise item.error
+            yield item
+    finally :
+        stop.set()
+        producer.join()
+
+
+def classify_medias(
+        medias: Iterable[MediaFile],
+        output_path: Path|None=None,
+        groups_index: "GroupIndex|None"=None,
+        jobs: int=1,
+        cache: "MetadataCache|None"=None,
+        metrics: "SortMetrics|None"=None,
+        io: "AsyncIO|None"=None
+    ) -> Iterator[ClassifiedMedia] :
+    """
+    Métadonnées, groupe et destination de médias déjà trouvés, dans l'ordre.
+    Sans groupes, group vaut None ; sans output_path, destination vaut None.
+    Avec io, les en-têtes sont lus de façon asynchrone (jobs est ignoré).
+    """
+
+    # Extraction des métadonnées (éventuellement parallèle), dans l'ordre
+    if io is not None :
+        medias_metadata = io.iter_medias_metadata(medias, cache=cache, metrics=metrics)
+    else :
+        medias_metadata = iter_medias_metadata(medias, jobs=jobs, cache=cache, metrics=metrics)
+    if metrics is not None :
+        medias_metadata = metrics.wrap("metadata", medias_metadata)
+
+    for file_path, (lat, lon, date) in medias_metadata :
+
+        group = None
+        if groups_index is not None :
+            coords = (lat, lon)
+            if metrics is not None :
+                with metrics.stage("grouping") :
+                    group = groups_index.find(date, coords)
+                metrics.record_classification(lat, lon, date, group)
+            else :
+                group = groups_index.find(date, coords)
+
+        destination = None
+        if output_path is not None :
+            destination = get_target_folder(output_path, date, group) / file_path.name
+
+        yield ClassifiedMedia(file_path, lat, lon, date, group, destination)
+
+# endregion
+
+
+def iter_classified(
+        source: Path,
+        recursive: bool,
+        output_path: Path|None=None,
+        groups_index: "GroupIndex|None"=None,
+        jobs: int=1,
+        cache: "MetadataCache|None"=None,
+        discovery_workers: int=1,
+        metrics: "SortMetrics|None"=None,
+        queue_size: int=DISCOVERY_QUEUE_SIZE,
+        io: "AsyncIO|None"=None
+    ) -> Iterator[ClassifiedMedia] :
+    """
+    Flux des médias de source, classés un par un : (chemin, lat, lon, date,
+    groupe, destination). Rien n'est accumulé : la découverte tourne dans son
+    thread derrière une file de queue_size médias, l'extraction avance par lots
+    (au plus quelques lots en vol avec jobs > 1), et chaque média est renvoyé
+    dès qu'il est classé. La mémoire reste constante quelle que soit la taille
+    de la bibliothèque, tant que le consommateur n'accumule pas lui-même.
+
+    Le cache n'est utilisé que depuis le thread appelant (SQLite).
+    Avec output_path, la destination est dans output_path, qui n'est pas parcouru.
+    Avec io (sources sur NAS), dossiers et en-têtes sont lus de façon
+    asynchrone, dans la limite de concurrence de io.
+    """
+
+    exclude = [output_path] if output_path is not None else []
+
+    if io is not None :
+        medias = io.iter_medias(source, recursive=recursive, exclude=exclude)
+    else :
+        medias = iter_medias(
+            source,
+            recursive=recursive,
+            exclude=exclude,
+            workers=discovery_workers
+        )
+        medias = iter_threaded(medias, maxsize=queue_size)
+
+    if metrics is not None :
+        medias = metrics.wrap("discovery", medias)
+
+    yield from classify_medias(
+        medias,
+        output_path=output_path,
+        groups_index=groups_index,
+        jobs=jobs,
+        cache=cache,
+        metrics=metrics,
+        io=io
+    )
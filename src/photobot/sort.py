@@ -1,7 +1,6 @@
-import os
 import sys
-import json
-import shutil
+import time
+from typing import Iterable, Iterator
 from datetime import (
     datetime,
     timezone
@@ -11,16 +10,43 @@ from pathlib import Path
 from photobot.parameters import (
     DRAWN_GROUP_DATA_PATH,
     DATE_GROUP_DATA_PATH,
-    IMG_EXTENSIONS,
-    VIDEO_EXTENSIONS
+    GROUP_INDEX_PATH,
+    JOURNALS_PATH,
+    MANIFEST_PATH,
+    HASH_INDEX_PATH,
+    JOURNAL_FSYNC_EVERY,
+    COPY_WORKERS
+)
+from photobot.aio import AsyncIO
+from photobot.cache import MetadataCache
+from photobot.dedup import (
+    HashIndex,
+    dedup_moves
+)
+from photobot.discovery import MediaFile
+from photobot.pipeline import (
+    classify_medias,
+    iter_classified,
+    get_target_folder
+)
+from photobot.metrics import SortMetrics
+from photobot.journal import (
+    SortJournal,
+    journal_path
+)
+from photobot.moves import (
+    Move,
+    execute_moves,
+    read_manifest,
+    write_manifest
+)
+from photobot.groups import (
+    GroupIndex,
+    load_group_index
 )
 from photobot.utils import (
-    get_jpg_metadata,
-    get_mp4_metadata,
     haversine,
     is_in_polygon,
-    sort_groups,
-    parse_date_groups,
 )
 
 
@@ -65,74 +91,279 @@ def media_is_in_group(
     return False
 
 
+def plan_sort(
+        medias_path: Path,
+        output_path: Path,
+        recursive: bool,
+        groups_index: GroupIndex,
+        jobs: int=1,
+        cache: MetadataCache|None=None,
+        discovery_workers: int=1,
+        metrics: SortMetrics|None=None,
+        io: AsyncIO|None=None,
+    ) -> Iterator[Move] :
+    """
+    Phase de planification : renvoie le déplacement prévu pour chaque média,
+    sans toucher aux fichiers.
+    """
+
+    # Flux classé : le tri commence dès les premiers fichiers trouvés
+    classified = iter_classified(
+        medias_path,
+        recursive=recursive,
+        output_path=output_path,
+        groups_index=groups_index,
+        jobs=jobs,
+        cache=cache,
+        discovery_workers=discovery_workers,
+        metrics=metrics,
+        io=io
+    )
+
+    for media in classified :
+        yield Move(media.path, media.destination)
+
+
+def plan_moves(
+        medias: Iterable[MediaFile],
+        output_path: Path,
+        groups_index: GroupIndex,
+        jobs: int=1,
+        cache: MetadataCache|None=None,
+        metrics: SortMetrics|None=None,
+    ) -> Iterator[Move] :
+    """
+    Classe des médias déjà trouvés : déplacement prévu pour chacun, dans l'ordre.
+    """
+
+    for media in classify_medias(medias, output_path, groups_index, jobs=jobs, cache=cache, metrics=metrics) :
+        yield Move(media.path, media.destination)
+
+
+def apply_moves(
+        moves: Iterable[Move],
+        cache: MetadataCache|None=None,
+        journal: SortJournal|None=None,
+        hashes: HashIndex|None=None,
+        mode: str="move",
+        verify: bool=False,
+        copy_workers: int=COPY_WORKERS,
+        metrics: SortMetrics|None=None,
+        io: AsyncIO|None=None
+    ) -> int :
+    """
+    Phase d'exécution : place les fichiers (déplacement, copie ou lien selon mode)
+    et les suit dans le cache (et dans l'index des hash).
+    Avec io, les placements sont asynchrones (copy_workers est ignoré).
+    """
+
+    if io is not None :
+        placed = io.execute_moves(moves, journal=journal, mode=mode, verify=verify)
+    else :
+        placed = execute_moves(moves, journal=journal, mode=mode, verify=verify, copy_workers=copy_workers)
+    if metrics is not None :
+        placed = metrics.wrap("placement", placed)
+
+    i = 0
+    for i, move in enumerate(placed, start=1) :
+
+        # Hors mode move, la source reste en place à côté de sa copie / son lien
+        for index in (cache, hashes) :
+            if index is None :
+                continue
+            if mode == "move" :
+                index.move(move.src, move.dst)
+            else :
+                index.copy(move.src, move.dst)
+
+        print(f"Sorted : {i}", end="\r")
+
+    return i
+
+
+def apply_manifest(
+        manifest_path: Path,
+        use_cache: bool=True,
+        mode: str="move",
+        verify: bool=False,
+        copy_workers: int=COPY_WORKERS,
+        io_concurrency: int=0
+    ) -> None :
+
+    cache = MetadataCache() if use_cache else None
+    hashes = HashIndex() if HASH_INDEX_PATH.exists() else None
+    io = AsyncIO(io_concurrency) if io_concurrency > 0 else None
+
+    i = apply_moves(
+        read_manifest(manifest_path),
+        cache=cache,
+        hashes=hashes,
+        mode=mode,
+        verify=verify,
+        copy_workers=copy_workers,
+        io=io
+    )
+    print(f"\n{i} files placed ({mode})")
+
+    if cache is not None :
+        cache.close()
+    if hashes is not None :
+        hashes.close()
+    if io is not None :
+        io.close()
+
+
 def sort_medias(
         medias_path: Path, 
         output_path: Path,
         recursive: bool,
         drawn_groups_data_path: Path=DRAWN_GROUP_DATA_PATH,
         date_groups_data_path: Path=DATE_GROUP_DATA_PATH,
+        jobs: int=1,
+        use_cache: bool=True,
+        verify_hash: bool=False,
+        discovery_workers: int=1,
+        dry_run: bool=False,
+        manifest_path: Path|None=None,
+        resume: bool=False,
+        restart: bool=False,
+        fsync_every: int=JOURNAL_FSYNC_EVERY,
+        dedup: str|None=None,
+        mode: str="move",
+        verify: bool=False,
+        copy_workers: int=COPY_WORKERS,
+        metrics_path: Path|None=None,
+        metrics_format: str="auto",
+        io_concurrency: int=0,
+        journals_path: Path=JOURNALS_PATH,
+        group_index_dir: Path=GROUP_INDEX_PATH,
     ) -> None :
 
-    with open(drawn_groups_data_path, "r", encoding="utf-8") as f :
-        drawn_groups = json.load(f)["groups"]
+    # Chronomètres par étape, écrits dans metrics_path à la fin du tri
+    metrics = SortMetrics() if metrics_path is not None else None
 
-    date_groups = parse_date_groups(date_groups_data_path)
+    # Mode asynchrone (NAS) : parcours, lectures d'en-têtes et placements concurrents
+    io = AsyncIO(io_concurrency) if io_concurrency > 0 else None
 
-    groups_data = sort_groups(drawn_groups + date_groups)
+    groups_index = load_group_index(drawn_groups_data_path, date_groups_data_path, index_dir=group_index_dir)
 
-    if recursive :
-        all_files = set().union(*[medias_path.rglob(f"*{suffix}") for suffix in IMG_EXTENSIONS + VIDEO_EXTENSIONS])
-    else :
-        all_files = set().union(*[medias_path.glob(f"*{suffix}") for suffix in IMG_EXTENSIONS + VIDEO_EXTENSIONS])
+    cache = MetadataCache(verify_hash=verify_hash) if use_cache else None
 
-    print(f"{len(all_files)} files to sort...")
+    # Journal des métadonnées et déplacements, pour reprendre après un crash
+    journal = None
+    if not dry_run :
+        try :
+            journal = SortJournal(
+                journal_path(medias_path, output_path, journals_path),
+                resume=resume,
+                cache=cache,
+                fsync_every=fsync_every,
+                restart=restart
+            )
+        except FileExistsError :
+            if cache is not None :
+                cache.close()
+            if io is not None :
+                io.close()
+            raise
+        if resume :
+            confirmed, redo = journal.recover()
+            print(f"Resume : {journal.moved} files already sorted, {len(journal.metadata)} metadata known, {confirmed} in-flight moves confirmed, {redo} to redo")
 
-    for i, file_path in enumerate(all_files) :
+    if dry_run and manifest_path is None :
+        manifest_path = MANIFEST_PATH
 
-        filename = file_path.name
-        suffix = file_path.suffix
+    start = time.perf_counter()
 
-        if suffix in IMG_EXTENSIONS :
-            lat, lon, date = get_jpg_metadata(file_path)
-        elif suffix in VIDEO_EXTENSIONS :
-            lat, lon, date = get_mp4_metadata(file_path)
-        
-        coords = (lat, lon)
+    moves = plan_sort(
+        medias_path,
+        output_path,
+        recursive=recursive,
+        groups_index=groups_index,
+        jobs=jobs,
+        cache=journal if journal is not None else cache,
+        discovery_workers=discovery_workers,
+        metrics=metrics,
+        io=io
+    )
 
-        group = None
-        for g in groups_data:
-            if media_is_in_group(date, coords, g):
-                group = g
-                break
+    # Doublons : la destination est indexée sans être relue, les hash ne sont calculés qu'en cas de collision
+    # (en simulation, l'index sur disque n'est pas modifié)
+    hashes = None
+    if dedup is not None :
+        hashes = HashIndex(persist=not dry_run)
+        if metrics is not None :
+            with metrics.stage("dedup_index") :
+                hashes.sync(output_path)
+            moves = metrics.wrap("dedup", dedup_moves(moves, hashes, policy=dedup))
+        else :
+            hashes.sync(output_path)
+            moves = dedup_moves(moves, hashes, policy=dedup)
 
-        if date:
-            year = date.strftime("%Y")
-            year_path = output_path / year
-        else:
-            year_path = output_path / "inconnue"
- 
-        os.makedirs(year_path, exist_ok=True)
+    if manifest_path is not None :
+        moves = write_manifest(moves, manifest_path)
+        if metrics is not None :
+            moves = metrics.wrap("manifest", moves)
 
-        if group:
+    try :
+        if dry_run :
+            i = 0
+            for i, _ in enumerate(moves, start=1) :
+                print(f"Planned : {i}", end="\r")
+        else :
+            i = apply_moves(
+                moves,
+                cache=cache,
+                journal=journal,
+                hashes=hashes,
+                mode=mode,
+                verify=verify,
+                copy_workers=copy_workers,
+                metrics=metrics,
+                io=io
+            )
+    except BaseException :
+        # Le journal reste sur disque pour une reprise avec --resume
+        if journal is not None :
+            journal.close()
+        if cache is not None :
+            cache.close()
+        if hashes is not None :
+            hashes.close()
+        if io is not None :
+            io.close()
+        raise
 
-            # Dossier cible
-            group_path = year_path / group["nom"]
-            os.makedirs(group_path, exist_ok=True)
+    if io is not None :
+        io.close()
 
-            # Si groupe lieu -> sous-dossier par mois
-            if group["type"] != "date" and date:
-                mois = date.strftime("%m")
-                group_path = group_path / mois
-                os.makedirs(group_path, exist_ok=True)
+    if journal is not None :
+        journal.close(completed=True)
 
-        else :
-            group_path = year_path / "z_autre"
-            if date :
-                mois = date.strftime("%m")
-                group_path = group_path / mois
-            os.makedirs(group_path, exist_ok=True)
+    elapsed = time.perf_counter() - start
+    throughput = i / elapsed if elapsed > 0 else 0.
+    verb = "planned" if dry_run else "sorted"
+    print(f"\n{i} files {verb} in {elapsed:.1f}s ({throughput:.1f} files/s)")
+
+    if manifest_path is not None :
+        print(f"Manifest : {manifest_path}")
+
+    if cache is not None :
+        print(f"Metadata cache : {cache.hits} hits, {cache.misses} misses")
+        cache.close()
+
+    if hashes is not None :
+        action = "skipped" if dedup == "skip" else "hardlinked"
+        print(f"Duplicates : {hashes.duplicates} {action}")
+        hashes.close()
 
-        shutil.move(file_path, group_path / filename)
-        
-        print(f"Sorted : {i+1}", end="\r")
+    if metrics is not None :
+        metrics.counters["placed" if not dry_run else "planned"] += i
+        if hashes is not None :
+            metrics.counters["duplicates"] += hashes.duplicates
+        metrics.finish()
+        metrics.write(metrics_path, metrics_format)
 
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in metrics.stages.most_common())
+        print(f"Stages : {stages}")
+        print(f"Metrics : {metrics_path}")
@@ -0,0 +1,218 @@
+import os
+import base64
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from PIL import Image, ImageOps
+from photobot.parameters import (
+    IMG_EXTENSIONS,
+    THUMBNAIL_CACHE_PATH,
+    THUMBNAIL_CACHE_MAX_BYTES,
+    THUMBNAIL_SIZE,
+    THUMBNAIL_QUALITY,
+    THUMBNAIL_WORKERS
+)
+
+
+# region GENERATION
+
+def make_thumbnail(
+        src: Path,
+        dst: Path,
+        size: int=THUMBNAIL_SIZE
+    ) -> int|None :
+    """
+    Ecrit la miniature JPEG de src dans dst. Renvoie sa taille en octets,
+    ou None si l'image n'est pas lisible. Exécutée dans un processus du pool.
+    """
+
+    tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+
+    try :
+        with Image.open(src) as img :
+            # JPEG : décodage directement réduit (1/2 à 1/8), jamais en pleine résolution
+            img.draft("RGB", (size, size))
+            thumb = ImageOps.exif_transpose(img)
+            thumb.thumbnail((size, size))
+            if thumb.mode != "RGB" :
+                thumb = thumb.convert("RGB")
+            thumb.save(tmp_path, "JPEG", quality=THUMBNAIL_QUALITY)
+
+        os.replace(tmp_path, dst)
+        return os.path.getsize(dst)
+
+    except (OSError, ValueError, Image.DecompressionBombError) :
+        try :
+            os.remove(tmp_path)
+        except OSError :
+            pass
+        return None
+
+# endregion
+
+
+# region CACHE
+
+class ThumbnailCache :
+    """
+    Miniatures sur disque, générées en arrière-plan par un pool de processus.
+    Une miniature est identifiée par le chemin, la taille et la date de
+    modification du média. Au-delà de max_bytes, les moins récemment
+    utilisées sont supprimées (l'ordre d'utilisation est la mtime des
+    fichiers, il survit donc aux redémarrages).
+    """
+
+    def __init__(
+            self,
+            path: Path=THUMBNAIL_CACHE_PATH,
+            max_bytes: int=THUMBNAIL_CACHE_MAX_BYTES,
+            size: int=THUMBNAIL_SIZE,
+            workers: int=THUMBNAIL_WORKERS
+        ) -> None :
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = size
+        self.workers = workers
+
+        # Incrémenté à chaque miniature terminée : l'interface sait quand se rafraîchir
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending: dict[str, Future] = {}
+        self._failed: set[str] = set()
+
+        os.makedirs(path, exist_ok=True)
+
+        # nom -> taille, du moins au plus récemment utilisé
+        entries = []
+        with os.scandir(path) as it :
+            for entry in it :
+                if entry.name.endswith(".jpg") and not entry.name.startswith(".") :
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, entry.name, stat.st_size))
+
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._total = sum(self._entries.values())
+        self._evict()
+
+    # region |---| Lecture
+
+    def get(self, media_path: Path) -> Path|None :
+        """
+        Miniature de media_path si elle est prête, sinon None : sa génération
+        est alors lancée en arrière-plan, sans attendre.
+        """
+
+        if media_path.suffix.lower() not in IMG_EXTENSIONS :
+            return None
+
+        try :
+            stat = os.stat(media_path)
+        except OSError :
+            return None
+
+        name = _thumbnail_name(media_path, stat)
+        thumb_path = self.path / name
+
+        with self._lock :
+            if name in self._entries :
+                self._entries.move_to_end(name)
+                try :
+                    os.utime(thumb_path)
+                    return thumb_path
+                except FileNotFoundError :
+                    # Supprimée par un autre processus : on la régénère
+                    self._total -= self._entries.pop(name)
+
+            if name in self._pending or name in self._failed :
+                return None
+
+            if self._executor is None :
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+            future = self._executor.submit(make_thumbnail, media_path, thumb_path, self.size)
+            self._pending[name] = future
+
+        future.add_done_callback(lambda f, name=name : self._done(name, f))
+
+        return None
+
+    @property
+    def pending(self) -> int :
+        return len(self._pending)
+
+    # endregion
+
+    # region |---| Génération
+
+    def _done(
+            self,
+            name: str,
+            future: Future
+        ) -> None :
+
+        try :
+            size = None if future.cancelled() else future.result()
+        except Exception :
+            size = None
+
+        with self._lock :
+            self._pending.pop(name, None)
+
+            if size is None :
+                self._failed.add(name)
+                return
+
+            self._total += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict()
+            self.generation += 1
+
+    def _evict(self) -> None :
+        """
+        Supprime les miniatures les moins récemment utilisées au-delà de max_bytes.
+        """
+
+        while self._total > self.max_bytes and len(self._entries) > 1 :
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            try :
+                os.remove(self.path / name)
+            except FileNotFoundError :
+                pass
+
+    def close(self) -> None :
+
+        if self._executor is not None :
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # endregion
+
+
+def _thumbnail_name(
+        media_path: Path,
+        stat: os.stat_result
+    ) -> str :
+
+    key = f"{os.path.abspath(media_path)}\n{stat.st_size}\n{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + ".jpg"
+
+
+def thumbnail_data_uri(thumb_path: Path) -> str|None :
+    """
+    Miniature encodée en data URI, pour l'intégrer au HTML d'un popup.
+    """
+
+    try :
+        data = thumb_path.read_bytes()
+    except OSError :
+        return None
+
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+
+# endregion
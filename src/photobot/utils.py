@@ -1,12 +1,35 @@
-import exifread
 from pathlib import Path
-from datetime import datetime
+from datetime import (
+    datetime,
+    timedelta
+)
 from math import radians, sin, cos, sqrt, atan2, log, tan, pi
-from shapely.geometry import Point, Polygon
-from shapely.ops import transform
-import exiftool
 import re
-import pandas as pd
+import csv
+import time
+import hashlib
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+from photobot.parameters import (
+    IMG_EXTENSIONS,
+    VIDEO_EXTENSIONS,
+    EXIFTOOL_BATCH_SIZE,
+    HASH_CHUNK_SIZE
+)
+
+from photobot.discovery import MediaFile
+from photobot.exif import read_exif_tags
+from photobot.mp4 import read_mp4_tags
+
+# Les dépendances lourdes (exifread, exiftool, shapely) sont importées
+# dans les fonctions qui s'en servent, pour garder un démarrage rapide de la CLI.
+if TYPE_CHECKING :
+    import exiftool
+    from photobot.cache import MetadataCache
+    from photobot.metrics import SortMetrics
 
 
 def parse_date_from_stem(stem: str) -> datetime|None :
@@ -28,31 +51,78 @@ def parse_date_from_stem(stem: str) -> datetime|None :
     return date
 
 
+def parse_group_date(value: str) -> datetime|None :
+
+    value = value.strip()
+    if not value :
+        return None
+
+    return datetime.fromisoformat(value)
+
+
 def parse_date_groups(path: Path) -> list[dict] :
+    """
+    Lit date_groups.csv (écrit par date.py) avec le module csv, sans pandas.
+    Les groupes "journée entière" vont de minuit le premier jour à minuit le lendemain du dernier.
+    """
 
     if not path.exists() :
         return []
 
-    date_groups = pd.read_csv(path)
-    date_groups["type"] = "date"
-    date_groups["date_debut"] = pd.to_datetime(date_groups["date_debut"])
-    date_groups["date_fin"] = pd.to_datetime(date_groups["date_fin"])
-    date_groups["full_day"] = date_groups["full_day"].astype("bool")
+    date_groups_list = []
+
+    with open(path, "r", encoding="utf-8", newline="") as f :
+        for row in csv.DictReader(f) :
+
+            debut = parse_group_date(row["date_debut"])
+            fin = parse_group_date(row["date_fin"])
+            if debut is None or fin is None : # Groupe incomplet, ne peut rien contenir
+                continue
 
-    groups_to_normalize = date_groups["full_day"]
+            # Comme pandas : une case vide est considérée comme cochée
+            full_day = row["full_day"].strip().lower() not in ("false", "0")
 
-    date_groups.loc[groups_to_normalize, "date_debut"] = date_groups.loc[groups_to_normalize, "date_debut"].dt.normalize()
-    date_groups.loc[groups_to_normalize, "date_fin"] = date_groups.loc[groups_to_normalize, "date_fin"].dt.normalize() + pd.Timedelta(days=1)
+            if full_day :
+                debut = debut.replace(hour=0, minute=0, second=0, microsecond=0)
+                fin = fin.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
 
-    date_groups_list = date_groups.to_dict(orient="records")
+            date_groups_list.append({
+                "nom": row["nom"],
+                "date_debut": debut,
+                "date_fin": fin,
+                "full_day": full_day,
+                "type": "date"
+            })
 
     return date_groups_list
 
+
+def hash_file(
+        path: Path,
+        chunk_size: int=HASH_CHUNK_SIZE
+    ) -> str :
+    """
+    Hash BLAKE2b du contenu d'un fichier, lu par morceaux.
+    """
+
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f :
+        while chunk := f.read(chunk_size) :
+            h.update(chunk)
+
+    return h.hexdigest()
+
 # region METADATA
 
 # region |---| JPG
 
-def get_jpg_metadata(image_path: Path) -> tuple[float|None, float|None, datetime|None] :
+def read_exifread_tags(image_path: Path) -> dict :
+    """
+    Lecture complète par exifread, ramenée au format de exif.read_exif_tags.
+    """
+
+    import exifread
+
     with open(image_path, "rb") as f:
         tags = exifread.process_file(f, details=False)
 
@@ -60,15 +130,37 @@ def get_jpg_metadata(image_path: Path) -> tuple[float|None, float|None, datetime
         value = tags.get(tag)
         return value.values if value else None
 
-    lat = get_value("GPS GPSLatitude")
-    lat_ref = get_value("GPS GPSLatitudeRef")
-    lon = get_value("GPS GPSLongitude")
-    lon_ref = get_value("GPS GPSLongitudeRef")
+    values = {
+        "GPSLatitude": get_value("GPS GPSLatitude"),
+        "GPSLatitudeRef": get_value("GPS GPSLatitudeRef"),
+        "GPSLongitude": get_value("GPS GPSLongitude"),
+        "GPSLongitudeRef": get_value("GPS GPSLongitudeRef"),
+    }
+    for name in ("GPSLatitude", "GPSLongitude") :
+        if values[name] :
+            values[name] = [(r.num, r.den) for r in values[name]]
+
+    date_taken = tags.get("EXIF DateTimeOriginal")
+    values["DateTimeOriginal"] = str(date_taken).strip() if date_taken else None
+
+    return values
+
+
+def get_jpg_metadata(image_path: Path) -> tuple[float|None, float|None, datetime|None] :
+
+    # Lecture rapide des seuls en-têtes, exifread en secours
+    tags = read_exif_tags(image_path)
+    if tags is None :
+        tags = read_exifread_tags(image_path)
+
+    lat = tags.get("GPSLatitude")
+    lat_ref = tags.get("GPSLatitudeRef")
+    lon = tags.get("GPSLongitude")
+    lon_ref = tags.get("GPSLongitudeRef")
 
     date = parse_date_from_stem(image_path.stem)
     if date is None :
-        date_taken = tags.get("EXIF DateTimeOriginal")
-        date_str = str(date_taken).strip() if date_taken else None
+        date_str = tags.get("DateTimeOriginal")
     
         date = None
         if date_str :
@@ -79,7 +171,7 @@ def get_jpg_metadata(image_path: Path) -> tuple[float|None, float|None, datetime
 
     def _convert(coord):
         d, m, s = coord
-        return float(d.num)/float(d.den) + float(m.num)/float(m.den)/60 + float(s.num)/float(s.den)/3600
+        return float(d[0])/float(d[1]) + float(m[0])/float(m[1])/60 + float(s[0])/float(s[1])/3600
 
     lat = _convert(lat)
     lon = _convert(lon)
@@ -95,14 +187,62 @@ def get_jpg_metadata(image_path: Path) -> tuple[float|None, float|None, datetime
 
 # region |---| MP4
 
-def get_mp4_metadata(path: Path) -> tuple[float|None, float|None, datetime|None]:
+_exiftool_local = threading.local()
+_exiftool_sessions = []
+
+
+def get_exiftool() -> "exiftool.ExifToolHelper" :
     """
-    Extrait latitude, longitude et datetime d'une vidéo en utilisant ExifTool.
-    Fonction robuste et standardisée.
+    Renvoie la session ExifTool du thread courant, démarrée une seule fois.
+    Le processus Perl reste ouvert (-stay_open) jusqu'à la fin du programme.
     """
 
-    with exiftool.ExifToolHelper() as et:
-        metadata = et.get_metadata(str(path))[0]
+    import exiftool
+
+    et = getattr(_exiftool_local, "et", None)
+    if et is None :
+        et = exiftool.ExifToolHelper()
+        _exiftool_local.et = et
+        _exiftool_sessions.append(et)
+
+    return et
+
+
+@atexit.register
+def close_exiftool_sessions() -> None :
+
+    while _exiftool_sessions :
+        et = _exiftool_sessions.pop()
+        try :
+            et.terminate()
+        except Exception :
+            pass
+
+    _exiftool_local.__dict__.clear()
+
+
+# Appels à ExifTool de ce processus (relevés par les métriques du tri)
+exiftool_stats = {"calls": 0, "files": 0, "seconds": 0.}
+
+
+def exiftool_get_metadata(paths: list[Path]) -> list[dict] :
+
+    start = time.perf_counter()
+    try :
+        return get_exiftool().get_metadata([str(p) for p in paths])
+    finally :
+        exiftool_stats["calls"] += 1
+        exiftool_stats["files"] += len(paths)
+        exiftool_stats["seconds"] += time.perf_counter() - start
+
+
+def parse_mp4_metadata(
+        path: Path,
+        metadata: dict
+    ) -> tuple[float|None, float|None, datetime|None] :
+    """
+    Convertit les tags renvoyés par ExifTool en (latitude, longitude, date).
+    """
 
     lat = metadata.get("Composite:GPSLatitude")
     lon = metadata.get("Composite:GPSLongitude")
@@ -118,16 +258,229 @@ def get_mp4_metadata(path: Path) -> tuple[float|None, float|None, datetime|None]
         or metadata.get("EXIF:DateTimeOriginal")
         or metadata.get("QuickTime:ContentCreateDate")
     )
+
+    if date_str :
+        date = parse_exiftool_date(str(date_str))
+
+    return lat, lon, date
+
+
+def parse_exiftool_date(date_str: str) -> datetime|None :
+    """
+    "2022:03:18 14:22:05", avec ou sans fuseau ("Z", "+01:00").
+    Renvoie None pour les dates invalides (année 0 par exemple).
+    """
+
     # ExifTool renvoie souvent un format : "2022:03:18 14:22:05Z"
-    date_str = date_str.replace("Z", "+00:00")
+    date_str = date_str.strip().replace("Z", "+00:00")
 
-    if date_str:
+    for fmt in ("%Y:%m:%d %H:%M:%S%z", "%Y:%m:%d %H:%M:%S") :
         try :
-            date = datetime.strptime(date_str, "%Y:%m:%d %H:%M:%S")
-        except : # Year 0 for instance
-            pass 
+            return datetime.strptime(date_str, fmt)
+        except ValueError :
+            pass
 
-    return lat, lon, date
+    return None
+
+
+def get_mp4_metadata(path: Path) -> tuple[float|None, float|None, datetime|None]:
+    """
+    Extrait latitude, longitude et datetime d'une vidéo.
+    Lecture directe des boîtes MP4, ExifTool seulement si le conteneur n'a pas pu être lu.
+    """
+
+    metadata = read_mp4_tags(path)
+    if metadata is None :
+        metadata = exiftool_get_metadata([path])[0]
+
+    return parse_mp4_metadata(path, metadata)
+
+
+def get_mp4_metadata_batch(paths: list[Path]) -> list[tuple[float|None, float|None, datetime|None]] :
+    """
+    Extrait les métadonnées de plusieurs vidéos. Les conteneurs que la lecture
+    directe ne sait pas traiter partent en un seul appel à ExifTool.
+    Si ce lot échoue (fichier illisible...), on repasse fichier par fichier.
+    """
+
+    metadatas = {p: read_mp4_tags(p) for p in paths}
+    fallback = [p for p, m in metadatas.items() if m is None]
+
+    if fallback :
+        import exiftool
+
+        try :
+            metadatas.update(zip(fallback, exiftool_get_metadata(fallback)))
+        except exiftool.exceptions.ExifToolException :
+            for p in fallback :
+                metadatas[p] = exiftool_get_metadata([p])[0]
+
+    return [parse_mp4_metadata(p, metadatas[p]) for p in paths]
+
+# endregion
+
+# region |---| ALL
+
+def get_medias_metadata_batch(batch: list[Path]) -> list[tuple[float|None, float|None, datetime|None]] :
+    """
+    Extrait les métadonnées d'un lot de médias, dans l'ordre du lot.
+    Fonction de niveau module pour pouvoir être envoyée à un pool de processus.
+    """
+
+    return get_medias_metadata_timed(batch)[0]
+
+
+def get_medias_metadata_timed(batch: list[Path]) -> tuple[list[tuple], list[float]] :
+    """
+    Comme get_medias_metadata_batch, avec en plus la durée d'extraction de chaque média.
+    Les vidéos étant lues en lot, chacune reçoit la durée moyenne du lot.
+    """
+
+    videos = [p for p in batch if p.suffix.lower() in VIDEO_EXTENSIONS]
+
+    start = time.perf_counter()
+    videos_metadata = dict(zip(videos, get_mp4_metadata_batch(videos)))
+    video_seconds = (time.perf_counter() - start) / len(videos) if videos else 0.
+
+    metadatas = []
+    durations = []
+    for p in batch :
+        if p in videos_metadata :
+            metadatas.append(videos_metadata[p])
+            durations.append(video_seconds)
+            continue
+
+        start = time.perf_counter()
+        metadatas.append(get_jpg_metadata(p))
+        durations.append(time.perf_counter() - start)
+
+    return metadatas, durations
+
+
+def iter_batches(
+        items: Iterable,
+        batch_size: int
+    ) -> Iterator[list] :
+
+    batch = []
+    for item in items :
+        batch.append(item)
+        if len(batch) >= batch_size :
+            yield batch
+            batch = []
+
+    if batch :
+        yield batch
+
+
+def ordered_map(
+        executor: Executor,
+        fn: Callable,
+        items: Iterable,
+        max_in_flight: int
+    ) -> Iterator[tuple] :
+    """
+    Equivalent de executor.map, mais sans consommer tout l'itérable d'entrée :
+    au plus max_in_flight tâches sont soumises à la fois.
+    Renvoie les couples (entrée, résultat) dans l'ordre d'entrée.
+    """
+
+    pending = deque()
+    for item in items :
+        pending.append((item, executor.submit(fn, item)))
+        if len(pending) >= max_in_flight :
+            item, future = pending.popleft()
+            yield item, future.result()
+
+    while pending :
+        item, future = pending.popleft()
+        yield item, future.result()
+
+
+def _lookup_batch(
+        batch: list[MediaFile],
+        cache: "MetadataCache|None"
+    ) -> tuple[list[MediaFile], dict[Path, tuple], list[Path]] :
+
+    if cache is None :
+        return batch, {}, [m.path for m in batch]
+
+    hits = {}
+    for media in batch :
+        metadata = cache.get(media.path, media.stat)
+        if metadata is not None :
+            hits[media.path] = metadata
+
+    misses = [m.path for m in batch if m.path not in hits]
+
+    return batch, hits, misses
+
+
+def _extract_misses(job: tuple[list[MediaFile], dict[Path, tuple], list[Path]]) -> tuple[list[tuple], list[float], dict] :
+    """
+    Renvoie les métadonnées, les durées par média et les appels à ExifTool de ce
+    lot (le processus du pool ne partage pas les compteurs du processus principal).
+    """
+
+    _, _, misses = job
+
+    before = dict(exiftool_stats)
+    metadatas, durations = get_medias_metadata_timed(misses)
+    calls = {key: exiftool_stats[key] - before[key] for key in before}
+
+    return metadatas, durations, calls
+
+
+def iter_medias_metadata(
+        medias: Iterable[MediaFile],
+        batch_size: int=EXIFTOOL_BATCH_SIZE,
+        jobs: int=1,
+        cache: "MetadataCache|None"=None,
+        metrics: "SortMetrics|None"=None
+    ) -> Iterator[tuple[Path, tuple[float|None, float|None, datetime|None]]] :
+    """
+    Renvoie (chemin, (lat, lon, date)) pour chaque média, dans l'ordre d'entrée.
+    Les vidéos d'un même lot sont envoyées ensemble à la session ExifTool.
+    Avec jobs > 1, les lots sont traités en parallèle dans un pool de processus.
+    Avec un cache, seuls les médias absents du cache sont lus.
+    Avec metrics, la durée d'extraction de chaque média lu y est relevée.
+    """
+
+    lookups = (_lookup_batch(batch, cache) for batch in iter_batches(medias, batch_size))
+
+    def _merge(job, extracted: tuple[list[tuple], list[float], dict]) :
+
+        batch, hits, misses = job
+        metadatas, durations, calls = extracted
+        extracted = dict(zip(misses, metadatas))
+
+        if metrics is not None :
+            metrics.record_extraction(batch, hits, dict(zip(misses, durations)), calls)
+
+        for media in batch :
+            if media.path in hits :
+                yield media.path, hits[media.path]
+                continue
+
+            metadata = extracted[media.path]
+            if cache is not None :
+                cache.put(media.path, metadata, media.stat)
+            yield media.path, metadata
+
+    if jobs <= 1 :
+        for job in lookups :
+            yield from _merge(job, _extract_misses(job))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor :
+        results = ordered_map(
+            executor,
+            _extract_misses,
+            lookups,
+            max_in_flight=2 * jobs
+        )
+        for job, extracted in results :
+            yield from _merge(job, extracted)
 
 # endregion
 
@@ -159,6 +512,8 @@ def is_in_polygon(
         polygon_points: list[float],
     ) -> bool :
 
+    from shapely.geometry import Point, Polygon
+
     poly = Polygon(polygon_points)  # coordinates est un MultiPolygon compatible
     pt = Point(lon, lat)
     
@@ -167,6 +522,9 @@ def is_in_polygon(
 
 def polygon_area_km2(coords: tuple[float, float]) -> float :
 
+    from shapely.geometry import Polygon
+    from shapely.ops import transform
+
     # Conversion lat/lon -> WebMercator (en mètres)
     def _lonlat_to_mercator(
             lon: float, 
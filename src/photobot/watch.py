@@ -0,0 +1,431 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+from photobot.parameters import (
+    DRAWN_GROUP_DATA_PATH,
+    DATE_GROUP_DATA_PATH,
+    WATCH_DEBOUNCE,
+    WATCH_POLL_INTERVAL,
+    WATCH_IDLE_TIMEOUT,
+    WATCH_RETRY_DELAY,
+    WATCH_MAX_RETRIES
+)
+from photobot.cache import MetadataCache
+from photobot.discovery import (
+    MediaFile,
+    is_media,
+    iter_medias
+)
+from photobot.moves import (
+    Move,
+    execute_moves
+)
+from photobot.groups import (
+    GroupIndex,
+    load_group_index
+)
+from photobot.sort import plan_moves
+
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_MASK = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+# region OBSERVATEURS
+
+class PollingWatcher :
+    """
+    Repli sans inotify : reparcourt la source toutes les interval secondes
+    et signale les médias nouveaux ou modifiés.
+    """
+
+    def __init__(
+            self,
+            medias_path: Path,
+            recursive: bool,
+            exclude: list[Path],
+            interval: float=WATCH_POLL_INTERVAL
+        ) -> None :
+
+        self.medias_path = medias_path
+        self.recursive = recursive
+        self.exclude = exclude
+        self.idle_timeout = interval
+
+        self._known = {}
+        self._next_scan = 0.
+
+    def wait(self, timeout: float) -> list[Path] :
+
+        delay = self._next_scan - time.monotonic()
+        if delay > 0 :
+            time.sleep(min(timeout, delay))
+            if time.monotonic() < self._next_scan :
+                return []
+
+        self._next_scan = time.monotonic() + self.idle_timeout
+
+        changed = []
+        known = {}
+        for media in iter_medias(self.medias_path, recursive=self.recursive, exclude=self.exclude) :
+            signature = (media.stat.st_size, media.stat.st_mtime_ns)
+            known[media.path] = signature
+            if self._known.get(media.path) != signature :
+                changed.append(media.path)
+
+        self._known = known
+
+        return changed
+
+    def close(self) -> None :
+        pass
+
+
+class InotifyWatcher :
+    """
+    Surveillance par inotify (Linux), via ctypes : aucun parcours tant que
+    rien n'arrive, le processus dort dans select().
+    """
+
+    def __init__(
+            self,
+            medias_path: Path,
+            recursive: bool,
+            exclude: list[Path]
+        ) -> None :
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0 :
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+        self.medias_path = medias_path
+        self.recursive = recursive
+        self.excluded = frozenset(os.path.abspath(p) for p in exclude)
+        self.idle_timeout = WATCH_IDLE_TIMEOUT
+
+        self._dirs = {}
+        try :
+            self._initial = self._watch_tree(os.path.abspath(medias_path))
+        except OSError :
+            os.close(self.fd)
+            raise
+
+    def _watch_tree(self, root: str) -> list[Path] :
+        """
+        Pose une surveillance sur root (et ses sous-dossiers si récursif).
+        Renvoie les médias déjà présents, arrivés avant la surveillance.
+        """
+
+        found = []
+        stack = [root]
+        while stack :
+            dir_path = stack.pop()
+            if dir_path in self.excluded :
+                continue
+
+            wd = self._add_watch(self.fd, os.fsencode(dir_path), INOTIFY_MASK)
+            if wd < 0 :
+                err = ctypes.get_errno()
+                if err in (errno.ENOENT, errno.ENOTDIR) : # Dossier déjà supprimé
+                    continue
+                raise OSError(err, f"inotify_add_watch {dir_path}")
+            self._dirs[wd] = dir_path
+
+            try :
+                with os.scandir(dir_path) as it :
+                    for entry in it :
+                        if entry.is_dir(follow_symlinks=False) :
+                            if self.recursive :
+                                stack.append(entry.path)
+                        elif is_media(entry.name) :
+                            found.append(Path(entry.path))
+            except OSError :
+                continue
+
+        return found
+
+    def wait(self, timeout: float) -> list[Path] :
+
+        if self._initial :
+            changed, self._initial = self._initial, []
+            return changed
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready :
+            return []
+
+        try :
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError :
+            return []
+
+        changed = []
+        offset = 0
+        while offset < len(data) :
+            wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+            offset += INOTIFY_EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW : # Evénements perdus : on reparcourt tout
+                changed.extend(m.path for m in iter_medias(self.medias_path, recursive=self.recursive, exclude=self.excluded))
+                continue
+
+            if mask & IN_IGNORED :
+                self._dirs.pop(wd, None)
+                continue
+
+            dir_path = self._dirs.get(wd)
+            if dir_path is None or not name :
+                continue
+
+            path = os.path.join(dir_path, os.fsdecode(name))
+            if mask & IN_ISDIR :
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO) :
+                    changed.extend(self._watch_tree(path))
+            elif is_media(path) :
+                changed.append(Path(path))
+
+        return changed
+
+    def close(self) -> None :
+        os.close(self.fd)
+
+
+def make_watcher(
+        medias_path: Path,
+        recursive: bool,
+        exclude: list[Path],
+        polling: bool=False,
+        poll_interval: float=WATCH_POLL_INTERVAL
+    ) -> "InotifyWatcher|PollingWatcher" :
+    """
+    inotify si disponible, sinon parcours périodique.
+    """
+
+    if not polling and sys.platform.startswith("linux") :
+        try :
+            return InotifyWatcher(medias_path, recursive, exclude)
+        except (OSError, AttributeError) as e : # Limite de surveillances atteinte, libc sans inotify...
+            print(f"inotify indisponible ({e}), surveillance par parcours périodique")
+
+    return PollingWatcher(medias_path, recursive, exclude, interval=poll_interval)
+
+# endregion
+
+
+# region GROUPES
+
+class GroupsReloader :
+    """
+    Index des groupes, reconstruit quand les fichiers de groupes changent sur disque.
+    """
+
+    def __init__(
+            self,
+            drawn_groups_data_path: Path=DRAWN_GROUP_DATA_PATH,
+            date_groups_data_path: Path=DATE_GROUP_DATA_PATH
+        ) -> None :
+
+        self.paths = (drawn_groups_data_path, date_groups_data_path)
+        self._signature = None
+        self.index = None
+        self.reload_if_changed()
+
+    def _current_signature(self) -> tuple :
+
+        signature = []
+        for path in self.paths :
+            try :
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError :
+                signature.append(None)
+
+        return tuple(signature)
+
+    def reload_if_changed(self) -> bool :
+
+        signature = self._current_signature()
+        if signature == self._signature :
+            return False
+
+        try :
+            index = load_group_index(*self.paths)
+        except (OSError, ValueError, KeyError) as e :
+            # Fichier en cours d'écriture : on garde l'ancien index et on réessaie plus tard
+            if self.index is None :
+                raise
+            print(f"Groupes non rechargés : {e}")
+            return False
+
+        self.index = index
+        self._signature = signature
+        print(f"Groupes chargés : {len(index.groups)}")
+
+        return True
+
+# endregion
+
+
+# region SURVEILLANCE
+
+def _pop_stable(
+        pending: dict[Path, tuple[int, int, float]],
+        debounce: float
+    ) -> list[MediaFile] :
+    """
+    Retire de pending les fichiers dont la taille n'a pas bougé depuis debounce secondes.
+    """
+
+    now = time.monotonic()
+    ready = []
+    for path, (size, mtime_ns, since) in list(pending.items()) :
+        try :
+            stat = os.stat(path)
+        except FileNotFoundError : # Déjà déplacé ou supprimé
+            del pending[path]
+            continue
+
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns) :
+            pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+        elif now - since >= debounce :
+            del pending[path]
+            ready.append(MediaFile(path, stat))
+
+    return ready
+
+
+def _sort_ready(
+        ready: list[MediaFile],
+        output_path: Path,
+        groups_index: GroupIndex,
+        cache: MetadataCache|None=None
+    ) -> tuple[list[Move], list[tuple[MediaFile, Exception]]] :
+    """
+    Classe puis place les fichiers prêts : une erreur (date mal formée,
+    ExifTool, fichier verrouillé...) n'arrête que son fichier.
+    Renvoie les déplacements faits et les fichiers en échec avec leur erreur.
+    """
+
+    failed = []
+
+    try :
+        planned = list(zip(ready, plan_moves(ready, output_path, groups_index, cache=cache)))
+    except Exception :
+        # Lot en échec : on isole le ou les fichiers fautifs
+        planned = []
+        for media in ready :
+            try :
+                planned.extend((media, move) for move in plan_moves([media], output_path, groups_index, cache=cache))
+            except Exception as e :
+                failed.append((media, e))
+
+    done = []
+    for media, move in planned :
+        try :
+            done.extend(execute_moves([move]))
+        except Exception as e :
+            failed.append((media, e))
+
+    return done, failed
+
+
+def watch_medias(
+        medias_path: Path,
+        output_path: Path,
+        recursive: bool,
+        drawn_groups_data_path: Path=DRAWN_GROUP_DATA_PATH,
+        date_groups_data_path: Path=DATE_GROUP_DATA_PATH,
+        use_cache: bool=True,
+        debounce: float=WATCH_DEBOUNCE,
+        polling: bool=False,
+        poll_interval: float=WATCH_POLL_INTERVAL
+    ) -> None :
+    """
+    Trie en continu les médias qui arrivent dans medias_path, avec le même
+    classement que sort_medias. Un fichier est trié une fois que sa taille
+    est stable depuis debounce secondes. Les groupes sont rechargés à chaud.
+    """
+
+    groups = GroupsReloader(drawn_groups_data_path, date_groups_data_path)
+    cache = MetadataCache() if use_cache else None
+    watcher = make_watcher(medias_path, recursive, [output_path], polling=polling, poll_interval=poll_interval)
+
+    pending = {}
+    # Fichiers en échec -> nombre d'essais
+    failures = {}
+    sorted_count = 0
+
+    print(f"Surveillance de {medias_path} ({type(watcher).__name__})")
+
+    try :
+        while True :
+            timeout = debounce / 2 if pending else watcher.idle_timeout
+
+            now = time.monotonic()
+            for path in watcher.wait(timeout) :
+                if path not in pending :
+                    pending[path] = (-1, -1, now)
+
+            groups.reload_if_changed()
+
+            ready = _pop_stable(pending, debounce)
+            if not ready :
+                continue
+
+            done, failed = _sort_ready(ready, output_path, groups.index, cache=cache)
+
+            for move in done :
+                if cache is not None :
+                    cache.move(move.src, move.dst)
+                failures.pop(move.src, None)
+                sorted_count += 1
+                print(f"{move.src.name} -> {move.dst.parent}")
+
+            # On continue à surveiller : le fichier est retenté plus tard, ou dès qu'il est modifié
+            now = time.monotonic()
+            for media, error in failed :
+                attempts = failures.get(media.path, 0) + 1
+                if attempts > WATCH_MAX_RETRIES :
+                    failures.pop(media.path, None)
+                    print(f"❌ {media.path.name} : {error} (ignoré jusqu'à sa prochaine modification)")
+                    continue
+
+                failures[media.path] = attempts
+                delay = WATCH_RETRY_DELAY * 2 ** (attempts - 1)
+                print(f"❌ {media.path.name} : {error} (nouvel essai dans {delay:.0f}s)")
+                pending[media.path] = (media.stat.st_size, media.stat.st_mtime_ns, now + delay)
+
+            if cache is not None :
+                cache.commit()
+
+    except KeyboardInterrupt :
+        print(f"\n{sorted_count} files sorted")
+
+    finally :
+        watcher.close()
+        if cache is not None :
+            cache.close()
+
+# endregion
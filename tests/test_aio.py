@@ -0,0 +1,78 @@
+import os
+import time
+from pathlib import Path
+import pytest
+from photobot import aio
+from photobot.aio import AsyncIO
+from photobot.discovery import iter_medias
+from photobot.moves import Move
+
+
+def _tree(root: Path) -> None :
+
+    for i in range(40) :
+        folder = root / f"d{i % 5}" / f"s{i % 3}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"IMG_{i}.JPG").write_bytes(bytes([i]))
+        (folder / f"note_{i}.txt").write_text("pas un média")
+
+    (root / "output").mkdir()
+    (root / "output" / "deja_trie.jpg").write_bytes(b"x")
+
+
+@pytest.mark.parametrize("recursive", [False, True])
+def test_async_discovery_finds_the_same_medias(tmp_path: Path, recursive: bool) -> None :
+
+    _tree(tmp_path)
+    (tmp_path / "racine.jpg").write_bytes(b"r")
+    exclude = [tmp_path / "output"]
+
+    expected = sorted(m.path for m in iter_medias(tmp_path, recursive=recursive, exclude=exclude))
+    with AsyncIO(concurrency=4) as io :
+        found = sorted(m.path for m in io.iter_medias(tmp_path, recursive=recursive, exclude=exclude))
+
+    assert found == expected
+    assert len(found) == (41 if recursive else 1)
+
+
+def test_async_moves_keep_dependencies_in_order(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None :
+
+    sources = []
+    for i in range(30) :
+        path = tmp_path / "src" / f"{i}.jpg"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(bytes([i]) * 100)
+        sources.append(path)
+
+    out = tmp_path / "out"
+    original = out / "a" / "original.jpg"
+    planned = [Move(src, out / str(i % 4) / src.name) for i, src in enumerate(sources[:25])]
+    planned += [
+        # Lien juste après son original (ordre de dedup_moves) : il doit attendre qu'il soit en place
+        Move(sources[26], original),
+        Move(sources[25], out / "a" / "lien.jpg", kind="link", original=original),
+        Move(sources[27], out / "a" / "ignore.jpg", kind="skip", original=original),
+        # Deux déplacements vers la même destination : le dernier l'emporte
+        Move(sources[28], out / "b" / "meme.jpg"),
+        Move(sources[29], out / "b" / "meme.jpg"),
+    ]
+
+    # Les premières écritures de chaque dépendance sont lentes : sans attente, la suivante passerait devant
+    slow = {sources[26], sources[28]}
+    place_file = aio.place_file
+    def _slow_place_file(move: Move, *args) -> None :
+        if move.src in slow :
+            time.sleep(0.05)
+        place_file(move, *args)
+    monkeypatch.setattr(aio, "place_file", _slow_place_file)
+
+    with AsyncIO(concurrency=8) as io :
+        done = list(io.execute_moves(planned))
+
+    assert done == [m for m in planned if m.kind != "skip"]
+    assert os.path.samefile(out / "a" / "lien.jpg", original)
+    assert original.read_bytes() == bytes([26]) * 100
+    assert (out / "b" / "meme.jpg").read_bytes() == bytes([29]) * 100
+    assert sources[27].exists() and not (out / "a" / "ignore.jpg").exists()
+    for move in planned[:25] :
+        assert move.dst.read_bytes() == bytes([int(move.src.stem)]) * 100
@@ -0,0 +1,84 @@
+import os
+from pathlib import Path
+from datetime import datetime
+import pytest
+from photobot.cache import MetadataCache
+from photobot.moves import Move
+from photobot.sort import apply_moves
+
+
+METADATA = (45.5, 6.25, datetime(2020, 1, 2, 3, 4, 5))
+
+
+def _media(path: Path, content: bytes=b"\xff\xd8photo") -> Path :
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+    return path
+
+
+def test_entry_is_invalidated_by_size_or_mtime(tmp_path: Path) -> None :
+
+    media = _media(tmp_path / "a.jpg")
+
+    with MetadataCache(tmp_path / "cache.sqlite") as cache :
+        cache.put(media, METADATA)
+        assert cache.get(media) == METADATA
+
+        stat = media.stat()
+        os.utime(media, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert cache.get(media) is None
+
+        cache.put(media, METADATA)
+        media.write_bytes(b"\xff\xd8photo retouchee")
+        assert cache.get(media) is None
+
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    # Les entrées survivent à la fermeture
+    with MetadataCache(tmp_path / "cache.sqlite") as cache :
+        assert len(cache) == 1
+        assert cache.get(tmp_path / "absent.jpg") is None
+
+
+def test_verify_hash_rejects_same_size_and_mtime(tmp_path: Path) -> None :
+
+    media = _media(tmp_path / "a.jpg", b"AAAA")
+
+    with MetadataCache(tmp_path / "cache.sqlite", verify_hash=True) as cache :
+        cache.put(media, METADATA)
+        stat = media.stat()
+
+        media.write_bytes(b"BBBB")
+        os.utime(media, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert cache.get(media) is None
+
+
+@pytest.mark.parametrize("mode", ["move", "copy", "hardlink"])
+def test_sorted_files_stay_cached(tmp_path: Path, mode: str) -> None :
+
+    src = _media(tmp_path / "src" / "a.jpg")
+    dst = tmp_path / "out" / "2020" / "a.jpg"
+
+    with MetadataCache(tmp_path / "cache.sqlite") as cache :
+        cache.put(src, METADATA)
+        assert apply_moves([Move(src, dst)], cache=cache, mode=mode) == 1
+
+        assert cache.get(dst) == METADATA
+        assert (cache.get(src) == METADATA) == (mode != "move")
+
+
+def test_prune_removes_missing_files(tmp_path: Path) -> None :
+
+    kept = _media(tmp_path / "a.jpg")
+    removed = _media(tmp_path / "b.jpg")
+
+    with MetadataCache(tmp_path / "cache.sqlite") as cache :
+        cache.put(kept, METADATA)
+        cache.put(removed, METADATA)
+        os.remove(removed)
+
+        assert cache.prune() == 1
+        assert len(cache) == 1
+        assert cache.get(kept) == METADATA
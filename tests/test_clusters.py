@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from photobot.clusters import (
+    ClusterIndex,
+    to_days,
+    to_xyz
+)
+
+
+def _library(seed: int=0) -> tuple[np.ndarray, np.ndarray, np.ndarray] :
+    """
+    Amas serrés (cellules denses), amas lâches, bruit, sur l'antiméridien
+    compris, avec des rafales de dates et quelques médias sans date.
+    """
+
+    rng = np.random.default_rng(seed)
+    lats, lons, dates = [], [], []
+
+    for lat0, lon0, spread, count in [
+        (45.9, 6.1, 0.0005, 120),
+        (45.905, 6.1, 0.002, 80),
+        (-17.5, 179.999, 0.003, 90),
+        (48.85, 2.35, 0.004, 60),
+    ] :
+        lats.append(lat0 + rng.normal(0, spread, count))
+        lons.append(lon0 + rng.normal(0, spread, count))
+        bursts = rng.choice(np.arange(2015, 2020), count)
+        days = rng.integers(0, 6, count)
+        dates.append(np.array([f"{year}-07-{1 + day:02d}T12:00:00" for year, day in zip(bursts, days)], dtype="datetime64[s]"))
+
+    # Même jour : cellules denses aussi avec une fenêtre de temps
+    for lat0, lon0, spread, count in [
+        (43.3, 5.4, 0.0003, 50),
+        (43.31, 5.4, 0.002, 150),
+    ] :
+        lats.append(lat0 + rng.normal(0, spread, count))
+        lons.append(lon0 + rng.normal(0, spread, count))
+        dates.append(np.full(count, np.datetime64("2021-05-08T10:00:00")))
+
+    lats.append(rng.uniform(40, 50, 100))
+    lons.append(rng.uniform(0, 10, 100))
+    dates.append(np.full(100, np.datetime64("2018-01-01T00:00:00")))
+
+    lats, lons, dates = np.concatenate(lats), np.concatenate(lons), np.concatenate(dates)
+    lons = (lons + 180) % 360 - 180
+    dates[rng.choice(len(dates), 40, replace=False)] = np.datetime64("NaT")
+
+    order = rng.permutation(len(lats))
+    return lats[order], lons[order], dates[order]
+
+
+def _brute_force(
+        lats: np.ndarray,
+        lons: np.ndarray,
+        dates: np.ndarray,
+        eps_km: float,
+        min_points: int,
+        eps_days: float|None
+    ) -> set[frozenset] :
+    """
+    DBSCAN par toutes les distances : points cœurs de chaque cluster.
+    """
+
+    xyz = to_xyz(lats, lons)
+    neighbours = ((xyz[:, None, :] - xyz[None, :, :]) ** 2).sum(axis=2) <= eps_km ** 2
+    if eps_days is not None :
+        days = to_days(dates)
+        undated = np.isnan(days)
+        close = np.abs(days[:, None] - days[None, :]) <= eps_days
+        neighbours &= close | (undated[:, None] & undated[None, :])
+
+    core = neighbours.sum(axis=1) >= min_points
+    labels = np.full(len(lats), -1)
+    for start in np.flatnonzero(core) :
+        if labels[start] >= 0 :
+            continue
+        labels[start] = start
+        todo = [start]
+        while todo :
+            p = todo.pop()
+            for q in np.flatnonzero(neighbours[p] & core & (labels < 0)) :
+                labels[q] = start
+                todo.append(q)
+
+    return {frozenset(np.flatnonzero(labels == label).tolist()) for label in np.unique(labels[labels >= 0])}
+
+
+@pytest.mark.parametrize("eps_days", [None, 2.])
+def test_incremental_clusters_match_brute_force(eps_days: float|None) -> None :
+
+    lats, lons, dates = _library()
+    index = ClusterIndex(eps_km=0.5, min_points=10, eps_days=eps_days)
+
+    for batch in np.array_split(np.arange(len(lats)), 4) :
+        index.add(lats[batch], lons[batch], dates[batch])
+
+    clusters = {frozenset(c.tolist()) for c in index.clusters()}
+    assert clusters == _brute_force(lats, lons, dates, 0.5, 10, eps_days)
+
+
+def test_time_window_splits_visits(tmp_path) -> None :
+
+    rng = np.random.default_rng(1)
+    lats = 45.9 + rng.normal(0, 0.001, 60)
+    lons = 6.1 + rng.normal(0, 0.001, 60)
+    dates = np.array(["2019-07-01T12:00:00"] * 30 + ["2020-07-01T12:00:00"] * 30, dtype="datetime64[s]")
+
+    assert len(ClusterIndex(eps_days=None).clusters()) == 0
+
+    spatial = ClusterIndex(eps_days=None)
+    spatial.add(lats, lons, dates)
+    assert len(spatial.clusters()) == 1
+
+    visits = ClusterIndex(eps_days=7.)
+    visits.add(lats, lons, dates)
+    assert sorted(len(c) for c in visits.clusters()) == [30, 30]
+
+    # L'état sauvegardé n'est rechargé qu'avec la même fenêtre de temps
+    visits.save(tmp_path / "clusters.pickle")
+    assert len(ClusterIndex.load(tmp_path / "clusters.pickle", eps_days=7.).clusters()) == 2
+    assert len(ClusterIndex.load(tmp_path / "clusters.pickle", eps_days=None)) == 0
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+from photobot.dedup import (
+    HashIndex,
+    dedup_moves
+)
+from photobot.moves import Move
+from photobot.sort import apply_moves
+
+
+def _library(source: Path, count: int=20) -> Path :
+    """
+    count médias différents, plus une copie du premier : renvoie cette copie.
+    """
+
+    source.mkdir()
+    for i in range(count) :
+        (source / f"IMG_{i:03d}.jpg").write_bytes(b"\xff\xd8" + bytes([i]) * 1000)
+
+    duplicate = source / "IMG_copie.jpg"
+    duplicate.write_bytes((source / "IMG_000.jpg").read_bytes())
+
+    return duplicate
+
+
+def _sort(
+        source: Path,
+        output: Path,
+        index_path: Path,
+        policy: str,
+        dry_run: bool=False
+    ) -> int :
+
+    moves = [Move(p, output / p.name) for p in sorted(source.iterdir())]
+
+    with HashIndex(index_path, persist=not dry_run) as hashes :
+        hashes.sync(output)
+        moves = dedup_moves(moves, hashes, policy=policy)
+        if dry_run :
+            list(moves)
+        else :
+            apply_moves(moves, hashes=hashes)
+
+        return hashes.duplicates
+
+
+def test_dry_run_then_sort_skip(tmp_path: Path) -> None :
+
+    source, output, index_path = tmp_path / "source", tmp_path / "output", tmp_path / "hashes.sqlite"
+    duplicate = _library(source)
+
+    assert _sort(source, output, index_path, "skip", dry_run=True) == 1
+    assert not index_path.exists()
+
+    assert _sort(source, output, index_path, "skip") == 1
+    assert sorted(os.listdir(source)) == [duplicate.name]
+    assert len(os.listdir(output)) == 20
+
+    # Relancé : le doublon resté dans la source est reconnu d'après la destination
+    assert _sort(source, output, index_path, "skip") == 1
+    assert len(os.listdir(output)) == 20
+
+
+def test_dry_run_then_sort_hardlink(tmp_path: Path) -> None :
+
+    source, output, index_path = tmp_path / "source", tmp_path / "output", tmp_path / "hashes.sqlite"
+    duplicate = _library(source)
+
+    _sort(source, output, index_path, "hardlink", dry_run=True)
+    assert _sort(source, output, index_path, "hardlink") == 1
+
+    assert os.listdir(source) == []
+    assert len(os.listdir(output)) == 21
+    assert os.path.samefile(output / duplicate.name, output / "IMG_000.jpg")
+
+
+def test_interrupted_sort_keeps_no_source(tmp_path: Path) -> None :
+
+    source, output, index_path = tmp_path / "source", tmp_path / "output", tmp_path / "hashes.sqlite"
+    _library(source)
+
+    # Planification seule (tri interrompu avant les déplacements)
+    with HashIndex(index_path) as hashes :
+        hashes.sync(output)
+        list(dedup_moves([Move(p, output / p.name) for p in sorted(source.iterdir())], hashes))
+        assert len(hashes) == 0
+
+    assert _sort(source, output, index_path, "skip") == 1
+    assert len(os.listdir(output)) == 20
@@ -0,0 +1,114 @@
+import io
+import struct
+from pathlib import Path
+from datetime import datetime
+import pytest
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+from photobot.exif import read_exif_tags
+from photobot.utils import (
+    get_jpg_metadata,
+    read_exifread_tags
+)
+
+
+def _dms(value: float) -> tuple[IFDRational, IFDRational, IFDRational] :
+
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+
+    return IFDRational(degrees, 1), IFDRational(minutes, 1), IFDRational(seconds, 100)
+
+
+def _jpeg(
+        path: Path,
+        lat: float|None,
+        lon: float|None,
+        date: str|None,
+        endian: str="<",
+        after_app0: bool=False
+    ) -> Path :
+    """
+    JPEG avec un segment APP1 Exif (GPS, DateTimeOriginal), avant ou après le JFIF.
+    """
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), (10, 20, 30)).save(buffer, "JPEG")
+    jpeg = buffer.getvalue()
+
+    exif = Image.Exif()
+    exif.endian = endian
+    exif[0x010f] = "Appareil"
+    if date is not None :
+        exif.get_ifd(0x8769)[0x9003] = date
+    if lat is not None and lon is not None :
+        gps = exif.get_ifd(0x8825)
+        gps[1] = "N" if lat >= 0 else "S"
+        gps[2] = _dms(lat)
+        gps[3] = "E" if lon >= 0 else "W"
+        gps[4] = _dms(lon)
+
+    payload = exif.tobytes()
+    app1 = b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+    # Après le SOI, ou après le segment APP0 (JFIF) qui le suit
+    at = 2
+    if after_app0 :
+        at = 4 + struct.unpack(">H", jpeg[4:6])[0]
+
+    path.write_bytes(jpeg[:at] + app1 + jpeg[at:])
+
+    return path
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+@pytest.mark.parametrize("after_app0", [False, True])
+@pytest.mark.parametrize("lat, lon, date", [
+    (45.899247, 6.129384, "2020:01:02 03:04:05"),
+    (-33.8688, -151.2093, "2019:12:31 23:59:59"),
+    (None, None, "2021:06:07 08:09:10"),
+    (48.8566, 2.3522, None),
+])
+def test_fast_reader_matches_exifread(
+        tmp_path: Path,
+        endian: str,
+        after_app0: bool,
+        lat: float|None,
+        lon: float|None,
+        date: str|None
+    ) -> None :
+
+    path = _jpeg(tmp_path / "a.jpg", lat, lon, date, endian=endian, after_app0=after_app0)
+
+    expected = read_exifread_tags(path)
+    tags = read_exif_tags(path)
+
+    assert tags is not None
+    for name, value in expected.items() :
+        assert tags.get(name) == value, name
+
+
+def test_jpeg_metadata(tmp_path: Path) -> None :
+
+    lat, lon, date = get_jpg_metadata(_jpeg(tmp_path / "a.jpg", -33.8688, -151.2093, "2019:12:31 23:59:59"))
+
+    assert lat == pytest.approx(-33.8688, abs=1e-5)
+    assert lon == pytest.approx(-151.2093, abs=1e-5)
+    assert date == datetime(2019, 12, 31, 23, 59, 59)
+
+
+def test_no_exif_and_unreadable_files(tmp_path: Path) -> None :
+
+    plain = tmp_path / "plain.jpg"
+    Image.new("RGB", (16, 16)).save(plain)
+    assert read_exif_tags(plain) == {}
+
+    # Fichier tronqué dans le bloc Exif : la lecture rapide abandonne, exifread prend le relais
+    truncated = tmp_path / "truncated.jpg"
+    truncated.write_bytes(_jpeg(tmp_path / "full.jpg", 45.9, 6.1, "2020:01:02 03:04:05").read_bytes()[:40])
+    assert read_exif_tags(truncated) is None
+
+    assert read_exif_tags(tmp_path / "absent.jpg") is None
+    assert read_exif_tags(plain.rename(tmp_path / "plain.png")) is None
@@ -0,0 +1,181 @@
+import os
+import math
+import json
+import random
+from pathlib import Path
+from datetime import (
+    datetime,
+    timedelta,
+    timezone
+)
+import numpy as np
+import pytest
+from photobot import groups as groups_module
+from photobot.groups import (
+    GroupIndex,
+    group_index_path,
+    load_group_index
+)
+from photobot.sort import media_is_in_group
+from photobot.utils import sort_groups
+
+
+START_DATE = datetime(2020, 1, 1)
+
+
+def _groups(rng: random.Random) -> list[dict] :
+    """
+    Cercles, polygones et périodes qui se chevauchent, triés par priorité,
+    avec les cas limites : antiméridien, pôle, cercle couvrant toute la sphère.
+    """
+
+    groups = [
+        {"nom": "Antiméridien", "type": "circle", "latitude": -17.7, "longitude": 179.9, "rayon_km": 40.},
+        {"nom": "Pôle", "type": "circle", "latitude": 89.5, "longitude": 10., "rayon_km": 200.},
+        {"nom": "Partout", "type": "circle", "latitude": 0., "longitude": 0., "rayon_km": 30_000.},
+    ]
+
+    for i in range(30) :
+        lat, lon = rng.uniform(44, 46), rng.uniform(5, 7)
+
+        if i % 3 == 0 :
+            groups.append({"nom": f"Cercle {i}", "type": "circle", "latitude": lat, "longitude": lon, "rayon_km": rng.uniform(1, 80)})
+
+        elif i % 3 == 1 :
+            n_vertices = rng.randint(3, 9)
+            coordinates = []
+            for k in range(n_vertices) :
+                angle = 2 * math.pi * k / n_vertices
+                radius = rng.uniform(0.1, 0.8)
+                coordinates.append([lon + radius * math.cos(angle), lat + radius * math.sin(angle)])
+            coordinates.append(coordinates[0])
+            groups.append({"nom": f"Polygone {i}", "type": "polygone", "coordinates": coordinates})
+
+        else :
+            debut = START_DATE + timedelta(days=rng.randrange(365), hours=rng.randrange(24))
+            fin = debut + timedelta(days=rng.randint(0, 40), hours=rng.randint(0, 23))
+            groups.append({"nom": f"Période {i}", "type": "date", "date_debut": debut, "date_fin": fin})
+
+    return sort_groups(groups)
+
+
+def _medias(rng: random.Random, count: int=2000) -> list[tuple[datetime|None, tuple]] :
+
+    medias = []
+    for _ in range(count) :
+        kind = rng.random()
+        if kind < 0.1 :
+            coords = (None, None)
+        elif kind < 0.2 :
+            coords = (rng.uniform(-18.2, -17.2), rng.choice([rng.uniform(179.4, 180.), rng.uniform(-180., -179.6)]))
+        elif kind < 0.25 :
+            coords = (rng.uniform(87, 90), rng.uniform(-180, 180))
+        else :
+            coords = (rng.uniform(43.5, 46.5), rng.uniform(4.5, 7.5))
+
+        date = START_DATE + timedelta(days=rng.randrange(420), seconds=rng.randrange(86400))
+        if rng.random() < 0.1 :
+            date = None
+        elif rng.random() < 0.2 :
+            date = date.replace(tzinfo=timezone(timedelta(hours=rng.choice([-5, 2]))))
+
+        medias.append((date, coords))
+
+    return medias
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_group_index_matches_media_is_in_group(seed: int) -> None :
+
+    rng = random.Random(seed)
+    groups = _groups(rng)
+    # Le cercle qui couvre tout contient chaque média localisé : on teste aussi sans lui
+    groups_without_global = [g for g in groups if g["nom"] != "Partout"]
+
+    for candidate_groups in (groups, groups_without_global) :
+        index = GroupIndex(candidate_groups)
+
+        for date, coords in _medias(rng) :
+            expected = next((g for g in candidate_groups if media_is_in_group(date, coords, g)), None)
+            assert index.find(date, coords) is expected, (date, coords)
+
+
+def test_date_index_bounds_are_inclusive() -> None :
+
+    day = {"nom": "Journée", "type": "date", "date_debut": datetime(2020, 5, 1), "date_fin": datetime(2020, 5, 2)}
+    trip = {"nom": "Voyage", "type": "date", "date_debut": datetime(2020, 4, 20), "date_fin": datetime(2020, 5, 10)}
+    index = GroupIndex(sort_groups([trip, day]))
+
+    assert index.find(datetime(2020, 5, 1), None) is day
+    assert index.find(datetime(2020, 5, 2), None) is day
+    assert index.find(datetime(2020, 5, 2, 0, 0, 1), None) is trip
+    assert index.find(datetime(2020, 5, 10), None) is trip
+    assert index.find(datetime(2020, 5, 10, 0, 0, 1), None) is None
+    assert index.find(datetime(2020, 4, 19, 23, 59, 59), None) is None
+
+    # Date avec fuseau : comparée en UTC
+    paris = timezone(timedelta(hours=2))
+    assert index.find(datetime(2020, 5, 2, 2, 0, 0, tzinfo=paris), None) is day
+    assert index.find(datetime(2020, 5, 2, 2, 0, 1, tzinfo=paris), None) is trip
+
+
+def test_find_priorities_matches_find_priority() -> None :
+
+    rng = random.Random(3)
+    index = GroupIndex(_groups(rng))
+    medias = _medias(rng)
+
+    lats = [coords[0] for _, coords in medias]
+    lons = [coords[1] for _, coords in medias]
+    dates = [date for date, _ in medias]
+
+    expected = [index.find_priority(date, coords) for date, coords in medias]
+    expected = np.array([-1 if p is None else p for p in expected])
+
+    assert np.array_equal(index.find_priorities(lats, lons, dates), expected)
+
+
+def _write_groups(
+        drawn_path: Path,
+        dates_path: Path,
+        rayon_km: float
+    ) -> None :
+
+    with open(drawn_path, "w", encoding="utf-8") as f :
+        json.dump({"groups": [
+            {"nom": "Maison", "id": "m", "type": "circle", "latitude": 45.9, "longitude": 6.1, "rayon_km": rayon_km}
+        ]}, f)
+
+    with open(dates_path, "w", encoding="utf-8", newline="") as f :
+        f.write("nom,date_debut,date_fin,full_day\nVacances,2020-07-01 00:00:00,2020-07-15 00:00:00,True\n")
+
+
+def test_compiled_group_index_follows_group_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None :
+
+    drawn_path, dates_path, index_dir = tmp_path / "drawn_groups.json", tmp_path / "date_groups.csv", tmp_path / "index"
+    _write_groups(drawn_path, dates_path, rayon_km=1.)
+
+    compiled = []
+    build = GroupIndex.__init__
+    def _build(self, groups: list[dict]) -> None :
+        compiled.append(len(groups))
+        build(self, groups)
+    monkeypatch.setattr(groups_module.GroupIndex, "__init__", _build)
+
+    index = load_group_index(drawn_path, dates_path, index_dir=index_dir)
+    assert group_index_path(drawn_path, dates_path, index_dir=index_dir).exists()
+    assert index.find(datetime(2020, 7, 15, 12), None)["nom"] == "Vacances"
+    assert index.find(None, (45.905, 6.1))["nom"] == "Maison"
+
+    # Fichiers inchangés, ou réécrits à l'identique : l'index compilé est repris
+    assert load_group_index(drawn_path, dates_path, index_dir=index_dir).find(None, (45.905, 6.1))["nom"] == "Maison"
+    stat = drawn_path.stat()
+    os.utime(drawn_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    load_group_index(drawn_path, dates_path, index_dir=index_dir)
+    assert compiled == [2]
+
+    # Groupe modifié : l'index est recompilé
+    _write_groups(drawn_path, dates_path, rayon_km=0.5)
+    os.utime(drawn_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    assert load_group_index(drawn_path, dates_path, index_dir=index_dir).find(None, (45.905, 6.1)) is None
+    assert compiled == [2, 2]
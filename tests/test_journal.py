@@ -0,0 +1,65 @@
+from pathlib import Path
+from datetime import datetime
+import pytest
+from photobot.journal import SortJournal
+from photobot.moves import Move
+
+
+def _interrupted(tmp_path: Path) -> tuple[Path, Move, Move] :
+    """
+    Journal d'un tri coupé en plein déplacement : un déplacement abouti mais
+    non confirmé, un autre jamais fait. La dernière ligne est tronquée.
+    """
+
+    path = tmp_path / "journals" / "tri.jsonl"
+    moved = Move(tmp_path / "src" / "a.jpg", tmp_path / "out" / "a.jpg")
+    pending = Move(tmp_path / "src" / "b.jpg", tmp_path / "out" / "b.jpg")
+
+    moved.dst.parent.mkdir(parents=True)
+    moved.dst.write_bytes(b"a")
+    pending.src.parent.mkdir(parents=True)
+    pending.src.write_bytes(b"b")
+
+    journal = SortJournal(path)
+    journal.put(pending.src, (45.5, 6.25, datetime(2020, 1, 2, 3, 4, 5)))
+    journal.begin(moved)
+    journal.begin(pending)
+    journal.close()
+
+    with open(path, "a", encoding="utf-8") as f :
+        f.write('{"op": "do')
+
+    return path, moved, pending
+
+
+def test_resume_recovers_in_flight_moves(tmp_path: Path) -> None :
+
+    path, _, pending = _interrupted(tmp_path)
+
+    journal = SortJournal(path, resume=True)
+    assert journal.recover() == (1, 1)
+    assert journal.moved == 1
+    assert journal.get(pending.src) == (45.5, 6.25, datetime(2020, 1, 2, 3, 4, 5))
+    journal.close()
+
+    # La ligne tronquée n'empêche pas de relire les entrées écrites après la reprise ;
+    # le déplacement à refaire est revérifié à chaque reprise tant qu'il n'est pas fait
+    journal = SortJournal(path, resume=True)
+    assert journal.moved == 1
+    assert journal.in_flight == {str(pending.src): str(pending.dst)}
+    journal.close(completed=True)
+
+    assert not path.exists()
+
+
+def test_new_sort_keeps_interrupted_journal(tmp_path: Path) -> None :
+
+    path, _, _ = _interrupted(tmp_path)
+    content = path.read_bytes()
+
+    with pytest.raises(FileExistsError) :
+        SortJournal(path)
+    assert path.read_bytes() == content
+
+    SortJournal(path, restart=True).close()
+    assert path.read_bytes() == b""
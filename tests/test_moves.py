@@ -0,0 +1,103 @@
+import os
+import errno
+from pathlib import Path
+import pytest
+from photobot import moves
+from photobot.moves import (
+    Move,
+    execute_moves,
+    move_file,
+    read_manifest,
+    write_manifest
+)
+
+
+def _exdev(src, dst) :
+    raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+
+def _media(path: Path, content: bytes, mtime_ns: int|None=None) -> Path :
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    if mtime_ns is not None :
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    return path
+
+
+def test_move_across_devices_copies_and_removes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None :
+
+    monkeypatch.setattr(moves.os, "rename", _exdev)
+    src = _media(tmp_path / "src" / "a.jpg", b"contenu", mtime_ns=1_600_000_000_000_000_000)
+    dst = tmp_path / "out" / "a.jpg"
+    dst.parent.mkdir()
+
+    move_file(src, dst, verify=True)
+
+    assert not src.exists()
+    assert dst.read_bytes() == b"contenu"
+    assert dst.stat().st_mtime_ns == 1_600_000_000_000_000_000
+
+
+def test_move_across_devices_never_trusts_size_and_mtime(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None :
+
+    monkeypatch.setattr(moves.os, "rename", _exdev)
+    mtime_ns = 1_600_000_000_000_000_000
+    src = _media(tmp_path / "src" / "a.jpg", b"AAAA", mtime_ns=mtime_ns)
+    dst = _media(tmp_path / "out" / "a.jpg", b"BBBB", mtime_ns=mtime_ns)
+
+    move_file(src, dst)
+
+    # Le contenu de la source n'est jamais perdu
+    assert not src.exists()
+    assert dst.read_bytes() == b"AAAA"
+
+
+@pytest.mark.parametrize("mode", ["move", "copy", "hardlink", "symlink", "reflink"])
+def test_execute_moves_modes(tmp_path: Path, mode: str) -> None :
+
+    sources = [_media(tmp_path / "src" / f"{i}.jpg", bytes([i]) * 10) for i in range(3)]
+    planned = [Move(src, tmp_path / "out" / str(i) / src.name) for i, src in enumerate(sources)]
+
+    done = list(execute_moves(planned, mode=mode, copy_workers=2))
+
+    assert done == planned
+    for move in planned :
+        assert move.dst.read_bytes() == bytes([int(move.src.stem)]) * 10
+        assert move.src.exists() == (mode != "move")
+    if mode == "hardlink" :
+        assert all(os.path.samefile(m.src, m.dst) for m in planned)
+    if mode == "symlink" :
+        assert all(os.path.islink(m.dst) for m in planned)
+
+
+def test_execute_moves_links_duplicates_after_original(tmp_path: Path) -> None :
+
+    original = _media(tmp_path / "src" / "a.jpg", b"meme contenu")
+    duplicate = _media(tmp_path / "src" / "b.jpg", b"meme contenu")
+    skipped = _media(tmp_path / "src" / "c.jpg", b"meme contenu")
+    dst = tmp_path / "out" / "a.jpg"
+
+    planned = [
+        Move(duplicate, tmp_path / "out" / "b.jpg", kind="link", original=dst),
+        Move(original, dst),
+        Move(skipped, tmp_path / "out" / "c.jpg", kind="skip", original=dst)
+    ]
+    list(execute_moves(planned))
+
+    assert os.path.samefile(dst, tmp_path / "out" / "b.jpg")
+    assert not duplicate.exists()
+    assert skipped.exists() and not (tmp_path / "out" / "c.jpg").exists()
+
+
+def test_manifest_round_trip(tmp_path: Path) -> None :
+
+    planned = [
+        Move(tmp_path / "é.jpg", tmp_path / "out" / "é.jpg"),
+        Move(tmp_path / "b.jpg", tmp_path / "out" / "b.jpg", kind="link", original=tmp_path / "out" / "é.jpg")
+    ]
+    manifest_path = tmp_path / "manifest.jsonl"
+
+    assert list(write_manifest(planned, manifest_path)) == planned
+    assert list(read_manifest(manifest_path)) == planned
@@ -0,0 +1,132 @@
+import struct
+from pathlib import Path
+from datetime import (
+    datetime,
+    timedelta,
+    timezone
+)
+import pytest
+from photobot.mp4 import (
+    KEY_CREATION_DATE,
+    KEY_LOCATION,
+    read_mp4_tags
+)
+from photobot.utils import get_mp4_metadata
+
+
+MP4_EPOCH = datetime(1904, 1, 1)
+
+
+def _box(
+        box_type: bytes,
+        payload: bytes
+    ) -> bytes :
+
+    return struct.pack(">L4s", 8 + len(payload), box_type) + payload
+
+
+def _mvhd(date: datetime, version: int=0) -> bytes :
+
+    seconds = int((date - MP4_EPOCH).total_seconds())
+    if version == 1 :
+        return _box(b"mvhd", bytes([1, 0, 0, 0]) + struct.pack(">QQ", seconds, seconds) + bytes(96))
+
+    return _box(b"mvhd", bytes(4) + struct.pack(">LL", seconds, seconds) + bytes(88))
+
+
+def _xyz(location: str) -> bytes :
+
+    location = location.encode("ascii")
+    return _box(b"udta", _box(b"\xa9xyz", struct.pack(">HH", len(location), 0x15c7) + location))
+
+
+def _mdta_meta(values: dict[bytes, str], full_box: bool) -> bytes :
+    """
+    moov/meta au format QuickTime (keys puis ilst), avec ou sans version/flags ISO.
+    """
+
+    keys = b"".join(struct.pack(">L4s", 8 + len(key), b"mdta") + key for key in values)
+    items = b"".join(
+        _box(struct.pack(">L", i), _box(b"data", struct.pack(">LL", 1, 0) + value.encode("utf-8")))
+        for i, value in enumerate(values.values(), start=1)
+    )
+    hdlr = _box(b"hdlr", bytes(8) + b"mdta" + bytes(12))
+    children = hdlr + _box(b"keys", bytes(4) + struct.pack(">L", len(values)) + keys) + _box(b"ilst", items)
+
+    return _box(b"meta", (bytes(4) if full_box else b"") + children)
+
+
+def _mp4(
+        path: Path,
+        moov: bytes,
+        moov_first: bool=False,
+        large_mdat: bool=False
+    ) -> Path :
+
+    ftyp = _box(b"ftyp", b"qt  " + struct.pack(">L", 0x200) + b"qt  ")
+    mdat = _box(b"mdat", bytes(4096))
+    if large_mdat :
+        mdat = struct.pack(">L4sQ", 1, b"mdat", 16 + 4096) + bytes(4096)
+
+    moov = _box(b"moov", moov)
+    path.write_bytes(ftyp + moov + mdat if moov_first else ftyp + mdat + moov)
+
+    return path
+
+
+@pytest.mark.parametrize("version", [0, 1])
+@pytest.mark.parametrize("moov_first, large_mdat", [(False, False), (True, False), (False, True)])
+def test_mvhd_and_xyz(
+        tmp_path: Path,
+        version: int,
+        moov_first: bool,
+        large_mdat: bool
+    ) -> None :
+
+    moov = _mvhd(datetime(2021, 8, 9, 10, 11, 12), version) + _xyz("-33.8688+151.2093/")
+    path = _mp4(tmp_path / "video.mp4", moov, moov_first=moov_first, large_mdat=large_mdat)
+
+    assert read_mp4_tags(path) == {
+        "QuickTime:CreateDate": "2021:08:09 10:11:12",
+        "Composite:GPSLatitude": -33.8688,
+        "Composite:GPSLongitude": 151.2093
+    }
+
+
+@pytest.mark.parametrize("full_box", [False, True])
+def test_apple_keys_take_precedence(tmp_path: Path, full_box: bool) -> None :
+
+    moov = _mvhd(datetime(2021, 8, 9, 8, 11, 12)) + _mdta_meta({
+        b"com.apple.quicktime.make": "Apple",
+        KEY_LOCATION: "+48.8584+002.2945+035.000/",
+        KEY_CREATION_DATE: "2021-08-09T10:11:12+0200"
+    }, full_box=full_box)
+    path = _mp4(tmp_path / "video.mov", moov)
+
+    assert read_mp4_tags(path) == {
+        "QuickTime:CreateDate": "2021:08:09 08:11:12",
+        "QuickTime:CreationDate": "2021:08:09 10:11:12+02:00",
+        "Composite:GPSLatitude": 48.8584,
+        "Composite:GPSLongitude": 2.2945
+    }
+
+    # La date locale d'Apple l'emporte sur la date UTC du mvhd
+    lat, lon, date = get_mp4_metadata(path)
+    assert (lat, lon) == (48.8584, 2.2945)
+    assert date == datetime(2021, 8, 9, 10, 11, 12, tzinfo=timezone(timedelta(hours=2)))
+
+
+def test_unreadable_containers(tmp_path: Path) -> None :
+
+    # Sans moov, ou moov coupé : None, l'appelant retombe sur ExifTool
+    no_moov = tmp_path / "no_moov.mp4"
+    no_moov.write_bytes(_box(b"ftyp", b"isom" + bytes(4)) + _box(b"mdat", bytes(64)))
+    assert read_mp4_tags(no_moov) is None
+
+    truncated = _mp4(tmp_path / "truncated.mp4", _mvhd(datetime(2021, 1, 1)))
+    truncated.write_bytes(truncated.read_bytes()[:-20])
+    assert read_mp4_tags(truncated) is None
+
+    # moov sans date ni position
+    empty = _mp4(tmp_path / "empty.mp4", _box(b"trak", bytes(16)))
+    assert read_mp4_tags(empty) == {}
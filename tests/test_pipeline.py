@@ -0,0 +1,69 @@
+import threading
+from pathlib import Path
+from datetime import datetime
+import pytest
+from PIL import Image
+from photobot.groups import GroupIndex
+from photobot.pipeline import (
+    iter_classified,
+    iter_threaded
+)
+
+
+def test_iter_threaded_relays_errors() -> None :
+
+    def _produce() :
+        yield from range(3)
+        raise ValueError("dossier illisible")
+
+    items = []
+    with pytest.raises(ValueError) :
+        for item in iter_threaded(_produce(), maxsize=1) :
+            items.append(item)
+
+    assert items == [0, 1, 2]
+
+
+def test_closing_iter_threaded_stops_the_producer() -> None :
+
+    closed = threading.Event()
+
+    def _produce() :
+        try :
+            i = 0
+            while True :
+                yield i
+                i += 1
+        finally :
+            closed.set()
+
+    stream = iter_threaded(_produce(), maxsize=2)
+    assert [next(stream) for _ in range(5)] == list(range(5))
+    stream.close()
+
+    assert closed.is_set()
+
+
+def test_iter_classified_streams_every_media(tmp_path: Path) -> None :
+
+    source = tmp_path / "source"
+    (source / "sub").mkdir(parents=True)
+    for name in ["2020-07-02 10.00.00.jpg", "sub/2021-03-04 05.06.07.JPG", "sans date.jpg", "notes.txt"] :
+        if name.endswith(".txt") :
+            (source / name).write_text("pas un média")
+        else :
+            Image.new("RGB", (8, 8)).save(source / name, "JPEG")
+
+    vacances = {"nom": "Vacances", "type": "date", "date_debut": datetime(2020, 7, 1), "date_fin": datetime(2020, 7, 15)}
+    output = source / "output"
+
+    classified = {
+        media.path.name: media
+        for media in iter_classified(source, recursive=True, output_path=output, groups_index=GroupIndex([vacances]))
+    }
+
+    assert sorted(classified) == ["2020-07-02 10.00.00.jpg", "2021-03-04 05.06.07.JPG", "sans date.jpg"]
+    assert classified["2020-07-02 10.00.00.jpg"].group is vacances
+    assert classified["2021-03-04 05.06.07.JPG"].destination == output / "2021" / "z_autre" / "03" / "2021-03-04 05.06.07.JPG"
+    assert classified["sans date.jpg"].date is None
+    assert classified["sans date.jpg"].destination == output / "inconnue" / "z_autre" / "sans date.jpg"
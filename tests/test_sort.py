@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+from PIL import Image
+from photobot.moves import read_manifest
+from photobot.sort import (
+    apply_manifest,
+    sort_medias
+)
+
+
+def _library(tmp_path: Path) -> tuple[Path, Path, Path] :
+
+    source = tmp_path / "source"
+    (source / "sub").mkdir(parents=True)
+    for name in ["2020-07-02 10.00.00.jpg", "sub/2021-03-04 05.06.07.jpg", "sans date.jpg"] :
+        Image.new("RGB", (8, 8)).save(source / name)
+
+    drawn_path, dates_path = tmp_path / "drawn_groups.json", tmp_path / "date_groups.csv"
+    drawn_path.write_text(json.dumps({"groups": []}), encoding="utf-8")
+    dates_path.write_text("nom,date_debut,date_fin,full_day\nVacances,2020-07-01 00:00:00,2020-07-15 00:00:00,True\n", encoding="utf-8")
+
+    return source, drawn_path, dates_path
+
+
+def test_dry_run_manifest_then_apply(tmp_path: Path) -> None :
+
+    source, drawn_path, dates_path = _library(tmp_path)
+    output, manifest_path = tmp_path / "output", tmp_path / "manifest.jsonl"
+    before = sorted(p.relative_to(source) for p in source.rglob("*.jpg"))
+
+    sort_medias(
+        source,
+        output,
+        recursive=True,
+        drawn_groups_data_path=drawn_path,
+        date_groups_data_path=dates_path,
+        use_cache=False,
+        dry_run=True,
+        manifest_path=manifest_path,
+        journals_path=tmp_path / "journals",
+        group_index_dir=tmp_path / "group_index"
+    )
+
+    # Simulation : rien n'a bougé, tout est dans le manifeste
+    assert sorted(p.relative_to(source) for p in source.rglob("*.jpg")) == before
+    assert not output.exists()
+    planned = {move.src.name: move.dst.relative_to(output) for move in read_manifest(manifest_path)}
+    assert planned == {
+        "2020-07-02 10.00.00.jpg": Path("2020/Vacances/2020-07-02 10.00.00.jpg"),
+        "2021-03-04 05.06.07.jpg": Path("2021/z_autre/03/2021-03-04 05.06.07.jpg"),
+        "sans date.jpg": Path("inconnue/z_autre/sans date.jpg")
+    }
+
+    apply_manifest(manifest_path, use_cache=False)
+
+    assert list(source.rglob("*.jpg")) == []
+    assert sorted(p.relative_to(output) for p in output.rglob("*.jpg")) == sorted(planned.values())
@@ -0,0 +1,56 @@
+import time
+from pathlib import Path
+import pytest
+from PIL import Image
+from photobot import utils
+from photobot.discovery import MediaFile
+from photobot.groups import GroupIndex
+from photobot.watch import (
+    _pop_stable,
+    _sort_ready
+)
+
+
+def _jpeg(path: Path) -> MediaFile :
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (8, 8)).save(path)
+
+    return MediaFile(path, path.stat())
+
+
+def test_one_failing_file_does_not_stop_the_others(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None :
+
+    good = _jpeg(tmp_path / "inbox" / "2020-01-02 03.04.05.jpg")
+    bad = _jpeg(tmp_path / "inbox" / "bad.jpg")
+    read = utils.get_jpg_metadata
+
+    def _get_jpg_metadata(path: Path) -> tuple :
+        if path.name == bad.path.name :
+            raise ValueError("date mal formée")
+        return read(path)
+
+    monkeypatch.setattr(utils, "get_jpg_metadata", _get_jpg_metadata)
+
+    done, failed = _sort_ready([bad, good], tmp_path / "out", GroupIndex([]))
+
+    assert [move.src for move in done] == [good.path]
+    assert done[0].dst == tmp_path / "out" / "2020" / "z_autre" / "01" / good.path.name
+    assert done[0].dst.exists()
+    assert [(media.path, type(error)) for media, error in failed] == [(bad.path, ValueError)]
+    assert bad.path.exists()
+
+
+def test_failed_file_waits_for_its_retry(tmp_path: Path) -> None :
+
+    media = _jpeg(tmp_path / "a.jpg")
+    now = time.monotonic()
+    stat = media.stat
+
+    pending = {media.path: (stat.st_size, stat.st_mtime_ns, now + 60)}
+    assert _pop_stable(pending, debounce=0.) == []
+    assert media.path in pending
+
+    pending = {media.path: (stat.st_size, stat.st_mtime_ns, now - 1)}
+    assert [m.path for m in _pop_stable(pending, debounce=0.)] == [media.path]
+    assert pending == {}